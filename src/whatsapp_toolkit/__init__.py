@@ -1,13 +1,109 @@
-from importlib.metadata import version, PackageNotFoundError
-
-try:
-    __version__ = version("whatsapp-toolkit")
-except PackageNotFoundError:
-    __version__ = "0.0.0"
-
-from .utils import generar_audio
-from .client import WhatsappClient, MongoCacheBackend
-from .media import PDFGenerator, obtener_gif_base64, obtener_imagen_base64
-from .devtools import *
-from .schemas import *
-from .async_client import AsyncWhatsappClient
\ No newline at end of file
+"""
+WhatsApp Toolkit.
+
+Los exports se cargan bajo demanda (PEP 562): `import whatsapp_toolkit` no importa
+pymongo, reportlab, jinja2, httpx, etc. hasta que se usa el nombre que los necesita.
+Así un worker que solo usa `whatsapp_toolkit.webhook` arranca rápido y con menos memoria.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+# nombre exportado -> submódulo que lo define
+_LAZY_EXPORTS: dict[str, str] = {
+    # Utilidades
+    "generar_audio": ".utils.audio",
+    "PDFGenerator": ".media",
+    "obtener_gif_base64": ".media",
+    "obtener_imagen_base64": ".media",
+    "MediaServer": ".media_server",
+    "JsonCodec": ".codec",
+    "get_codec": ".codec",
+    # Cliente síncrono
+    "WhatsappClient": ".client",
+    "MongoCacheBackend": ".client",
+    "HttpConfig": ".transport",
+    # Cliente asíncrono
+    "AsyncWhatsappClient": ".async_client",
+    "AsyncHttpConfig": ".async_transport",
+    "OutboundMessage": ".bulk",
+    "SendResult": ".bulk",
+    "PreparedMedia": ".prepared",
+    "MediaDownload": ".streaming",
+    "MediaCache": ".media_cache",
+    "MediaCacheMetrics": ".media_cache",
+    "MessageCache": ".message_cache",
+    "Outbox": ".outbox",
+    "OutboxMetrics": ".outbox",
+    # Resiliencia
+    "RateLimiter": ".ratelimit",
+    "RetryPolicy": ".retry",
+    "RetryStats": ".retry",
+    "CircuitBreaker": ".breaker",
+    "CircuitOpenError": ".breaker",
+    # Schemas
+    "Schema": ".schemas",
+    "Participant": ".schemas",
+    "GroupBase": ".schemas",
+    "Groups": ".schemas",
+    "CompactGroups": ".compact_groups",
+    "LazyGroups": ".lazy_groups",
+    # DevTools
+    "init_evolution": ".devtools",
+    "stack_evolution": ".devtools",
+    "init_webhook": ".devtools",
+    "stack_webhook": ".devtools",
+    "ensure_docker_daemon": ".devtools",
+}
+
+_LAZY_SUBMODULES = frozenset({"devtools", "webhook", "schemas", "utils", "cli"})
+
+__all__ = ["__version__", *_LAZY_EXPORTS]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        from importlib.metadata import PackageNotFoundError, version
+
+        try:
+            value = version("whatsapp-toolkit")
+        except PackageNotFoundError:
+            value = "0.0.0"
+    elif name in _LAZY_EXPORTS:
+        value = getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+    elif name in _LAZY_SUBMODULES:
+        value = import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value  # memoiza: la próxima vez no pasa por __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__) | _LAZY_SUBMODULES)
+
+
+if TYPE_CHECKING:  # pragma: no cover - solo para type checkers / IDEs
+    from .async_client import AsyncWhatsappClient
+    from .async_transport import AsyncHttpConfig
+    from .breaker import CircuitBreaker, CircuitOpenError
+    from .bulk import OutboundMessage, SendResult
+    from .client import MongoCacheBackend, WhatsappClient
+    from .codec import JsonCodec, get_codec
+    from .compact_groups import CompactGroups
+    from .devtools import ensure_docker_daemon, init_evolution, init_webhook, stack_evolution, stack_webhook
+    from .lazy_groups import LazyGroups
+    from .media import PDFGenerator, obtener_gif_base64, obtener_imagen_base64
+    from .media_cache import MediaCache, MediaCacheMetrics
+    from .media_server import MediaServer
+    from .message_cache import MessageCache
+    from .outbox import Outbox, OutboxMetrics
+    from .prepared import PreparedMedia
+    from .ratelimit import RateLimiter
+    from .retry import RetryPolicy, RetryStats
+    from .schemas import GroupBase, Groups, Participant, Schema
+    from .streaming import MediaDownload
+    from .transport import HttpConfig
+    from .utils.audio import generar_audio
+
+    __version__: str
@@ -1,20 +1,76 @@
-from typing import Optional
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Optional
 from .async_instance import AsyncWhatsAppInstance
+from .async_transport import AsyncHttpConfig
 from .async_sender import AsyncWhatsAppSender
+from .breaker import CircuitBreaker
+from .codec import JsonCodec
+from .media_cache import MediaCache, media_cache_key
+from .media_server import HostedSource, MediaServer
+from .message_cache import MessageCache
+from .prepared import PreparableSource, PreparedMedia, PreparedMediaCache
+from .ratelimit import RateLimiter
+from .streaming import MediaDownload, MediaSink, MediaSource, media_filename, open_sink
+from .retry import RetryPolicy, RetryStats
+from .singleflight import SingleFlight
+from .bulk import Items, OutboundMessage, SendResult, aiter_items, bounded_map, deliver
+from .outbox import Outbox
 from colorstreak import Logger
+from pydantic import ValidationError
+from .webhook.events import EventType
 from .webhook.schemas import MessageUpsert
 
+if TYPE_CHECKING:
+    from .webhook.dispatcher import WebhookManager
+
 class AsyncWhatsappClient:
     """
     Cliente principal Asíncrono.
     Fachada que unifica la gestión de la instancia y el envío de mensajes.
     """
-    def __init__(self, api_key: str, server_url: str, instance_name: str = "con"):
-        # 1. Configuración e Identidad
-        self._instance = AsyncWhatsAppInstance(api_key, instance_name, server_url)
+    def __init__(
+        self,
+        api_key: str,
+        server_url: str,
+        instance_name: str = "con",
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        http_config: Optional[AsyncHttpConfig] = None,
+        media_server: Optional[MediaServer] = None,
+        json_codec: Optional[JsonCodec] = None,
+        media_cache: Optional[MediaCache] = None,
+        message_cache: Optional[MessageCache] = None,
+    ):
+        # 1. Configuración e Identidad (dueña del cliente HTTP compartido)
+        self._instance = AsyncWhatsAppInstance(api_key, instance_name, server_url, http_config=http_config)
         
         # 2. Capacidad de Envío (Inyección de la instancia)
-        self._sender = AsyncWhatsAppSender(self._instance)
+        self._sender = AsyncWhatsAppSender(
+            self._instance,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            media_server=media_server,
+            json_codec=json_codec,
+        )
+        self._outbox: Optional[Outbox] = None
+        self._prepared = PreparedMediaCache(codec=self._sender.codec)
+        self._media_cache = media_cache
+        self._message_cache = message_cache
+        # Lecturas idénticas en vuelo (get_message, get_state) se resuelven con una sola petición
+        self._flight: SingleFlight = SingleFlight()
+
+    @property
+    def retry_stats(self) -> RetryStats:
+        """Contadores de intentos/reintentos (amplificación) del sender."""
+        return self._sender.retry_stats
+
+    @property
+    def circuit_state(self) -> str:
+        """Estado del circuit breaker del sender: 'closed', 'open' o 'half_open'."""
+        return self._sender.breaker.state
 
     # --- CICLO DE VIDA (LifeCycle) ---
 
@@ -25,7 +81,7 @@ class AsyncWhatsappClient:
         """
         Logger.info(f"🔄 Verificando instancia '{self._instance.name_instance}'...")
         
-        state = await self._instance.get_state()
+        state = await self.get_state()
         
         match state:
             case "open":
@@ -56,9 +112,20 @@ class AsyncWhatsappClient:
                 Logger.error(f"❌ Estado desconocido o error: {state}")
                 return "error"
     
+    async def get_state(self) -> str:
+        """
+        Estado de conexión de la instancia ('open', 'connecting', 'close', 'not_found', ...).
+        Llamadas concurrentes (healthchecks + arranque) comparten una sola petición.
+        """
+        return await self._flight.do(("get_state",), self._instance.get_state)
+
     async def close(self):
         """Libera recursos del cliente HTTP."""
-        await self._sender.close()
+        if self._outbox is not None:
+            await self._outbox.stop()
+            self._outbox.close()
+            self._outbox = None
+        await self._instance.close()
 
     # --- GESTIÓN DE INSTANCIA (Delegación) ---
 
@@ -85,18 +152,279 @@ class AsyncWhatsappClient:
     async def send_sticker(self, number: str, sticker_b64: str, quoted: dict | None = None) -> bool:
         return await self._sender.send_sticker(number, sticker_b64, quoted=quoted)
 
+    async def send_media_hosted(self, number: str, source: HostedSource, filename: Optional[str] = None, caption: str = "", mimetype: Optional[str] = None, quoted: dict | None = None, mediatype: str = "document") -> bool:
+        """Envía media por URL temporal del MediaServer (requiere `media_server=`)."""
+        return await self._sender.send_media_hosted(number, source, filename, caption, mimetype, quoted=quoted, mediatype=mediatype)
+
+    async def send_audio_hosted(self, number: str, source: HostedSource, ptt: bool = True, quoted: dict | None = None) -> bool:
+        return await self._sender.send_audio_hosted(number, source, ptt=ptt, quoted=quoted)
+
+    async def send_media_file(self, number: str, source: MediaSource, filename: Optional[str] = None, caption: str = "", mimetype: str = "application/pdf", quoted: dict | None = None, mediatype: str = "document") -> bool:
+        """Envía media desde ruta/archivo/bytes sin materializar el base64 en memoria."""
+        return await self._sender.send_media_file(number, source, filename, caption, mimetype, quoted=quoted, mediatype=mediatype)
+
+    async def send_audio_file(self, number: str, source: MediaSource, ptt: bool = True, quoted: dict | None = None) -> bool:
+        return await self._sender.send_audio_file(number, source, ptt=ptt, quoted=quoted)
+
+    async def send_sticker_file(self, number: str, source: MediaSource, quoted: dict | None = None) -> bool:
+        return await self._sender.send_sticker_file(number, source, quoted=quoted)
+
     async def send_reaction(self, remote_jid: str, message_id: str, reaction: str, from_me: bool = False, participant: str | None = None) -> bool:
         return await self._sender.send_reaction(remote_jid, message_id, reaction, from_me, participant=participant)
 
     async def send_location(self, number: str, lat: float, long: float, address: str = "", quoted: dict | None = None) -> bool:
         return await self._sender.send_location(number, lat, long, address, quoted=quoted)
     
+    # --- ENVÍO MASIVO ---
+
+    async def send_many(self, messages: Items[OutboundMessage], concurrency: int = 10) -> AsyncIterator[SendResult]:
+        """
+        Envía muchos mensajes con un máximo de `concurrency` peticiones en vuelo,
+        reutilizando el cliente HTTP persistente del sender.
+        Acepta un iterable o async iterator y entrega cada `SendResult` en cuanto termina.
+
+        Uso:
+            async for result in client.send_many(mensajes, concurrency=20):
+                if not result.ok:
+                    print(result.message.number, result.error)
+        """
+        async def _send(message: OutboundMessage) -> bool:
+            return await deliver(self._sender, message)
+
+        async for message, ok, error in bounded_map(messages, _send, concurrency):
+            if error is not None:
+                yield SendResult(message, False, str(error))
+            else:
+                yield SendResult(message, bool(ok), None if ok else "La API rechazó el envío")
+
+    async def broadcast(
+        self,
+        numbers: Items[str],
+        text: str,
+        concurrency: int = 10,
+        delay_ms: int = 0,
+        quoted: dict | None = None,
+    ) -> AsyncIterator[SendResult]:
+        """Envía el mismo texto a todos los números (atajo de `send_many`)."""
+        async def _messages():
+            async for number in aiter_items(numbers):
+                yield OutboundMessage(number, "text", {"text": text, "delay_ms": delay_ms, "quoted": quoted})
+
+        async for result in self.send_many(_messages(), concurrency=concurrency):
+            yield result
+
+    async def prepare_media(
+        self,
+        source: PreparableSource,
+        filename: Optional[str] = None,
+        mimetype: Optional[str] = None,
+        mediatype: str = "document",
+    ) -> PreparedMedia:
+        """
+        Codifica la media una vez para reutilizarla en muchos envíos (caché por ruta + mtime + tamaño,
+        o por sha256 si son bytes). Lectura, hash y base64 corren en un hilo, fuera del event loop.
+        """
+        return await asyncio.to_thread(self._prepared.prepare, source, filename, mimetype, mediatype)
+
+    async def send_prepared(self, number: str, media: PreparedMedia, caption: str = "", quoted: dict | None = None) -> bool:
+        return await self._sender.send_prepared(number, media, caption, quoted=quoted)
+
+    async def broadcast_media(
+        self,
+        numbers: Items[str],
+        media: PreparableSource | PreparedMedia,
+        caption: str = "",
+        filename: Optional[str] = None,
+        mimetype: Optional[str] = None,
+        mediatype: str = "document",
+        concurrency: int = 10,
+        hosted: bool = False,
+    ) -> AsyncIterator[SendResult]:
+        """
+        Envía la misma media a todos los números preparándola una sola vez:
+        el payload se serializa una vez y por destinatario solo cambian `number`/`caption`.
+
+        - media: ruta/bytes o una `PreparedMedia` (p.ej. de `prepare_media` o `PreparedMedia.from_base64`).
+        - hosted=True: en vez de base64 se publica una URL en el `MediaServer` del cliente
+          (Evolution descarga el archivo) y se revoca al terminar.
+        """
+        if hosted and isinstance(media, PreparedMedia):
+            raise ValueError("hosted=True requiere la ruta o los bytes de la media, no una PreparedMedia")
+
+        url: Optional[str] = None
+        if isinstance(media, PreparedMedia):
+            prepared = media
+        elif hosted:
+            server = self._sender._require_media_server()
+            url = server.publish(media, filename, mimetype, ttl=float("inf"))  # se revoca al terminar
+            prepared = PreparedMedia.from_url(
+                url, filename or media_filename(media), server.mimetype_of(url) or "application/octet-stream", mediatype, codec=self._sender.codec
+            )
+        else:
+            prepared = await self.prepare_media(media, filename, mimetype, mediatype)
+
+        async def _messages():
+            async for number in aiter_items(numbers):
+                yield OutboundMessage(number, "prepared", {"media": prepared, "caption": caption})
+
+        try:
+            async for result in self.send_many(_messages(), concurrency=concurrency):
+                yield result
+        finally:
+            if url is not None:
+                self._sender._require_media_server().revoke(url)
+
+    def outbox(self, path: str | Path = "whatsapp_outbox.sqlite3", workers: int = 4, **kwargs) -> Outbox:
+        """
+        Crea (una sola vez) la cola de salida persistente de este cliente.
+        Los workers reutilizan el sender y se detienen en `close()`.
+
+        Uso:
+            outbox = client.outbox("outbox.sqlite3", workers=8)
+            await outbox.start()
+            await outbox.send_text("5214771234567", "Hola")  # solo persiste, no bloquea
+        """
+        if self._outbox is None:
+            self._outbox = Outbox(self._sender, path=path, workers=workers, **kwargs)
+        return self._outbox
+
     async def get_message(self, message_id: str) -> Optional[MessageUpsert]:
         """
         Recupera un mensaje por ID y lo devuelve como un objeto MessageUpsert.
         Esto permite usar las mismas propiedades (.body, .media_url, .is_audio)
         que usas en el webhook.
+
+        Si varios handlers piden el mismo ID a la vez (p.ej. muchas reacciones al mismo mensaje)
+        se hace un solo `findMessages` y todos reciben el mismo objeto.
+        Con `message_cache` los mensajes ya vistos se resuelven localmente, sin llamar a Evolution.
         """
+        cache = self._message_cache
+        if cache is not None:
+            cached = cache.get(message_id)
+            if cached is not None:
+                return cached
+
+        message = await self._flight.do(("get_message", message_id), lambda: self._fetch_message(message_id))
+        if message is not None and cache is not None:
+            cache.put(message)
+        return message
+
+    async def find_messages(self, ids: Items[str], concurrency: int = 10) -> dict[str, MessageUpsert]:
+        """
+        Recupera muchos mensajes por ID y devuelve {id: MessageUpsert} (los no encontrados se omiten).
+
+        El filtro `where.key.id` de Evolution solo admite igualdad (un ID por `findMessages`), así que el lote
+        se resuelve con `concurrency` peticiones en vuelo sobre el cliente compartido, sin IDs repetidos y
+        pasando por `message_cache` y el single-flight de `get_message`.
+        """
+        seen: set[str] = set()
+
+        async def _unique_ids():
+            async for message_id in aiter_items(ids):
+                if message_id and message_id not in seen:
+                    seen.add(message_id)
+                    yield message_id
+
+        found: dict[str, MessageUpsert] = {}
+        async for message_id, message, error in bounded_map(_unique_ids(), self.get_message, concurrency):
+            if error is not None:
+                Logger.warning(f"⚠️ No se pudo recuperar el mensaje {message_id}: {error}")
+            elif message is not None:
+                found[message_id] = message
+        return found
+
+    async def iter_messages(
+        self,
+        remote_jid: Optional[str] = None,
+        page_size: int = 50,
+        where: Optional[dict] = None,
+    ) -> AsyncIterator[MessageUpsert]:
+        """
+        Recorre el historial de un chat (o de todos si `remote_jid` es None) página a página.
+        Mientras el llamador procesa una página ya se está pidiendo la siguiente.
+        Lanza RuntimeError si una página falla, para no entregar un historial incompleto en silencio.
+
+        Uso:
+            async for msg in client.iter_messages("5214771234567@s.whatsapp.net"):
+                print(msg.timestamp, msg.body)
+        """
+        if page_size < 1:
+            raise ValueError("page_size debe ser >= 1")
+        filters = dict(where or {})
+        if remote_jid:
+            filters["key"] = {**filters.get("key", {}), "remoteJid": remote_jid}
+
+        def _fetch(page: int) -> asyncio.Task:
+            return asyncio.ensure_future(self._sender.find_messages_page(filters, page, page_size))
+
+        page = 1
+        next_page: Optional[asyncio.Task] = _fetch(page)
+        try:
+            while next_page is not None:
+                data = await next_page
+                next_page = None
+                if data is None:
+                    raise RuntimeError(f"No se pudo obtener la página {page} del historial")
+
+                records = data["records"]
+                pages = data.get("pages")
+                has_more = page < pages if isinstance(pages, int) else len(records) >= page_size
+                if has_more and records:
+                    next_page = _fetch(page + 1)  # prefetch mientras se entregan los registros
+
+                for raw in records:
+                    try:
+                        yield MessageUpsert.model_validate({
+                            "event": "messages.upsert",
+                            "instance": self._instance.name_instance,
+                            "data": raw,
+                        })
+                    except ValidationError as e:
+                        Logger.warning(f"⚠️ Registro de historial omitido (no válido): {e.error_count()} errores")
+                page += 1
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    async def export_messages_jsonl(
+        self,
+        dest: str | Path,
+        remote_jid: Optional[str] = None,
+        page_size: int = 100,
+        where: Optional[dict] = None,
+    ) -> int:
+        """
+        Exporta el historial a JSONL (un registro crudo de Evolution por línea) sin tenerlo en memoria.
+        Escribe a `<dest>.part` y renombra al terminar. Retorna el número de mensajes exportados.
+        """
+        count = 0
+        async with open_sink(dest) as (write, _):
+            async for message in self.iter_messages(remote_jid, page_size, where):
+                await write(self._sender.codec.dumps(message.raw) + b"\n")
+                count += 1
+        return count
+
+    async def cache_message(self, event: MessageUpsert) -> None:
+        """
+        Guarda un `messages.upsert` entrante en el `message_cache` (handler de webhook).
+
+        Uso:
+            manager.on(EventType.MESSAGES_UPSERT)(client.cache_message)
+        """
+        if self._message_cache is not None:
+            self._message_cache.put(event)
+
+    def attach_message_cache(self, manager: "WebhookManager") -> None:
+        """
+        Registra `cache_message` en el manager para pre-poblar el caché con cada mensaje entrante.
+        Se registra como handler `shared` (solo lee y guarda una copia sin media): su `MessageUpsert`
+        pasa después al siguiente handler/router de `messages.upsert`, así el caché no añade una validación.
+        """
+        if self._message_cache is None:
+            raise RuntimeError("Configura un MessageCache (message_cache=...) para adjuntarlo al webhook")
+        manager.on(EventType.MESSAGES_UPSERT, shared=True)(self.cache_message)
+
+    async def _fetch_message(self, message_id: str) -> Optional[MessageUpsert]:
         raw_msg = await self._sender.find_message(message_id)
         
         if not raw_msg:
@@ -115,8 +443,39 @@ class AsyncWhatsappClient:
     async def download_media(self, message_data: dict, convert_to_mp4: bool = False) -> bytes:
         """
         Descarga media usando la URL base y la API Key configurada.
+        Con `media_cache` configurado, las llamadas repetidas para el mismo mensaje se sirven desde disco.
         """
+        if self._media_cache is not None and media_cache_key(message_data, convert_to_mp4):
+            return await self._media_cache.read(*self._media_cache_request(message_data, convert_to_mp4))
         return await self._sender.download_media(
             message_data=message_data,
             convert_to_mp4=convert_to_mp4
-        )
\ No newline at end of file
+        )
+
+    async def media_path(self, message_data: dict, convert_to_mp4: bool = False) -> Path:
+        """
+        Ruta local de la media del mensaje dentro del `MediaCache` (la descarga en streaming si falta).
+        Llamadas concurrentes para la misma media comparten una sola descarga.
+        """
+        if self._media_cache is None:
+            raise RuntimeError("Configura un MediaCache (media_cache=...) para usar media_path")
+        return await self._media_cache.fetch(*self._media_cache_request(message_data, convert_to_mp4))
+
+    def _media_cache_request(self, message_data: dict, convert_to_mp4: bool) -> tuple[str, Callable[[Path], Awaitable[dict]]]:
+        """Clave en el `MediaCache` y función que descarga la media a una ruta."""
+        key = media_cache_key(message_data, convert_to_mp4)
+        if key is None:
+            raise ValueError("El mensaje no tiene key.id ni fileSha256 para cachear su media")
+
+        async def _download(target: Path) -> dict:
+            result = await self._sender.download_media_to(message_data, target, convert_to_mp4=convert_to_mp4)
+            return result.metadata
+
+        return key, _download
+
+    async def download_media_to(self, message_data: dict, dest: MediaSink, convert_to_mp4: bool = False) -> MediaDownload:
+        """
+        Descarga media directo a `dest` (ruta, archivo u objeto con `write`) sin cargar el base64 en memoria.
+        Retorna un `MediaDownload` con la ruta, el tamaño y los metadatos (mimetype, fileName, ...).
+        """
+        return await self._sender.download_media_to(message_data, dest, convert_to_mp4=convert_to_mp4)
\ No newline at end of file
@@ -1,10 +1,11 @@
-import httpx
 from typing import Optional, Dict
 from colorstreak import Logger
 import base64
 
+from .async_transport import AsyncHttpConfig, build_async_client
+
 class AsyncWhatsAppInstance:
-    def __init__(self, api_key: str, instance_name: str, server_url: str):
+    def __init__(self, api_key: str, instance_name: str, server_url: str, http_config: Optional[AsyncHttpConfig] = None):
         self.api_key = api_key
         self.name_instance = instance_name
         self.server_url = server_url.rstrip("/")
@@ -15,63 +16,68 @@ class AsyncWhatsAppInstance:
             "Content-Type": "application/json"
         }
 
+        # Cliente HTTP persistente compartido con el sender (un solo pool de conexiones)
+        self.http_config = http_config or AsyncHttpConfig()
+        self.client = build_async_client(self.server_url, self.headers, self.http_config)
+
+    async def close(self):
+        """Cierra el cliente HTTP compartido."""
+        await self.client.aclose()
+
     async def create(self) -> Dict:
         """Crea la instancia en el servidor Evolution."""
-        endpoint = f"{self.server_url}/instance/create"
+        endpoint = "/instance/create"
         payload = {
             "instanceName": self.name_instance,
             "integration": "WHATSAPP-BAILEYS",
             "syncFullHistory": False,
         }
         
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            try:
-                resp = await client.post(endpoint, json=payload)
-                return resp.json()
-            except Exception as e:
-                Logger.error(f"❌ Error creando instancia: {e}")
-                return {"error": str(e)}
+        try:
+            resp = await self.client.post(endpoint, json=payload)
+            return resp.json()
+        except Exception as e:
+            Logger.error(f"❌ Error creando instancia: {e}")
+            return {"error": str(e)}
 
     async def delete(self) -> bool:
         """Elimina la instancia."""
-        endpoint = f"{self.server_url}/instance/delete/{self.name_instance}"
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            try:
-                resp = await client.delete(endpoint)
-                return resp.status_code == 200
-            except Exception as e:
-                Logger.error(f"❌ Error eliminando instancia: {e}")
-                return False
+        endpoint = f"/instance/delete/{self.name_instance}"
+        try:
+            resp = await self.client.delete(endpoint)
+            return resp.status_code == 200
+        except Exception as e:
+            Logger.error(f"❌ Error eliminando instancia: {e}")
+            return False
             
     async def get_state(self) -> str:
         """
         Verifica el estado actual de la instancia.
         Retorna: 'open', 'connecting', 'close' o 'not_found'.
         """
-        endpoint = f"{self.server_url}/instance/connectionState/{self.name_instance}"
+        endpoint = f"/instance/connectionState/{self.name_instance}"
         
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            try:
-                resp = await client.get(endpoint)
-                Logger.debug(f"Estado de instancia '{self.name_instance}': {resp.status_code} - {resp.text}")
+        try:
+            resp = await self.client.get(endpoint)
+            Logger.debug(f"Estado de instancia '{self.name_instance}': {resp.status_code} - {resp.text}")
+            
+            if resp.status_code == 200:
+                data = resp.json()
                 
-                if resp.status_code == 200:
-                    data = resp.json()
-                    
-                    state = data.get("state")
-                    
-                    if not state and "instance" in data:
-                        state = data["instance"].get("state")
-                        
-                    return state or "unknown"
+                state = data.get("state")
                 
-                if resp.status_code == 404:
-                    return "not_found"
+                if not state and "instance" in data:
+                    state = data["instance"].get("state")
                     
-                return "error"
-            except Exception as e:
-                Logger.error(f"❌ Error verificando estado: {e}")
-                return "error"
+                return state or "unknown"
+            
+            if resp.status_code == 404:
+                return "not_found"
+                
+            return "error"
+        except Exception as e:
+            Logger.error(f"❌ Error verificando estado: {e}")
+            return "error"
         
 
     async def get_connection_code(self) -> Optional[str]: # <--- Cambiamos a str
@@ -79,17 +85,16 @@ class AsyncWhatsAppInstance:
         Obtiene el string del código de emparejamiento o QR.
         Ideal para imprimir en consola.
         """
-        endpoint = f"{self.server_url}/instance/connect/{self.name_instance}"
+        endpoint = f"/instance/connect/{self.name_instance}"
         
-        async with httpx.AsyncClient(headers=self.headers) as client:
-            try:
-                resp = await client.get(endpoint)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    # Evolution nos da 'code' o 'pairingCode' como texto plano
-                    return data.get("code") or data.get("pairingCode")
-                return None
-            except Exception as e:
-                Logger.error(f"❌ Error obteniendo QR: {e}")
-                return None
+        try:
+            resp = await self.client.get(endpoint)
+            if resp.status_code == 200:
+                data = resp.json()
+                # Evolution nos da 'code' o 'pairingCode' como texto plano
+                return data.get("code") or data.get("pairingCode")
+            return None
+        except Exception as e:
+            Logger.error(f"❌ Error obteniendo QR: {e}")
+            return None
         
\ No newline at end of file
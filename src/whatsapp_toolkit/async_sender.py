@@ -1,37 +1,167 @@
+import asyncio
 import base64
-from typing import Any, Dict, Optional
+import functools
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
 
 import httpx
 from colorstreak import Logger
 
 from .async_instance import AsyncWhatsAppInstance
+from .breaker import CircuitBreaker, CircuitOpenError
+from .ratelimit import RateLimiter, recipient_of
+from .retry import IDEMPOTENT_METHODS, RetryPolicy, RetryStats
+from .codec import JsonCodec, default_codec
+from .media_server import HostedSource, MediaServer
+from .prepared import PreparedBody, PreparedMedia
+from .streaming import (
+    Base64FieldDecoder,
+    Base64JsonBody,
+    MediaDownload,
+    MediaSink,
+    MediaSource,
+    media_filename,
+    open_sink,
+)
+
+# Código HTTP del último `_post` de la tarea actual: los `send_*` devuelven bool y así quien los llama
+# (p.ej. el Outbox) distingue un rechazo definitivo (4xx) de un fallo transitorio.
+# NO_RESPONSE: la petición no obtuvo respuesta (red caída, timeout o circuito abierto).
+NO_RESPONSE = 0
+last_status: ContextVar[Optional[int]] = ContextVar("whatsapp_last_status", default=None)
+
+
+def _retry_reason(error: httpx.TransportError, method: str, policy: RetryPolicy) -> Optional[str]:
+    """Motivo de reintento para un error de red, o None si no es seguro reintentar."""
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return "connect_error"  # la petición nunca llegó a Evolution
+    if method in IDEMPOTENT_METHODS or policy.retry_on_timeout:
+        return "timeout" if isinstance(error, httpx.TimeoutException) else "network_error"
+    return None
 
 
 class AsyncWhatsAppSender:
-    def __init__(self, instance: AsyncWhatsAppInstance):
+    def __init__(
+        self,
+        instance: AsyncWhatsAppInstance,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        media_server: Optional[MediaServer] = None,
+        json_codec: Optional[JsonCodec] = None,
+    ):
         # Composición: El sender "vive" gracias a la info de la instancia
         self.instance_name = instance.name_instance
         self.base_url = instance.server_url
         self.headers = instance.headers
         
-        # Cliente HTTP persistente (Mejora brutalmente el rendimiento)
-        self.client = httpx.AsyncClient(
-            base_url=self.base_url,
-            headers=self.headers,
-            timeout=20.0,
-            verify=False # Evolution a veces usa certificados self-signed
-        )
+        # Cliente HTTP persistente compartido con la instancia (Mejora brutalmente el rendimiento)
+        self.client = instance.client
+
+        # Limitador del lado cliente (global + por JID) para los envíos /message/*
+        self.rate_limiter = rate_limiter
+
+        # Reintentos ante 429/5xx y errores de conexión, con contadores por intento
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_stats = RetryStats()
+
+        # Circuit breaker: con la instancia caída se falla en microsegundos en vez de esperar timeouts
+        self.breaker = circuit_breaker or CircuitBreaker()
+
+        # Servidor local opcional: Evolution descarga la media por URL en vez de recibir base64
+        self.media_server = media_server
+
+        # Serializa payloads y parsea respuestas (orjson si está instalado)
+        self.codec = json_codec or default_codec()
 
     async def close(self):
-        """Cierra la sesión HTTP al apagar la app."""
+        """Cierra la sesión HTTP al apagar la app (es la misma de la instancia)."""
         await self.client.aclose()
 
-    async def _post(self, endpoint: str, payload: Dict[str, Any]) -> Optional[httpx.Response]:
-        """Método interno para manejar todas las peticiones POST de forma segura."""
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        stream: bool = False,
+        retry: bool = True,
+        throttle: Optional[Callable[[], Awaitable[Any]]] = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """
+        Petición HTTP aplicando la política de reintentos (backoff + jitter + Retry-After).
+        Con `stream=True` el cuerpo de la respuesta no se lee: el llamador debe cerrarla (`aclose`).
+        Con `retry=False` se hace un solo intento (cuerpos que no pueden reenviarse).
+        `throttle` se espera antes de cada intento (rate limiter: los reintentos también consumen token).
+        """
+        policy = self.retry_policy
+        stats = self.retry_stats
+        started = time.monotonic()
+        stats.record_request()
+
+        # Un resultado por petición lógica: los fallos que un reintento recupera no abren el circuito
+        self.breaker.check()  # falla al instante si la instancia está caída
+        attempt = 0
+        while True:
+            attempt += 1
+            if throttle is not None:
+                await throttle()
+            if attempt > 1:
+                self.breaker.check_not_open()  # otra petición lo abrió mientras esperábamos
+            stats.record_attempt()
+            try:
+                if stream:
+                    request = self.client.build_request(method, endpoint, **kwargs)
+                    resp = await self.client.send(request, stream=True)
+                else:
+                    resp = await self.client.request(method, endpoint, **kwargs)
+            except httpx.TransportError as e:
+                reason = _retry_reason(e, method, policy)
+                delay = policy.next_delay(attempt, started) if retry and reason is not None else None
+                if delay is None:
+                    if retry and reason is not None:
+                        stats.record_exhausted()
+                    self.breaker.record_failure()
+                    raise
+            else:
+                if not policy.retries_status(method, resp.status_code):
+                    self.breaker.record_status(resp.status_code)
+                    return resp
+                reason = str(resp.status_code)
+                delay = policy.next_delay(attempt, started, resp.headers.get("Retry-After")) if retry else None
+                if delay is None:
+                    if retry:
+                        stats.record_exhausted()
+                    self.breaker.record_status(resp.status_code)
+                    return resp
+                if stream:
+                    await resp.aclose()
+
+            stats.record_retry(reason)
+            Logger.debug(f"🔁 Reintento {attempt}/{policy.max_attempts} de {endpoint} en {delay:.2f}s ({reason})")
+            await asyncio.sleep(delay)
+
+    async def _post(self, endpoint: str, payload: Dict[str, Any], body: Optional[Base64JsonBody | PreparedBody] = None) -> Optional[httpx.Response]:
+        """
+        Método interno para manejar todas las peticiones POST de forma segura.
+        Si se pasa `body` (streaming) se envía en lugar de `payload`.
+        El código HTTP queda en `last_status` (`NO_RESPONSE` si no hubo respuesta).
+        """
+        last_status.set(NO_RESPONSE)
+        if body is not None:
+            kwargs: Dict[str, Any] = {"content": body.async_stream(), "headers": body.headers(), "retry": body.rewindable}
+        else:
+            # Content-Type: application/json ya va en las cabeceras del cliente
+            kwargs = {"content": self.codec.dumps(payload)}
+        if self.rate_limiter is not None and endpoint.startswith("/message/"):
+            kwargs["throttle"] = functools.partial(self.rate_limiter.acquire_async, recipient_of(payload))
         try:
-            resp = await self.client.post(endpoint, json=payload)
+            resp = await self._request("POST", endpoint, **kwargs)
+            last_status.set(resp.status_code)
             # Logger.debug(f"📡 API Response [{resp.status_code}]: {endpoint}")
             return resp
+        except CircuitOpenError as e:
+            Logger.debug(f"⛔ {e}: {endpoint}")
         except httpx.TimeoutException:
             Logger.error(f"⏳ Timeout conectando a: {endpoint}")
         except Exception as e:
@@ -89,6 +219,103 @@ class AsyncWhatsAppSender:
         resp = await self._post(f"/message/sendSticker/{self.instance_name}", payload)
         return resp is not None and 200 <= resp.status_code < 300
 
+    async def send_prepared(self, number: str, media: PreparedMedia, caption: str = "", quoted: dict | None = None) -> bool:
+        """Envía una `PreparedMedia`: solo se serializan `number`/`caption`, la media ya va codificada."""
+        resp = await self._post(
+            f"/message/sendMedia/{self.instance_name}",
+            media.payload_for(number, caption, quoted),
+            body=media.body_for(number, caption, quoted),
+        )
+        return resp is not None and 200 <= resp.status_code < 300
+
+    # --- ENVÍO DE MEDIA POR URL (servidor local de media) ---
+
+    def _require_media_server(self) -> MediaServer:
+        if self.media_server is None:
+            raise RuntimeError("Configura un MediaServer (media_server=...) para enviar media por URL")
+        return self.media_server
+
+    async def send_media_hosted(
+        self,
+        number: str,
+        source: HostedSource,
+        filename: Optional[str] = None,
+        caption: str = "",
+        mimetype: Optional[str] = None,
+        quoted: dict | None = None,
+        mediatype: str = "document",
+    ) -> bool:
+        """Publica `source` en el MediaServer y se lo pasa a Evolution como URL (sin base64)."""
+        filename = filename or media_filename(source)
+        server = self._require_media_server()
+        with server.hosted(source, filename, mimetype) as url:
+            payload = {
+                "number": number,
+                "media": url,
+                "fileName": filename,
+                "caption": caption,
+                "mimetype": mimetype or server.mimetype_of(url),
+                "mediatype": mediatype
+            }
+            if quoted:
+                payload["quoted"] = quoted
+            resp = await self._post(f"/message/sendMedia/{self.instance_name}", payload)
+        return resp is not None and 200 <= resp.status_code < 300
+
+    async def send_audio_hosted(self, number: str, source: HostedSource, delay: int = 0, ptt: bool = True, quoted: dict | None = None) -> bool:
+        """Como `send_audio`, pero Evolution descarga el audio por URL desde el MediaServer."""
+        with self._require_media_server().hosted(source, mimetype="audio/ogg") as url:
+            return await self.send_audio(number, url, delay, ptt, quoted=quoted)
+
+    # --- ENVÍO DE MEDIA DESDE ARCHIVO (base64 en streaming) ---
+
+    async def send_media_file(
+        self,
+        number: str,
+        source: MediaSource,
+        filename: Optional[str] = None,
+        caption: str = "",
+        mimetype: str = "application/pdf",
+        quoted: dict | None = None,
+        mediatype: str = "document",
+    ) -> bool:
+        """Como `send_media`, pero acepta ruta/archivo/bytes y codifica el base64 en streaming."""
+        payload = {
+            "number": number,
+            "fileName": filename or media_filename(source),
+            "caption": caption,
+            "mimetype": mimetype,
+            "mediatype": mediatype
+        }
+        if quoted:
+            payload["quoted"] = quoted
+        body = Base64JsonBody(payload, "media", source, codec=self.codec)
+        resp = await self._post(f"/message/sendMedia/{self.instance_name}", payload, body=body)
+        return resp is not None and 200 <= resp.status_code < 300
+
+    async def send_audio_file(self, number: str, source: MediaSource, delay: int = 0, ptt: bool = True, quoted: dict | None = None) -> bool:
+        """Como `send_audio`, pero acepta ruta/archivo/bytes y codifica el base64 en streaming."""
+        payload = {
+            "number": number,
+            "delay": delay,
+            "mimetype": "audio/ogg; codecs=opus",
+            "ptt": ptt
+        }
+        if quoted:
+            payload["quoted"] = quoted
+        body = Base64JsonBody(payload, "audio", source, codec=self.codec)
+        resp = await self._post(f"/message/sendWhatsAppAudio/{self.instance_name}", payload, body=body)
+        return resp is not None and 200 <= resp.status_code < 300
+
+    async def send_sticker_file(self, number: str, source: MediaSource, quoted: dict | None = None) -> bool:
+        """Como `send_sticker`, pero acepta ruta/archivo/bytes y codifica el base64 en streaming."""
+        payload: Dict[str, Any] = {"number": number}
+        if quoted:
+            payload["quoted"] = quoted
+        body = Base64JsonBody(payload, "sticker", source, codec=self.codec)
+        resp = await self._post(f"/message/sendSticker/{self.instance_name}", payload, body=body)
+        return resp is not None and 200 <= resp.status_code < 300
+
     async def send_location(self, number: str, lat: float, long: float, address: str = "", name: str = "", quoted: dict | None = None) -> bool:
         payload = {
             "number": number,
@@ -131,7 +358,7 @@ class AsyncWhatsAppSender:
         resp = await self._post(f"/chat/findMessages/{self.instance_name}", payload)
 
         if resp is not None and 200 <= resp.status_code < 300:
-            data = resp.json()
+            data = self.codec.loads(resp.content)
 
             # Estructura detectada en tus logs:
             # {'messages': {'records': [{'message': ...}]}}
@@ -152,6 +379,25 @@ class AsyncWhatsAppSender:
         return None
     
     
+    async def find_messages_page(self, where: Dict[str, Any], page: int = 1, page_size: int = 50) -> Optional[Dict[str, Any]]:
+        """
+        Una página de `/chat/findMessages`. Devuelve {"total", "pages", "currentPage", "records"}
+        o None si la API falla. Versiones viejas de Evolution responden una lista sin paginar.
+        """
+        payload = {"where": where, "page": page, "offset": page_size}
+        resp = await self._post(f"/chat/findMessages/{self.instance_name}", payload)
+        if resp is None or not (200 <= resp.status_code < 300):
+            return None
+
+        data = self.codec.loads(resp.content)
+        container = data.get("messages", {}) if isinstance(data, dict) else data
+        if isinstance(container, list):
+            return {"total": len(container), "pages": 1, "currentPage": 1, "records": container}
+        if isinstance(container, dict):
+            container.setdefault("records", [])
+            return container
+        return None
+
     async def download_media(self, message_data: dict, convert_to_mp4: bool = False) -> bytes:
         """
         Descarga media reutilizando la conexión persistente del sender.
@@ -172,7 +418,7 @@ class AsyncWhatsAppSender:
                 Logger.error(f"❌ ERROR API Media. Code: {response.status_code if response else 'None'}")
                 raise ValueError("Error en respuesta de API Media")
             
-            data = response.json()
+            data = self.codec.loads(response.content)
             base64_str = data.get("base64")
             
             if not base64_str:
@@ -186,3 +432,47 @@ class AsyncWhatsAppSender:
             # Devolvemos bytes vacíos o re-lanzamos según prefieras. 
             # Aquí re-lanzamos para que el handler sepa que falló.
             raise e
+
+    async def download_media_to(self, message_data: dict, dest: MediaSink, convert_to_mp4: bool = False) -> MediaDownload:
+        """
+        Descarga media en streaming: parsea la respuesta por trozos, decodifica el base64 incrementalmente
+        y lo escribe en `dest` (ruta, archivo binario u objeto con `write` sync/async).
+        La memoria por descarga queda acotada al tamaño de un trozo, sin importar el tamaño del video.
+        """
+        url = f"/chat/getBase64FromMediaMessage/{self.instance_name}"
+        payload = {
+            "message": message_data,
+            "convertToMp4": convert_to_mp4
+        }
+
+        try:
+            response = await self._request("POST", url, stream=True, content=self.codec.dumps(payload))
+            try:
+                if not (200 <= response.status_code < 300):
+                    Logger.error(f"❌ ERROR API Media. Code: {response.status_code}")
+                    raise ValueError("Error en respuesta de API Media")
+
+                decoder = Base64FieldDecoder("base64", codec=self.codec)
+                async with open_sink(dest) as (write, path):
+                    async for chunk in response.aiter_bytes():
+                        data = decoder.feed(chunk)
+                        if data:
+                            await write(data)
+                    if not decoder.found:
+                        Logger.error("La API conectó pero no devolvió base64")
+                    await write(decoder.close())
+            finally:
+                await response.aclose()
+
+            metadata = decoder.metadata()
+            return MediaDownload(
+                size=decoder.decoded_size,
+                path=path,
+                mimetype=metadata.get("mimetype"),
+                file_name=metadata.get("fileName"),
+                metadata=metadata,
+            )
+
+        except Exception as e:
+            Logger.error(f"[Media Download] Error: {e}")
+            raise e
@@ -0,0 +1,81 @@
+import importlib.util
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from colorstreak import Logger
+
+
+# =========================
+# CONFIGURACIÓN DEL CLIENTE HTTP (ASÍNCRONO)
+# =========================
+@dataclass
+class AsyncHttpConfig:
+    """
+    Parámetros del `httpx.AsyncClient` que comparten `AsyncWhatsAppInstance` y `AsyncWhatsAppSender`.
+
+    - http2: multiplexa muchas peticiones sobre pocas conexiones (requiere `pip install httpx[http2]`).
+    - max_connections / max_keepalive_connections / keepalive_expiry: límites del pool.
+    - timeout: timeout por defecto en segundos; connect/read/write/pool_timeout lo sobrescriben por fase.
+    - verify: Evolution a veces usa certificados self-signed, por eso False por defecto.
+    - transport: transporte httpx propio (p.ej. `httpx.MockTransport` o un servidor local en benchmarks).
+      Si se pasa, http2/límites/verify deben configurarse en ese transporte.
+    """
+    http2: bool = False
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: Optional[float] = 5.0
+    timeout: float = 20.0
+    connect_timeout: Optional[float] = None
+    read_timeout: Optional[float] = None
+    write_timeout: Optional[float] = None
+    pool_timeout: Optional[float] = None
+    verify: bool = False
+    transport: Optional[httpx.AsyncBaseTransport] = None
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeouts(self) -> httpx.Timeout:
+        def _pick(value: Optional[float]) -> float:
+            return self.timeout if value is None else value
+
+        return httpx.Timeout(
+            connect=_pick(self.connect_timeout),
+            read=_pick(self.read_timeout),
+            write=_pick(self.write_timeout),
+            pool=_pick(self.pool_timeout),
+        )
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_async_client(base_url: str, headers: dict, config: AsyncHttpConfig) -> httpx.AsyncClient:
+    """Crea el cliente HTTP persistente según `config`."""
+    if config.transport is not None:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=config.timeouts(),
+            transport=config.transport,
+        )
+
+    http2 = config.http2
+    if http2 and not _http2_available():
+        Logger.warning("⚠️ HTTP/2 solicitado pero falta el paquete 'h2' (pip install httpx[http2]). Usando HTTP/1.1.")
+        http2 = False
+
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        timeout=config.timeouts(),
+        verify=config.verify,
+        http2=http2,
+        limits=config.limits(),
+    )
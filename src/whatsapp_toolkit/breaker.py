@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from typing import Literal
+
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class CircuitOpenError(Exception):
+    """Se lanza sin tocar la red cuando el circuito está abierto."""
+
+
+# =========================
+# CIRCUIT BREAKER
+# =========================
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de fallos, compartible entre senders.
+
+    - closed: todo pasa; se registran resultados en una ventana de `window` segundos.
+      Si hay al menos `min_calls` y la tasa de fallos llega a `failure_rate`, se abre.
+    - open: las peticiones fallan al instante (`allow()` = False) durante `open_timeout`.
+    - half_open: se dejan pasar hasta `half_open_probes` peticiones de prueba;
+      si una sale bien se cierra, si falla se vuelve a abrir.
+
+    Fallo = error de red/timeout o respuesta 5xx. Los 4xx no cuentan (la instancia responde).
+    Los senders registran un resultado por petición lógica (tras sus reintentos), no por intento.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        window: float = 30.0,
+        min_calls: int = 5,
+        open_timeout: float = 15.0,
+        half_open_probes: int = 1,
+    ):
+        self.failure_rate = failure_rate
+        self.window = window
+        self.min_calls = min_calls
+        self.open_timeout = open_timeout
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._state: CircuitState = "closed"
+        self._opened_at = 0.0
+        self._calls: deque[tuple[float, bool]] = deque()
+        self._probes: deque[float] = deque()
+        self.rejected = 0  # peticiones cortadas sin tocar la red
+
+    # --- ESTADO ---
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    @property
+    def retry_in(self) -> float:
+        """Segundos que faltan para el próximo intento de prueba (0 si no está abierto)."""
+        with self._lock:
+            if self._state != "open":
+                return 0.0
+            return max(0.0, self._opened_at + self.open_timeout - time.monotonic())
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == "open" and now - self._opened_at >= self.open_timeout:
+            self._state = "half_open"
+            self._probes.clear()
+
+    def _open(self, now: float) -> None:
+        self._state = "open"
+        self._opened_at = now
+        self._calls.clear()
+        self._probes.clear()
+
+    # --- API ---
+
+    def allow(self) -> bool:
+        """¿Puede salir esta petición? En half_open reserva un hueco de prueba."""
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+
+            if self._state == "closed":
+                return True
+
+            if self._state == "half_open":
+                # Una prueba que nunca reportó resultado (cancelada) libera su hueco tras open_timeout
+                while self._probes and now - self._probes[0] >= self.open_timeout:
+                    self._probes.popleft()
+                if len(self._probes) < self.half_open_probes:
+                    self._probes.append(now)
+                    return True
+
+            self.rejected += 1
+            return False
+
+    def check(self) -> None:
+        """Como `allow()` pero lanza `CircuitOpenError` si la petición no puede salir."""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuito abierto: reintento en {self.retry_in:.1f}s")
+
+    def check_not_open(self) -> None:
+        """Lanza `CircuitOpenError` si el circuito está abierto, sin reservar hueco de prueba (reintentos)."""
+        if self.state == "open":
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuito abierto: reintento en {self.retry_in:.1f}s")
+
+    def record_status(self, status_code: int) -> None:
+        """Resultado de una petición según su código HTTP: 5xx es fallo, el resto éxito."""
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == "half_open":
+                self._state = "closed"
+                self._calls.clear()
+                self._probes.clear()
+                return
+            self._record(now, True)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == "half_open":
+                self._open(now)
+                return
+            if self._state == "open":
+                return
+            self._record(now, False)
+
+            failures = sum(1 for _, ok in self._calls if not ok)
+            if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_rate:
+                self._open(now)
+
+    def _record(self, now: float, ok: bool) -> None:
+        self._calls.append((now, ok))
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._calls.clear()
+            self._probes.clear()
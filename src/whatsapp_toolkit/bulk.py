@@ -0,0 +1,102 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Optional, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+Items = Union[Iterable[T], AsyncIterable[T]]
+
+
+# =========================
+# MODELOS DE ENVÍO MASIVO
+# =========================
+@dataclass
+class OutboundMessage:
+    """
+    Mensaje saliente desacoplado del sender.
+    `kind` elige el método `send_<kind>` del sender y `params` son sus argumentos (sin el número).
+
+    Ej: OutboundMessage("5214771234567", "text", {"text": "Hola"})
+    """
+    number: str
+    kind: str = "text"
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class SendResult:
+    message: OutboundMessage
+    ok: bool
+    error: Optional[str] = None
+
+
+# =========================
+# UTILIDADES DE CONCURRENCIA
+# =========================
+async def aiter_items(items: Items[T]) -> AsyncIterator[T]:
+    """Recorre de forma uniforme un iterable síncrono o asíncrono."""
+    if hasattr(items, "__aiter__"):
+        async for item in items:  # type: ignore[union-attr]
+            yield item
+    else:
+        for item in items:  # type: ignore[union-attr]
+            yield item
+
+
+async def bounded_map(
+    items: Items[T],
+    func: Callable[[T], Awaitable[R]],
+    concurrency: int = 10,
+) -> AsyncIterator[tuple[T, Optional[R], Optional[BaseException]]]:
+    """
+    Ejecuta `func` sobre cada item con como máximo `concurrency` tareas en vuelo.
+
+    - Backpressure: solo se consume el siguiente item cuando hay un hueco libre,
+      así un generador de millones de números nunca se materializa en memoria.
+    - Streaming: cada resultado se entrega en cuanto termina (orden de finalización),
+      como tupla (item, resultado, excepción).
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency debe ser >= 1")
+
+    async def _run(item: T) -> tuple[T, Optional[R], Optional[BaseException]]:
+        try:
+            return item, await func(item), None
+        except Exception as e:
+            return item, None, e
+
+    iterator = aiter_items(items).__aiter__()
+    pending: set[asyncio.Task] = set()
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                pending.add(asyncio.create_task(_run(item)))
+
+            if not pending:
+                return
+
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Si el consumidor corta la iteración no dejamos tareas huérfanas
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def deliver(sender: Any, message: OutboundMessage) -> bool:
+    """Envía un `OutboundMessage` usando el método `send_<kind>` del sender."""
+    method = getattr(sender, f"send_{message.kind}", None)
+    if method is None:
+        raise ValueError(f"Tipo de mensaje no soportado: '{message.kind}'")
+    return bool(await method(message.number, **message.params))
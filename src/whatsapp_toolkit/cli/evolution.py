@@ -1,10 +1,5 @@
 import typer
 
-from whatsapp_toolkit.devtools import (
-    init_evolution,
-    stack_evolution,
-)
-
 from .utils import report_fatal_error, require_docker
 
 
@@ -30,6 +25,8 @@ def init(
     instance: str = typer.Option("main", "--instance", help="Instancia de Evolution"),
     webhook_url: str = typer.Option("http://host.docker.internal:8000/evolution/webhook", "--webhook-url", help="URL del webhook de Evolution"),
 ):
+    from whatsapp_toolkit.devtools import init_evolution
+
     init_evolution(
         path=path,
         overwrite=overwrite,
@@ -48,6 +45,8 @@ def up(
     build: bool = typer.Option(False, "--build", help="Forzar reconstrucción de imágenes de docker"),
     logs: bool = typer.Option(False, "--logs", "-l", help="Mostrar logs después de iniciar"),
 ):
+    from whatsapp_toolkit.devtools import stack_evolution
+
     require_docker()
     try:
         stack = stack_evolution(path=path)
@@ -65,6 +64,8 @@ def up(
 def stop(
     path: str = ".",
 ):
+    from whatsapp_toolkit.devtools import stack_evolution
+
     require_docker()
     try:
         stack = stack_evolution(path=path)
@@ -78,6 +79,8 @@ def down(
     path: str =  ".",
     volumes: bool = typer.Option(False, "-v", "--volumes", help="Elimina volumenes"),
 ):
+    from whatsapp_toolkit.devtools import stack_evolution
+
     require_docker()
     try:
         stack = stack_evolution(path=path)
@@ -92,6 +95,8 @@ def logs(
     services: str | None = typer.Option(None, "--services", help="Servicios (evolution-api | evolution-postgres | evolution-redis)"),
     follow: bool = typer.Option(True, "--follow/--no-follow", help="Seguir logs")
 ):
+    from whatsapp_toolkit.devtools import stack_evolution
+
     require_docker()
     try:
         args: list[str] = []
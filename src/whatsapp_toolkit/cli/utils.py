@@ -1,5 +1,4 @@
 import typer
-from whatsapp_toolkit.devtools import ensure_docker_daemon
 
 
 def report_fatal_error(message: str, code: int = 1):
@@ -10,6 +9,8 @@ def report_fatal_error(message: str, code: int = 1):
 
 def require_docker() -> None:
     """Valida Docker antes de ejecutar comandos que dependen de Compose."""
+    from whatsapp_toolkit.devtools import ensure_docker_daemon
+
     try:
         ensure_docker_daemon()
     except RuntimeError as e:
@@ -1,10 +1,5 @@
 import typer
 
-from whatsapp_toolkit.devtools import (
-    init_webhook,
-    stack_webhook,
-)
-
 from .utils import report_fatal_error, require_docker
 
 
@@ -28,6 +23,8 @@ def init(
     python_version: str = typer.Option("3.13.11", "--python-version", help="Versión de Python para el Webhook"),
     api_key: str = typer.Option("YOUR_WHATSAPP_API_KEY", "--api-key", help="API Key para el Webhook"),
 ):
+    from whatsapp_toolkit.devtools import init_webhook
+
     init_webhook(
         path=path,
         overwrite=overwrite,
@@ -43,6 +40,8 @@ def up(
     build: bool = typer.Option(False, "--build", help="Forzar reconstrucción de imágenes de docker"),
     logs: bool = typer.Option(False, "--logs", "-l", help="Mostrar logs después de iniciar"),
 ):
+    from whatsapp_toolkit.devtools import stack_webhook
+
     require_docker()
     try:
         stack = stack_webhook(path=path)
@@ -59,6 +58,8 @@ def up(
 def stop(
     path: str = ".",
 ):
+    from whatsapp_toolkit.devtools import stack_webhook
+
     require_docker()
     try:
         stack = stack_webhook(path=path)
@@ -71,6 +72,8 @@ def down(
     path: str = ".",
     volumes: bool = typer.Option(False, "-v", "--volumes", help="Elimina volumenes"),
 ):
+    from whatsapp_toolkit.devtools import stack_webhook
+
     require_docker()
     try:
         stack = stack_webhook(path=path)
@@ -84,6 +87,8 @@ def logs(
     path: str = ".",
     follow: bool = typer.Option(True, "--follow/--no-follow", help="Seguir logs")
 ):
+    from whatsapp_toolkit.devtools import stack_webhook
+
     require_docker()
     try:
         stack = stack_webhook(path=path)
@@ -6,9 +6,18 @@ from colorstreak import Logger as log
 from pymongo import MongoClient, errors
 from pymongo.collection import Collection
 
+from .breaker import CircuitBreaker
 from .instance import WhatsAppInstance
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, RetryStats
+from .lazy_groups import LazyGroups
 from .schemas import Groups
+from .codec import JsonCodec
+from .media_server import HostedSource, MediaServer
+from .prepared import PreparableSource, PreparedMedia, PreparedMediaCache
 from .sender import WhatsAppSender
+from .streaming import MediaSource
+from .transport import HttpConfig
 
 
 # ===============================
@@ -115,19 +124,48 @@ class BaseClient:
         raise NotImplementedError("Este método debe ser implementado en una subclase.")
 
 
-    def _get_groups(self, get_participants: bool = True, cache: bool = False) -> Groups:
+    @staticmethod
+    def _cached_snapshot(doc: Optional[dict[str, Any]]) -> Optional[tuple[list[dict], list]]:
+        """
+        (grupos crudos, fallos) del documento de caché, o None si no tiene la forma esperada.
+        Formato único: `{"groups": {"groups": [grupos tal como los devuelve la API], "fails": [...]}}`.
+        """
+        snapshot = (doc or {}).get("groups")
+        if not isinstance(snapshot, dict) or not isinstance(snapshot.get("groups"), list):
+            return None
+        fails = snapshot.get("fails")
+        return snapshot["groups"], fails if isinstance(fails, list) else []
+
+
+    @staticmethod
+    def _load_groups(raw: list[dict], fails: list, lazy: bool, workers: Optional[int]) -> Groups | LazyGroups:
+        """Carga grupos crudos: validando todo (`Groups`) o bajo demanda (`LazyGroups`)."""
+        if lazy:
+            return LazyGroups(raw, fails=[tuple(fail) for fail in fails])
+        grupos = Groups()
+        grupos.fails.extend(tuple(fail) for fail in fails)
+        grupos.upload_groups(raw, workers=workers)
+        return grupos
+
+
+    def _get_groups(
+        self,
+        get_participants: bool = True,
+        cache: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+    ) -> Groups | LazyGroups:
         key = self._key_groups(get_participants)
 
         if cache and self.cache:
             log.debug("[cache] Intentando cargar snapshot de grupos desde caché")
-            doc = self.cache.get(key)
-            if doc and "groups" in doc:
+            snapshot = self._cached_snapshot(self.cache.get(key))
+            if snapshot is not None:
                 try:
                     log.debug("[cache] Cargando snapshot de grupos desde caché")
-                    grupos: Groups = Groups.model_validate(doc.get("groups"))
-                    return grupos
+                    return self._load_groups(*snapshot, lazy=lazy, workers=workers)
                 except Exception as e:
-                    log.error(f"[cache] Error al validar snapshot de grupos desde caché: {e}")
+                    log.error(f"[cache] Error al cargar snapshot de grupos desde caché: {e}")
                     
             log.info("[cache] No se pudo cargar snapshot de grupos desde caché")
 
@@ -136,17 +174,17 @@ class BaseClient:
         
         if raw is None:
             log.error("No se pudieron obtener los datos de grupos de la API")
-            return Groups()
+            return LazyGroups() if lazy else Groups()
         
-        grupos = Groups()
-        grupos.upload_groups(raw)
+        grupos = self._load_groups(raw, [], lazy=lazy, workers=workers)
         log.debug("Datos de grupos obtenidos de la API")
         if cache and self.cache:
+            # Se guardan los grupos crudos: cada modo de carga los valida a su manera (y los inválidos van a `fails`)
             self.cache.set(key, {
                 "key": key,
                 "created_at": datetime.now(timezone.utc),
                 "source": "whatsapp_api",
-                "groups": grupos.model_dump(),
+                "groups": {"groups": raw, "fails": []},
             })
             log.debug("Snapshot de grupos guardado en caché")
 
@@ -183,19 +221,50 @@ class BaseClient:
 
 
 class WhatsappClient(BaseClient):
-    def __init__(self, api_key: str, server_url: str, instance_name: str = "con", cache: Optional[MongoCacheBackend] = None):
+    def __init__(
+        self,
+        api_key: str,
+        server_url: str,
+        instance_name: str = "con",
+        cache: Optional[MongoCacheBackend] = None,
+        http_config: Optional[HttpConfig] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        media_server: Optional[MediaServer] = None,
+        json_codec: Optional[JsonCodec] = None,
+    ):
         super().__init__(instance_name, cache)
-        self._instance = WhatsAppInstance(api_key, instance_name, server_url)
+        self._instance = WhatsAppInstance(api_key, instance_name, server_url, http_config=http_config)
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._media_server = media_server
+        self._json_codec = json_codec
+        self._prepared = PreparedMediaCache(codec=json_codec)
         self._sender: Optional[WhatsAppSender] = None
         self._auto_initialize_sender()
 
     def _auto_initialize_sender(self):
         """Solo asigna sender si la instancia está enlazada a WhatsApp."""
         info = WhatsAppSender.get_instance_info(
-            self._instance.api_key, self._instance.name_instance, self._instance.server_url
+            self._instance.api_key, self._instance.name_instance, self._instance.server_url,
+            session=self._instance.http,
         )
         if info.get("ownerJid"):  # <- si tiene owner, significa que ya está enlazada
-            self._sender = WhatsAppSender(self._instance)
+            self._sender = WhatsAppSender(
+                self._instance,
+                rate_limiter=self._rate_limiter,
+                retry_policy=self._retry_policy,
+                circuit_breaker=self._circuit_breaker,
+                media_server=self._media_server,
+                json_codec=self._json_codec,
+            )
+
+    @property
+    def retry_stats(self) -> Optional[RetryStats]:
+        """Contadores de intentos/reintentos del sender (None si no hay sender)."""
+        return self._sender.retry_stats if self._sender else None
 
     # def ensure_connected(self, retries: int = 3, delay: int = 30) -> bool:
     #     """
@@ -275,6 +344,55 @@ class WhatsappClient(BaseClient):
         return sender.send_audio(number, audio_b64, delay, quoted=quoted)
 
 
+    def prepare_media(self, source: PreparableSource, filename: Optional[str] = None, mimetype: Optional[str] = None, mediatype: str = "document") -> PreparedMedia:
+        """Codifica la media una vez (caché por ruta + mtime + tamaño, o sha256 si son bytes) para reutilizarla con `send_prepared`."""
+        return self._prepared.prepare(source, filename, mimetype, mediatype)
+
+
+    def send_prepared(self, number: str, media: PreparedMedia, caption: str = "", quoted: dict | None = None):
+        sender = self._sender
+        if sender is None:
+            return False
+        return sender.send_prepared(number, media, caption, quoted=quoted)
+
+
+    def send_media_hosted(self, number: str, source: HostedSource, filename: Optional[str] = None, caption: str = "", mediatype: str = "document", mimetype: Optional[str] = None, quoted: dict | None = None):
+        """Envía media por URL temporal del MediaServer (requiere `media_server=`)."""
+        sender = self._sender
+        if sender is None:
+            return False
+        return sender.send_media_hosted(number, source, filename, caption, mediatype, mimetype, quoted=quoted)
+
+
+    def send_audio_hosted(self, number: str, source: HostedSource, delay: int = 0, quoted: dict | None = None):
+        sender = self._sender
+        if sender is None:
+            return False
+        return sender.send_audio_hosted(number, source, delay, quoted=quoted)
+
+
+    def send_media_file(self, number: str, source: MediaSource, filename: Optional[str] = None, caption: str = "", mediatype: str = "document", mimetype: str = "application/pdf", quoted: dict | None = None):
+        """Envía media desde ruta/archivo/bytes sin materializar el base64 en memoria."""
+        sender = self._sender
+        if sender is None:
+            return False
+        return sender.send_media_file(number, source, filename, caption, mediatype, mimetype, quoted=quoted)
+
+
+    def send_audio_file(self, number: str, source: MediaSource, delay: int = 0, quoted: dict | None = None):
+        sender = self._sender
+        if sender is None:
+            return False
+        return sender.send_audio_file(number, source, delay, quoted=quoted)
+
+
+    def send_sticker_file(self, number: str, source: MediaSource, delay: int = 0, quoted: dict | None = None):
+        sender = self._sender
+        if sender is None:
+            return False
+        return sender.send_sticker_file(number, source, delay, quoted=quoted)
+
+
     def send_reaction(self, remote_jid: str, message_id: str, reaction: str, from_me: bool = False, participant: str | None = None):
         sender = self._sender
         if sender is None:
@@ -299,13 +417,24 @@ class WhatsappClient(BaseClient):
         return response
     
     
-    def get_groups_typed(self, get_participants: bool = True, cache: bool = False) -> Groups | None:
+    def get_groups_typed(
+        self,
+        get_participants: bool = True,
+        cache: bool = False,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+    ) -> Groups | LazyGroups | None:
         """
         Obtiene los grupos como una instancia de Groups.
         
         Si `cache` es True, intenta cargar desde la caché antes de llamar a la API.
+        Si `lazy` es True devuelve un `LazyGroups`: cada grupo se valida solo cuando se accede a él.
+        `workers` > 1 valida en paralelo (solo en intérpretes free-threaded, ver `Groups.upload_groups`).
         """
-        groups: Groups = self._get_groups(get_participants=get_participants, cache=cache)
+        if workers is not None and workers > 1 and lazy:
+            # Con GIL avisa `Groups.upload_groups`
+            log.warning(f"[groups] workers={workers} no tiene efecto: lazy=True no valida al cargar; la carga es secuencial")
+        groups = self._get_groups(get_participants=get_participants, cache=cache, lazy=lazy, workers=workers)
         if len(groups) == 0:
             return None
         return groups
@@ -320,3 +449,7 @@ class WhatsappClient(BaseClient):
     def connect_instance_qr(self):
         return self._instance.connect_instance_qr()
 
+    def close(self):
+        """Libera las conexiones del pool HTTP compartido."""
+        self._instance.close()
+
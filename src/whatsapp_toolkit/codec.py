@@ -0,0 +1,67 @@
+import importlib.util
+import json
+from typing import Any, Optional, Union
+
+JsonInput = Union[bytes, bytearray, memoryview, str]
+
+
+# =========================
+# CODECS JSON (payloads salientes y respuestas)
+# =========================
+class JsonCodec:
+    """
+    Codec JSON de la librería estándar. Salida compacta en UTF-8 (sin escapar acentos/emojis),
+    igual a lo que produce orjson, para que ambos codecs generen los mismos bytes.
+    """
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data: JsonInput) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """Codec acelerado con orjson (`pip install whatsapp-toolkit[fast]`)."""
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def loads(self, data: JsonInput) -> Any:
+        return self._orjson.loads(data)
+
+
+_CODECS: dict[str, type[JsonCodec]] = {"json": JsonCodec, "orjson": OrjsonCodec}
+_default: Optional[JsonCodec] = None
+
+
+def orjson_available() -> bool:
+    return importlib.util.find_spec("orjson") is not None
+
+
+def get_codec(name: str = "auto") -> JsonCodec:
+    """
+    Devuelve un codec por nombre: "json", "orjson" o "auto" (orjson si está instalado, si no stdlib).
+    """
+    if name == "auto":
+        return OrjsonCodec() if orjson_available() else JsonCodec()
+    if name not in _CODECS:
+        raise ValueError(f"Codec JSON desconocido: '{name}' (opciones: auto, {', '.join(_CODECS)})")
+    return _CODECS[name]()
+
+
+def default_codec() -> JsonCodec:
+    """Codec compartido por defecto (se resuelve una vez por proceso)."""
+    global _default
+    if _default is None:
+        _default = get_codec("auto")
+    return _default
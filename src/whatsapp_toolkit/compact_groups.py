@@ -0,0 +1,379 @@
+import sys
+from array import array
+from concurrent.futures import Executor
+from typing import Any, Iterable, Optional
+
+from .group_index import GroupIndex
+from .parallel_ingest import map_chunks, should_parallelize
+from .schemas import GroupBase, GroupFail, GroupQueries, Groups, Participant, validate_groups
+
+# Códigos de dominio de JidColumn: 0 = None, 255 = JID irregular guardado como string
+_NONE = 0
+_IRREGULAR = 255
+_MAX_NUMBER_DIGITS = 19  # cabe en un uint64
+
+# Bits de las banderas booleanas de un grupo
+_RESTRICT = 1
+_ANNOUNCE = 2
+_IS_COMMUNITY = 4
+_IS_COMMUNITY_ANNOUNCE = 8
+
+
+# =============================
+# COLUMNAS
+# =============================
+class JidColumn:
+    """
+    Columna de JIDs opcionales. Los JIDs de la forma "<número>@<dominio>" (LID y teléfono, casi todos)
+    se guardan como un uint64 + un byte con el código del dominio; el resto se guarda como string internado.
+    """
+
+    __slots__ = ("numbers", "domains", "domain_names", "domain_codes", "irregular")
+
+    def __init__(self):
+        self.numbers = array("Q")
+        self.domains = bytearray()
+        self.domain_names: list[Optional[str]] = [None]
+        self.domain_codes: dict[str, int] = {}
+        self.irregular: dict[int, str] = {}
+
+    def _domain_code(self, domain: str) -> int:
+        code = self.domain_codes.get(domain)
+        if code is None and len(self.domain_names) < _IRREGULAR:
+            code = self.domain_codes[domain] = len(self.domain_names)
+            self.domain_names.append(sys.intern(domain))
+        return code or _IRREGULAR
+
+    def append(self, jid: Optional[str]) -> None:
+        if jid is None:
+            self.numbers.append(0)
+            self.domains.append(_NONE)
+            return
+        user, sep, domain = jid.partition("@")
+        code = _IRREGULAR
+        # Sin ceros a la izquierda: el número debe reconstruir exactamente el mismo texto
+        if sep and user.isascii() and user.isdigit() and user[0] != "0" and len(user) <= _MAX_NUMBER_DIGITS:
+            code = self._domain_code(domain)
+        if code == _IRREGULAR:
+            self.irregular[len(self.numbers)] = sys.intern(jid)
+            self.numbers.append(0)
+        else:
+            self.numbers.append(int(user))
+        self.domains.append(code)
+
+    def extend(self, other: "JidColumn") -> None:
+        offset = len(self.numbers)
+        # Los códigos de dominio de `other` se traducen a los de esta columna
+        table = bytearray(range(256))
+        for code, domain in enumerate(other.domain_names[1:], 1):
+            table[code] = self._domain_code(domain)
+        self.numbers.extend(other.numbers)
+        self.domains.extend(other.domains.translate(table))
+        # Un dominio que ya no cabe deja números sin texto: esos se guardan como string
+        if _IRREGULAR in table[1:len(other.domain_names)]:
+            for position, code in enumerate(self.domains[offset:], offset):
+                if code == _IRREGULAR and position - offset not in other.irregular:
+                    self.irregular[position] = other[position - offset]
+        for position, jid in other.irregular.items():
+            self.irregular[position + offset] = jid
+
+    def __getitem__(self, position: int) -> Optional[str]:
+        code = self.domains[position]
+        if code == _NONE:
+            return None
+        if code == _IRREGULAR:
+            return self.irregular[position]
+        return f"{self.numbers[position]}@{self.domain_names[code]}"
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+
+class Bitset:
+    """Banderas booleanas empaquetadas de a 8 por byte."""
+
+    __slots__ = ("bits", "size")
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.size = 0
+
+    def append(self, flag: bool) -> None:
+        if self.size % 8 == 0:
+            self.bits.append(0)
+        if flag:
+            self.bits[-1] |= 1 << (self.size % 8)
+        self.size += 1
+
+    def extend(self, other: "Bitset") -> None:
+        if self.size % 8 == 0:
+            self.bits.extend(other.bits)
+        else:
+            combined = int.from_bytes(self.bits, "little") | (int.from_bytes(other.bits, "little") << self.size)
+            self.bits = bytearray(combined.to_bytes((self.size + other.size + 7) // 8, "little"))
+        self.size += other.size
+
+    def __getitem__(self, position: int) -> bool:
+        return bool(self.bits[position >> 3] & (1 << (position & 7)))
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class ParticipantColumns:
+    """Participantes de todo el snapshot en columnas; cada grupo referencia un rango contiguo."""
+
+    __slots__ = ("ids", "phone_numbers", "admins", "superadmins")
+
+    def __init__(self):
+        self.ids = JidColumn()
+        self.phone_numbers = JidColumn()
+        self.admins = Bitset()
+        self.superadmins = Bitset()
+
+    def append(self, participant: Participant) -> None:
+        self.ids.append(participant.id)
+        self.phone_numbers.append(participant.phoneNumber)
+        self.admins.append(participant.admin == "admin")
+        self.superadmins.append(participant.admin == "superadmin")
+
+    def extend(self, other: "ParticipantColumns") -> None:
+        self.ids.extend(other.ids)
+        self.phone_numbers.extend(other.phone_numbers)
+        self.admins.extend(other.admins)
+        self.superadmins.extend(other.superadmins)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+# =============================
+# VISTAS DE SOLO LECTURA
+# =============================
+class CompactParticipant:
+    """Vista de un participante dentro de `ParticipantColumns` (misma API de lectura que `Participant`)."""
+
+    __slots__ = ("_columns", "_position")
+
+    def __init__(self, columns: ParticipantColumns, position: int):
+        self._columns = columns
+        self._position = position
+
+    @property
+    def id(self) -> str:
+        return self._columns.ids[self._position]
+
+    @property
+    def phoneNumber(self) -> Optional[str]:
+        return self._columns.phone_numbers[self._position]
+
+    @property
+    def admin(self) -> Optional[str]:
+        if self._columns.superadmins[self._position]:
+            return "superadmin"
+        if self._columns.admins[self._position]:
+            return "admin"
+        return None
+
+    is_admin = Participant.is_admin
+    is_superadmin = Participant.is_superadmin
+
+    def model_dump(self) -> dict[str, Any]:
+        return {"id": self.id, "admin": self.admin, "phoneNumber": self.phoneNumber}
+
+    def to_model(self) -> Participant:
+        return Participant.model_validate(self.model_dump())
+
+    def __repr__(self) -> str:
+        return f"CompactParticipant(id={self.id!r}, admin={self.admin!r}, phoneNumber={self.phoneNumber!r})"
+
+
+class CompactGroup:
+    """
+    Grupo con `__slots__`: strings repetidos internados, booleanos como bits y participantes
+    como rango en las columnas del snapshot. Misma API de lectura que `GroupBase`.
+    """
+
+    __slots__ = (
+        "id", "subject", "subjectTime", "pictureUrl", "size", "creation", "_flags",
+        "owner", "subjectOwner", "desc", "descId", "linkedParent",
+        "_columns", "_start", "_count",
+    )
+
+    def __init__(self, group: GroupBase, columns: ParticipantColumns):
+        self.id = sys.intern(group.id)
+        self.subject = group.subject
+        self.subjectTime = group.subjectTime
+        self.pictureUrl = group.pictureUrl
+        self.size = group.size
+        self.creation = group.creation
+        self._flags = (
+            (_RESTRICT if group.restrict else 0)
+            | (_ANNOUNCE if group.announce else 0)
+            | (_IS_COMMUNITY if group.isCommunity else 0)
+            | (_IS_COMMUNITY_ANNOUNCE if group.isCommunityAnnounce else 0)
+        )
+        self.owner = _intern(group.owner)
+        self.subjectOwner = _intern(group.subjectOwner)
+        self.desc = group.desc
+        self.descId = group.descId
+        self.linkedParent = _intern(group.linkedParent)
+
+        self._columns = columns
+        self._start = len(columns)
+        self._count = len(group.participants)
+        for participant in group.participants:
+            columns.append(participant)
+
+    @property
+    def restrict(self) -> bool:
+        return bool(self._flags & _RESTRICT)
+
+    @property
+    def announce(self) -> bool:
+        return bool(self._flags & _ANNOUNCE)
+
+    @property
+    def isCommunity(self) -> bool:
+        return bool(self._flags & _IS_COMMUNITY)
+
+    @property
+    def isCommunityAnnounce(self) -> bool:
+        return bool(self._flags & _IS_COMMUNITY_ANNOUNCE)
+
+    @property
+    def participants(self) -> list[CompactParticipant]:
+        """Vistas nuevas en cada acceso: guarda la lista si vas a recorrerla varias veces."""
+        return [CompactParticipant(self._columns, position) for position in range(self._start, self._start + self._count)]
+
+    kind = GroupBase.kind
+    __str__ = GroupBase.__str__
+
+    def model_dump(self) -> dict[str, Any]:
+        data = {name: getattr(self, name) for name in GroupBase.model_fields}
+        data["participants"] = [participant.model_dump() for participant in self.participants]
+        return data
+
+    def to_model(self) -> GroupBase:
+        return GroupBase.model_validate(self.model_dump())
+
+    def __repr__(self) -> str:
+        return f"CompactGroup(id={self.id!r}, subject={self.subject!r}, participants={self._count})"
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+# =============================
+# SNAPSHOT COMPACTO
+# =============================
+class CompactGroups(GroupQueries):
+    """
+    Alternativa a `Groups` para snapshots grandes que se mantienen en memoria (uno por worker):
+    misma API de lectura (`get_group_by_id`, `search_group`, `groups_of`, ...) con una fracción de la RAM.
+
+    - Los grupos se validan igual que en `Groups` (mismos `fails`) y luego se compactan.
+    - Es de solo lectura: para editar, `to_groups()` devuelve el `Groups` equivalente.
+    - Los índices se construyen en la primera consulta que los usa, no al cargar: id/subject son dicts aparte
+      (como en `LazyGroups`); el de búsqueda y el de participantes se construyen por separado y se congelan
+      (`GroupIndex.freeze`), con las posiciones de cada token/miembro en un `array`.
+    - `upload_groups(..., workers=N)` valida y compacta por trozos en un pool de procesos (hilos si el
+      intérprete es free-threaded): cada worker devuelve columnas, baratas de serializar, y se concatenan en orden.
+    """
+
+    def __init__(self, groups_raw: Optional[list[dict[str, Any]]] = None):
+        self.groups: list[CompactGroup] = []
+        self.fails: list[GroupFail] = []
+        self.participants = ParticipantColumns()
+        self._by_id: Optional[dict[str, CompactGroup]] = None
+        self._by_subject: Optional[dict[Optional[str], CompactGroup]] = None
+        self._search = GroupIndex()
+        self._members = GroupIndex()
+        if groups_raw:
+            self.upload_groups(groups_raw)
+
+    @classmethod
+    def from_groups(cls, groups: Groups) -> "CompactGroups":
+        compact = cls()
+        compact.extend(groups.groups)
+        compact.fails.extend(groups.fails)
+        return compact
+
+    def upload_groups(
+        self,
+        groups_raw: list[dict[str, Any]],
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        if executor is not None or should_parallelize(groups_raw, workers):
+            for chunk in map_chunks(CompactGroups, groups_raw, workers, executor):
+                self._absorb(chunk)
+            return
+        groups, fails = validate_groups(groups_raw)
+        self.extend(groups)
+        self.fails.extend(fails)
+
+    # --- ÍNDICES (bajo demanda) ---
+
+    def get_group_by_id(self, group_id: str) -> Optional[CompactGroup]:
+        if self._by_id is None:
+            self._by_id = {}
+            for group in self.groups:
+                self._by_id.setdefault(group.id, group)
+        return self._by_id.get(group_id)
+
+    def get_group_by_subject(self, subject: str) -> Optional[CompactGroup]:
+        if self._by_subject is None:
+            self._by_subject = {}
+            for group in self.groups:
+                self._by_subject.setdefault(group.subject, group)
+        return self._by_subject.get(subject)
+
+    def _members_of(self, group: CompactGroup) -> Iterable[tuple[str, Optional[str]]]:
+        ids, phone_numbers = self.participants.ids, self.participants.phone_numbers
+        return ((ids[position], phone_numbers[position]) for position in range(group._start, group._start + group._count))
+
+    def _search_index(self) -> GroupIndex:
+        if self._search.is_stale(self.groups):
+            self._search.clear(self.groups)
+            for group in self.groups:
+                self._search.add_record(group, None, group.subject, ())
+            self._search.freeze()
+        return self._search
+
+    def _member_index(self) -> GroupIndex:
+        if self._members.is_stale(self.groups):
+            self._members.clear(self.groups)
+            for group in self.groups:
+                self._members.add_record(group, None, None, self._members_of(group))
+            self._members.freeze()
+        return self._members
+
+    def reindex(self) -> None:
+        self._by_id = self._by_subject = None
+        self._search.clear()
+        self._members.clear()
+
+    def _absorb(self, chunk: "CompactGroups") -> None:
+        """Agrega al final un snapshot construido aparte (p.ej. en otro proceso). `chunk` queda inservible."""
+        offset = len(self.participants)
+        self.participants.extend(chunk.participants)
+        for group in chunk.groups:
+            group._columns = self.participants
+            group._start += offset
+        self.groups.extend(chunk.groups)
+        self.fails.extend(chunk.fails)
+        self._by_id = self._by_subject = None
+
+    def extend(self, groups: Iterable[GroupBase]) -> None:
+        self.groups.extend(CompactGroup(group, self.participants) for group in groups)
+        self._by_id = self._by_subject = None
+
+    def to_groups(self) -> Groups:
+        return Groups(groups=[group.to_model() for group in self.groups], fails=list(self.fails))
+
+    def __str__(self) -> str:
+        texto = f"CompactGroups: {len(self.groups)} grupos cargados ({len(self.participants)} participantes).\n"
+        texto += f"Fails: {len(self.fails)} grupos con errores de validación.\n"
+        return texto
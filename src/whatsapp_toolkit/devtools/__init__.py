@@ -1,3 +1,20 @@
-from .evolution import (init_evolution, stack_evolution)
-from .webhook import (init_webhook, stack_webhook)
-from .utils import ensure_docker_daemon
\ No newline at end of file
+from importlib import import_module
+
+# Carga perezosa: `wtk evo ...` no importa el stack de webhook (ni viceversa)
+_LAZY_EXPORTS = {
+    "init_evolution": ".evolution",
+    "stack_evolution": ".evolution",
+    "init_webhook": ".webhook",
+    "stack_webhook": ".webhook",
+    "ensure_docker_daemon": ".utils",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        value = getattr(import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
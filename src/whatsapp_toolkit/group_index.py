@@ -0,0 +1,342 @@
+import heapq
+from bisect import bisect_left
+import re
+import unicodedata
+from array import array
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional
+
+if TYPE_CHECKING:
+    from .schemas import GroupBase
+
+_NO_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Puntajes de búsqueda por token de la consulta
+SCORE_EXACT = 3.0
+SCORE_SUBSTRING = 2.0
+SCORE_TYPO = 1.5
+SCORE_PHRASE = 2.0
+
+_MAX_NUMBER_DIGITS = 19  # cabe en un uint64
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin acentos ("León" -> "leon") y con la puntuación como espacios."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NO_ALNUM.sub(" ", folded).strip()
+
+
+def member_key(jid: str) -> str:
+    """Clave de un participante: la parte de usuario del JID, sin dominio ni dispositivo ("521...:3@s.whatsapp.net" -> "521...")."""
+    return jid.split("@", 1)[0].split(":", 1)[0]
+
+
+def _number(key: str) -> Optional[int]:
+    """Clave como entero si el texto se puede reconstruir igual (solo dígitos, sin ceros a la izquierda)."""
+    if key.isascii() and key.isdigit() and key[0] != "0" and len(key) <= _MAX_NUMBER_DIGITS:
+        return int(key)
+    return None
+
+
+def _ngrams(token: str, n: int = 3) -> set[str]:
+    padded = f" {token} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def _max_typos(token: str) -> int:
+    if len(token) <= 2:
+        return 0
+    return 1 if len(token) <= 5 else 2
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein con corte: devuelve `limit + 1` en cuanto se sabe que lo supera."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+# =============================
+# ÍNDICE DE PARTICIPANTES CONGELADO
+# =============================
+class MemberTable:
+    """
+    Índice inverso de participantes en arrays, para snapshots de solo lectura:
+
+    - claves numéricas (casi todas) en un `array("Q")` ordenado que se busca con bisect; el resto en un dict.
+    - cada clave (miembro o alias) apunta al slot de su miembro; las posiciones de todos los miembros van
+      concatenadas en un `array("I")` y `offsets[slot]:offsets[slot + 1]` es el rango de cada uno.
+    """
+
+    __slots__ = ("numbers", "number_slots", "other", "root_numbers", "root_other", "offsets", "positions")
+
+    def __init__(self, member_groups: dict[str, set[int]], roots: dict[str, str]):
+        """`member_groups`: miembro -> posiciones; `roots`: toda clave conocida -> su miembro."""
+        slots = {member: slot for slot, member in enumerate(member_groups)}
+        self.offsets = array("I", [0])
+        self.positions = array("I")
+        self.root_numbers = array("Q")
+        self.root_other: dict[int, str] = {}
+        for slot, (member, positions) in enumerate(member_groups.items()):
+            self.positions.extend(sorted(positions))
+            self.offsets.append(len(self.positions))
+            number = _number(member)
+            self.root_numbers.append(number or 0)
+            if number is None:
+                self.root_other[slot] = member
+
+        numbered = []
+        self.other: dict[str, int] = {}
+        for key, member in roots.items():
+            number = _number(key)
+            if number is None:
+                self.other[key] = slots[member]
+            else:
+                numbered.append((number, slots[member]))
+        numbered.sort()
+        self.numbers = array("Q", (number for number, _ in numbered))
+        self.number_slots = array("I", (slot for _, slot in numbered))
+
+    def _slot(self, key: str) -> Optional[int]:
+        number = _number(key)
+        if number is None:
+            return self.other.get(key)
+        i = bisect_left(self.numbers, number)
+        if i < len(self.numbers) and self.numbers[i] == number:
+            return self.number_slots[i]
+        return None
+
+    def positions_of(self, key: str) -> set[int]:
+        slot = self._slot(key)
+        if slot is None:
+            return set()
+        return set(self.positions[self.offsets[slot]:self.offsets[slot + 1]])
+
+    def counts(self) -> Iterator[tuple[str, int]]:
+        """(miembro, cantidad de grupos) de cada miembro."""
+        for slot, number in enumerate(self.root_numbers):
+            member = self.root_other[slot] if slot in self.root_other else str(number)
+            yield member, self.offsets[slot + 1] - self.offsets[slot]
+
+
+# =============================
+# ÍNDICES DE UN SNAPSHOT DE GRUPOS
+# =============================
+class GroupIndex:
+    """
+    Índices sobre la lista de grupos de un `Groups`:
+
+    - hash por id y por subject -> grupo (ante repetidos gana el primero, como el recorrido lineal).
+    - invertido de búsqueda: token normalizado (sin acentos) -> posiciones de grupos,
+      y trigramas -> tokens del vocabulario para coincidencias parciales y con errores de tipeo.
+    - inverso de participantes: miembro -> posiciones de sus grupos. Un grupo puede listar a la misma persona
+      por LID (con `phoneNumber`) y otro solo por su JID de teléfono: ambas claves se unen (union-find) en un
+      único miembro, así que se puede consultar por cualquiera y el resultado no depende del orden de carga.
+
+    Recuerda qué lista indexó y cuántos grupos tenía: si la lista se reemplaza o cambia de tamaño
+    el índice queda obsoleto y `Groups` lo reconstruye en la siguiente consulta.
+
+    Las consultas devuelven el "registro" indexado: el grupo mismo con `add`, o lo que se pase a
+    `add_record` (p.ej. la posición de un grupo aún sin validar en `LazyGroups`).
+
+    `freeze()` pasa las posiciones a arrays ordenados para snapshots de solo lectura (`CompactGroups`).
+    """
+
+    def __init__(self):
+        self.source: Optional[list] = None
+        self.size = 0
+        self.by_id: dict[str, Any] = {}
+        self.by_subject: dict[str, Any] = {}
+        self.groups: list[Any] = []
+        self.normalized_subjects: list[str] = []
+        self.postings: dict[str, set[int]] = {}
+        self.gram_tokens: dict[str, set[str]] = {}
+        self.member_groups: dict[str, set[int]] = {}
+        self.member_parent: dict[str, str] = {}
+        self.lid_members: set[str] = set()
+        self.member_table: Optional[MemberTable] = None
+
+    def is_stale(self, groups: list[Any]) -> bool:
+        return groups is not self.source or len(groups) != self.size
+
+    def rebuild(self, groups: list["GroupBase"]) -> None:
+        self.clear(groups)
+        for group in groups:
+            self.add(group)
+
+    def clear(self, source: Optional[list] = None) -> None:
+        self.source = source
+        self.size = 0
+        self.by_id = {}
+        self.by_subject = {}
+        self.groups = []
+        self.normalized_subjects = []
+        self.postings = {}
+        self.gram_tokens = {}
+        self.member_groups = {}
+        self.member_parent = {}
+        self.lid_members = set()
+        self.member_table = None
+
+    def freeze(self) -> None:
+        """
+        Guarda las posiciones de búsqueda como `array("I")` ordenados (4 bytes por posición en vez de un set)
+        y los participantes en un `MemberTable`. Tras congelarlo solo admite consultas.
+        """
+        self.postings = {token: array("I", sorted(positions)) for token, positions in self.postings.items()}
+        self.gram_tokens = {gram: tuple(tokens) for gram, tokens in self.gram_tokens.items()}
+        self.member_table = MemberTable(self.member_groups, {key: self._find(key) for key in self.member_parent})
+        self.member_groups = {}
+        self.member_parent = {}
+        self.lid_members = set()
+
+    def add(self, group: "GroupBase") -> None:
+        members = ((participant.id, participant.phoneNumber) for participant in group.participants)
+        self.add_record(group, group.id, group.subject, members)
+
+    def add_record(
+        self,
+        record: Any,
+        group_id: Optional[str],
+        subject: Optional[str],
+        members: Iterable[tuple[str, Optional[str]]],
+    ) -> None:
+        """Indexa `record` con sus campos ya extraídos; `members` son pares (id, phoneNumber)."""
+        position = len(self.groups)
+        self.groups.append(record)
+        self.by_id.setdefault(group_id, record)
+        self.by_subject.setdefault(subject, record)
+
+        normalized = normalize_text(subject or "")
+        self.normalized_subjects.append(normalized)
+        for token in set(normalized.split()):
+            positions = self.postings.get(token)
+            if positions is None:
+                positions = self.postings[token] = set()
+                for gram in _ngrams(token):
+                    self.gram_tokens.setdefault(gram, set()).add(token)
+            positions.add(position)
+
+        for participant_id, phone_number in members:
+            member = self._member(participant_id)
+            if phone_number:
+                member = self._union(member, self._member(phone_number))
+            self.member_groups[member].add(position)
+        self.size += 1
+
+    # --- PARTICIPANTES ---
+
+    def _find(self, key: str) -> str:
+        parent = self.member_parent
+        root = key
+        while parent[root] != root:
+            root = parent[root]
+        while parent[key] != root:  # compresión de caminos
+            parent[key], key = root, parent[key]
+        return root
+
+    def _member(self, jid: str) -> str:
+        """Miembro (raíz) de un JID, creándolo si es nuevo."""
+        key = member_key(jid)
+        if key not in self.member_parent:
+            self.member_parent[key] = key
+            self.member_groups[key] = set()
+            if jid.endswith("@lid"):
+                self.lid_members.add(key)
+            return key
+        return self._find(key)
+
+    def _union(self, a: str, b: str) -> str:
+        """Une dos miembros. Representante: el LID si lo hay, si no el menor; así no depende del orden."""
+        if a == b:
+            return a
+        root, other = sorted((a, b), key=lambda key: (key not in self.lid_members, key))
+        self.member_parent[other] = root
+        self.member_groups[root] |= self.member_groups.pop(other)
+        return root
+
+    def positions_of(self, participant: str) -> set[int]:
+        key = member_key(participant)
+        if self.member_table is not None:
+            return self.member_table.positions_of(key)
+        if key not in self.member_parent:
+            return set()
+        return set(self.member_groups[self._find(key)])
+
+    def member_counts(self) -> Iterator[tuple[str, int]]:
+        """(miembro, cantidad de grupos) de cada miembro."""
+        if self.member_table is not None:
+            return self.member_table.counts()
+        return ((member, len(positions)) for member, positions in self.member_groups.items())
+
+    def groups_at(self, positions: Iterable[int]) -> list[Any]:
+        return [self.groups[position] for position in sorted(positions)]
+
+    # --- BÚSQUEDA ---
+
+    def _candidate_tokens(self, query_token: str) -> Iterable[str]:
+        if len(query_token) < 3:
+            # Con tan pocas letras los trigramas no discriminan: se revisa el vocabulario
+            return self.postings.keys()
+        grams = _ngrams(query_token)
+        # Sin relleno: cualquier token que contenga la consulta comparte estos trigramas internos
+        grams |= {query_token[i:i + 3] for i in range(len(query_token) - 2)}
+        candidates: set[str] = set()
+        for gram in grams:
+            candidates.update(self.gram_tokens.get(gram, ()))
+        return candidates
+
+    def _token_score(self, query_token: str, token: str) -> float:
+        if token == query_token:
+            return SCORE_EXACT
+        if query_token in token:
+            return SCORE_SUBSTRING
+        limit = _max_typos(query_token)
+        if limit:
+            distance = _edit_distance(query_token, token, limit)
+            if distance <= limit:
+                return SCORE_TYPO / distance
+        return 0.0
+
+    def search(self, query: str, limit: int = 10) -> list[Any]:
+        """Búsqueda rankeada: exacto > contiene > con errores de tipeo, +bonus si contiene la frase."""
+        normalized_query = normalize_text(query)
+        query_tokens = list(dict.fromkeys(normalized_query.split()))
+        if not query_tokens:
+            return []
+
+        scores: dict[int, float] = {}
+        for query_token in query_tokens:
+            matches = []
+            for token in self._candidate_tokens(query_token):
+                score = self._token_score(query_token, token)
+                if score:
+                    matches.append((score, token))
+            # De mayor a menor puntaje: cada grupo se queda con su mejor coincidencia (operaciones de set en C)
+            best: dict[int, float] = {}
+            for score, token in sorted(matches, reverse=True):
+                best.update(dict.fromkeys(self.postings[token] - best.keys(), score))
+            if not scores:
+                scores = best
+                continue
+            for position, score in best.items():
+                scores[position] = scores.get(position, 0.0) + score
+
+        # Con una sola palabra la frase es la palabra misma: el bonus no cambiaría el orden
+        if len(query_tokens) > 1:
+            subjects = self.normalized_subjects
+            for position in scores:
+                if normalized_query in subjects[position]:
+                    scores[position] += SCORE_PHRASE
+
+        # Mayor puntaje primero; a igual puntaje, el orden original de los grupos (top-k sin ordenar todo)
+        ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self.groups[position] for position, _ in ranked]
@@ -1,15 +1,22 @@
+from typing import Optional
+from .transport import HttpConfig, PooledSession
 from .utils import HttpResponse
-import requests
 
 
 
 class WhatsAppInstance:
-    def __init__(self, api_key: str, instance: str, server_url: str):
+    def __init__(self, api_key: str, instance: str, server_url: str, http_config: Optional[HttpConfig] = None):
         self.api_key = api_key
         self.name_instance = instance
         self.status = "disconnected"
         self.server_url = server_url.rstrip("/")
         self.headers = {"apikey": self.api_key, "Content-Type": "application/json"}
+        # Pool HTTP compartido con el sender (keep-alive, timeouts uniformes)
+        self.http = PooledSession(http_config, headers=self.headers)
+
+    def close(self) -> None:
+        """Libera las conexiones del pool HTTP."""
+        self.http.close()
 
     def create_instance(self) -> HttpResponse:
         """Crea una nueva instancia de WhatsApp usando la API de Envole."""
@@ -19,13 +26,13 @@ class WhatsAppInstance:
             "integration": "WHATSAPP-BAILEYS",
             "syncFullHistory": False,
         }
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = self.http.post(url, json=payload)
         return HttpResponse(response.status_code, response.text, response.json())
 
     def delete_instance(self) -> HttpResponse:
         """Elimina una instancia de WhatsApp usando la API de Envole."""
         url = f"{self.server_url}/instance/delete/{self.name_instance}"
-        response = requests.delete(url, headers=self.headers)
+        response = self.http.delete(url)
         return HttpResponse(response.status_code, response.text)
 
     def show_qr(self, qr_text: str) -> None:
@@ -41,7 +48,7 @@ class WhatsAppInstance:
     def connect_instance_qr(self) -> None:
         """Conecta una instancia de WhatsApp y muestra una imagen"""
         url = f"{self.server_url}/instance/connect/{self.name_instance}"
-        response = requests.get(url, headers=self.headers)
+        response = self.http.get(url)
         codigo = response.json().get("code")
         self.show_qr(codigo)
 
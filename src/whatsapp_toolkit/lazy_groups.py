@@ -0,0 +1,144 @@
+import threading
+from typing import Any, Iterator, Optional
+
+from pydantic import ValidationError
+
+from .group_index import GroupIndex
+from .schemas import GroupBase, GroupFail, GroupQueries, Groups
+
+
+def _record_members(group_raw: dict[str, Any]) -> list[tuple[str, Optional[str]]]:
+    """Pares (id, phoneNumber) de un grupo crudo, ignorando participantes malformados."""
+    members = []
+    for participant in group_raw.get("participants") or ():
+        if not isinstance(participant, dict) or not isinstance(participant.get("id"), str):
+            continue
+        phone_number = participant.get("phoneNumber")
+        members.append((participant["id"], phone_number if isinstance(phone_number, str) else None))
+    return members
+
+
+def _text(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) else None
+
+
+# =============================
+# SNAPSHOT CON VALIDACIÓN PEREZOSA
+# =============================
+class LazyGroups(GroupQueries):
+    """
+    Snapshot de grupos que guarda los dicts crudos y valida cada grupo la primera vez que se accede
+    (el `GroupBase` resultante se memoiza). Cargar cuesta lo mismo que copiar la lista.
+
+    - Misma API de lectura que `Groups`; los índices se construyen desde los dicts crudos en la primera
+      consulta, sin validar: solo se validan los grupos que una consulta devuelve. Los lookups por id/subject
+      usan un dict aparte, mucho más barato que los índices de búsqueda y participantes.
+      Por eso `members_in_at_least` cuenta sobre los datos crudos, incluidos grupos que aún no se sabe si validan.
+    - Un grupo que no valida se registra en `fails` (igual que en `Groups`) y no vuelve a aparecer.
+    - `groups`, `count_by_kind` y `to_groups` recorren el snapshot completo y por tanto lo validan todo.
+    """
+
+    def __init__(
+        self,
+        groups_raw: Optional[list[dict[str, Any]]] = None,
+        fails: Optional[list[GroupFail]] = None,
+    ):
+        self._raw: list[dict[str, Any]] = []
+        self._validated: list[Optional[GroupBase]] = []
+        self._failed: set[int] = set()
+        self.fails: list[GroupFail] = list(fails or [])
+        self._index = GroupIndex()
+        self._by_id: Optional[dict[Any, int]] = None
+        self._by_subject: Optional[dict[Any, int]] = None
+        self._lock = threading.Lock()
+        if groups_raw:
+            self.upload_groups(groups_raw)
+
+    def upload_groups(self, groups_raw: list[dict[str, Any]]) -> None:
+        self._raw.extend(groups_raw)
+        self._validated.extend([None] * len(groups_raw))
+        self._by_id = self._by_subject = None
+
+    # --- VALIDACIÓN BAJO DEMANDA ---
+
+    def group_at(self, position: int) -> Optional[GroupBase]:
+        """Grupo en `position` (validado la primera vez) o None si no valida."""
+        group = self._validated[position]
+        if group is not None:
+            return group
+        with self._lock:
+            group = self._validated[position]
+            if group is not None or position in self._failed:
+                return group
+            raw = self._raw[position]
+            try:
+                group = GroupBase.model_validate(raw)
+            except ValidationError as e:
+                self._failed.add(position)
+                self.fails.append((raw.get("id"), raw.get("subject"), e.errors()))
+                return None
+            self._validated[position] = group
+            return group
+
+    def _group(self, record: Any) -> Optional[GroupBase]:
+        return None if record is None else self.group_at(record)
+
+    def _positions_by(self, field: str) -> dict[Any, int]:
+        positions: dict[Any, int] = {}
+        for position, raw in enumerate(self._raw):
+            positions.setdefault(_text(raw.get(field)), position)  # ante repetidos gana el primero, como en Groups
+        return positions
+
+    def get_group_by_id(self, group_id: str) -> Optional[GroupBase]:
+        if self._by_id is None:
+            self._by_id = self._positions_by("id")
+        return self._group(self._by_id.get(group_id))
+
+    def get_group_by_subject(self, subject: str) -> Optional[GroupBase]:
+        if self._by_subject is None:
+            self._by_subject = self._positions_by("subject")
+        return self._group(self._by_subject.get(subject))
+
+    def _indexed(self) -> GroupIndex:
+        if self._index.is_stale(self._raw):
+            self.reindex()
+        return self._index
+
+    def reindex(self) -> None:
+        self._by_id = self._by_subject = None
+        self._index.clear(self._raw)
+        for position, raw in enumerate(self._raw):
+            self._index.add_record(position, _text(raw.get("id")), _text(raw.get("subject")), _record_members(raw))
+
+    # --- SNAPSHOT COMPLETO ---
+
+    def __iter__(self) -> Iterator[GroupBase]:
+        for position in range(len(self._raw)):
+            group = self.group_at(position)
+            if group is not None:
+                yield group
+
+    @property
+    def groups(self) -> list[GroupBase]:
+        return list(self)
+
+    @property
+    def validated(self) -> int:
+        """Cuántos grupos se han validado hasta ahora (con éxito o no)."""
+        return sum(group is not None for group in self._validated) + len(self._failed)
+
+    def to_groups(self) -> Groups:
+        return Groups(groups=self.groups, fails=list(self.fails))
+
+    def model_dump(self) -> dict[str, Any]:
+        """Misma forma que `Groups.model_dump()`, pero con los grupos crudos tal como llegaron (sin validar)."""
+        return {"groups": list(self._raw), "fails": list(self.fails)}
+
+    def __len__(self) -> int:
+        """Grupos del snapshot menos los que ya se sabe que no validan."""
+        return len(self._raw) - len(self._failed)
+
+    def __str__(self) -> str:
+        texto = f"LazyGroups: {len(self._raw)} grupos cargados ({self.validated} validados).\n"
+        texto += f"Fails: {len(self.fails)} grupos con errores de validación.\n"
+        return texto
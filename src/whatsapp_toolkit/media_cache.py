@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from .singleflight import SingleFlight
+
+# Tipos de mensaje de Evolution que traen media (y por tanto fileSha256)
+_MEDIA_MESSAGE_KEYS = (
+    "imageMessage",
+    "videoMessage",
+    "audioMessage",
+    "documentMessage",
+    "stickerMessage",
+    "documentWithCaptionMessage",
+)
+
+
+def media_cache_key(message_data: dict, convert_to_mp4: bool = False) -> Optional[str]:
+    """
+    Clave de caché de la media de un mensaje: el `fileSha256` del contenido si viene
+    (la misma media reenviada en otro mensaje comparte entrada) o, si no, el `key.id` del mensaje.
+    """
+    suffix = ":mp4" if convert_to_mp4 else ""
+    message = message_data.get("message") or {}
+    for name in _MEDIA_MESSAGE_KEYS:
+        media = message.get(name)
+        if name == "documentWithCaptionMessage" and isinstance(media, dict):
+            media = (media.get("message") or {}).get("documentMessage")
+        if isinstance(media, dict) and media.get("fileSha256"):
+            return f"sha256:{media['fileSha256']}{suffix}"
+    message_id = (message_data.get("key") or {}).get("id")
+    if message_id:
+        return f"id:{message_id}{suffix}"
+    return None
+
+
+@dataclass
+class MediaCacheMetrics:
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    entries: int
+    bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    path: Path
+    size: int
+    metadata: dict[str, Any]
+
+
+# =========================
+# CACHÉ LRU EN DISCO PARA MEDIA DESCARGADA
+# =========================
+class MediaCache:
+    """
+    Caché de media descargada en disco, acotado por bytes con expulsión LRU.
+
+    - Un archivo por entrada (nombre = sha256 de la clave) + un `.json` con los metadatos.
+    - Al reiniciar se reconstruye el índice desde el directorio (orden LRU por mtime).
+    - Single-flight: descargas concurrentes de la misma media comparten una sola petición.
+    - La ruta devuelta por `fetch` es válida mientras la entrada no se expulse; `read` fija la entrada
+      mientras lee, así que una descarga concurrente no puede borrarla a media lectura.
+    - `fetch`/`read` tocan el disco (utime, metadatos, lecturas y expulsiones) en un hilo, nunca en el event loop.
+    """
+
+    def __init__(self, directory: str | os.PathLike = "whatsapp_media_cache", max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._pins: dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flight: SingleFlight[Path] = SingleFlight()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._load()
+
+    # --- ÍNDICE ---
+
+    def _file_for(self, key: str) -> Path:
+        return self.directory / hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _load(self) -> None:
+        # Descargas que un corte dejó a medias
+        for partial in self.directory.glob("*.part"):
+            partial.unlink(missing_ok=True)
+        found: list[tuple[float, str, _Entry]] = []
+        for meta_path in self.directory.glob("*.json"):
+            data_path = meta_path.with_suffix("")
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                stat = data_path.stat()
+            except (OSError, ValueError):
+                continue
+            found.append((stat.st_mtime, meta["key"], _Entry(data_path, stat.st_size, meta.get("metadata") or {})))
+        for _, key, entry in sorted(found, key=lambda item: item[0]):
+            self._entries[key] = entry
+            self._bytes += entry.size
+        self._evict()
+
+    def _evict(self) -> None:
+        # Siempre se conserva la entrada más reciente, aunque sola supere max_bytes; las fijadas esperan a soltarse
+        if self._bytes <= self.max_bytes:
+            return
+        for key in list(self._entries)[:-1]:
+            if self._bytes <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            entry = self._entries.pop(key)
+            self._bytes -= entry.size
+            self._evictions += 1
+            entry.path.unlink(missing_ok=True)
+            entry.path.with_suffix(".json").unlink(missing_ok=True)
+
+    def get(self, key: str) -> Optional[Path]:
+        """Ruta de la media en caché (y la marca como usada) o None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.path.exists():
+                if entry is not None:
+                    self._bytes -= entry.size
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(entry.path)  # conserva el orden LRU entre reinicios
+        except OSError:
+            pass
+        return entry.path
+
+    def _pin(self, key: str) -> None:
+        """Fija la clave: su entrada (ya guardada o por guardarse) no se expulsa hasta `_unpin`."""
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def _unpin(self, key: str) -> None:
+        with self._lock:
+            count = self._pins.pop(key) - 1
+            if count:
+                self._pins[key] = count
+            else:
+                self._evict()  # lo que se dejó pasar por estar fijada
+
+    def metadata(self, key: str) -> dict[str, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return dict(entry.metadata) if entry is not None else {}
+
+    def _store(self, key: str, path: Path, metadata: dict[str, Any]) -> None:
+        meta_path = path.with_suffix(".json")
+        meta_path.write_text(json.dumps({"key": key, "metadata": metadata, "stored_at": time.time()}), encoding="utf-8")
+        size = path.stat().st_size
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = _Entry(path, size, metadata)
+            self._bytes += size
+            self._evict()
+
+    # --- LECTURA CON DESCARGA ---
+
+    async def fetch(
+        self,
+        key: str,
+        download: Callable[[Path], Awaitable[dict[str, Any]]],
+    ) -> Path:
+        """
+        Devuelve la ruta de `key`, descargándola si falta.
+        `download(ruta)` debe escribir el archivo en `ruta` y devolver sus metadatos.
+        """
+        # Sin entrada en el índice no hay nada que comprobar en disco: el miss no cuesta un hilo
+        path = await asyncio.to_thread(self.get, key) if key in self._entries else None
+        if path is not None:
+            self._hits += 1
+            return path
+
+        async def _download() -> Path:
+            self._misses += 1
+            target = self._file_for(key)
+            metadata = await download(target)
+            await asyncio.to_thread(self._store, key, target, metadata)
+            return target
+
+        return await self._flight.do(key, _download)
+
+    async def read(
+        self,
+        key: str,
+        download: Callable[[Path], Awaitable[dict[str, Any]]],
+    ) -> bytes:
+        """Contenido de `key` (descargándolo si falta), con la entrada fijada desde antes de obtenerla hasta leerla."""
+        self._pin(key)
+        try:
+            try:
+                path = await self.fetch(key, download)
+                return await asyncio.to_thread(path.read_bytes)
+            except FileNotFoundError:
+                # Se borró por fuera (p.ej. `clear()`): `get` la olvida y se descarga de nuevo
+                path = await self.fetch(key, download)
+                return await asyncio.to_thread(path.read_bytes)
+        finally:
+            # Soltarla puede expulsar entradas (borrar archivos)
+            await asyncio.to_thread(self._unpin, key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                entry.path.unlink(missing_ok=True)
+                entry.path.with_suffix(".json").unlink(missing_ok=True)
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> MediaCacheMetrics:
+        with self._lock:
+            return MediaCacheMetrics(
+                hits=self._hits,
+                misses=self._misses,
+                coalesced=self._flight.shared,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                bytes=self._bytes,
+            )
+
+    def __len__(self) -> int:
+        return len(self._entries)
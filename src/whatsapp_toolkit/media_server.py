@@ -0,0 +1,209 @@
+import mimetypes
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional, Union
+from urllib.parse import quote, unquote
+
+from .streaming import media_filename
+
+HostedSource = Union[str, os.PathLike, bytes, bytearray, memoryview]
+
+
+@dataclass
+class _HostedMedia:
+    source: HostedSource
+    filename: str
+    mimetype: str
+    size: int
+    expires_at: float
+
+
+# =========================
+# SERVIDOR LOCAL DE MEDIA (URLs temporales)
+# =========================
+class MediaServer:
+    """
+    Sirve archivos (o blobs en memoria) por HTTP con URLs tokenizadas de vida corta,
+    para pasarle a Evolution una URL en el campo `media` en lugar de base64 inline.
+    El archivo viaja crudo (sendfile) y este proceso nunca codifica base64.
+
+    - host/port: dónde escucha (port=0 elige uno libre).
+    - public_url: base con la que Evolution alcanza este servidor, p.ej.
+      "http://host.docker.internal:8765" si Evolution corre en Docker. Por defecto http://host:port.
+    - ttl: segundos que vive cada URL publicada.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, public_url: Optional[str] = None, ttl: float = 300.0):
+        self.host = host
+        self.port = port
+        self.ttl = ttl
+        self._public_url = public_url.rstrip("/") if public_url else None
+        self._items: dict[str, _HostedMedia] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def public_url(self) -> str:
+        if self._public_url:
+            return self._public_url
+        if self._server is None:
+            raise RuntimeError("MediaServer no iniciado: llama start() o define public_url")
+        return f"http://{self.host}:{self._server.server_port}"
+
+    # --- CICLO DE VIDA ---
+
+    def start(self) -> "MediaServer":
+        if self._server is not None:
+            return self
+        server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        server.daemon_threads = True
+        self._server = server
+        self.port = server.server_port
+        self._thread = threading.Thread(target=server.serve_forever, name="whatsapp-media-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        server, self._server = self._server, None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            self._items.clear()
+
+    def __enter__(self) -> "MediaServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- PUBLICACIÓN ---
+
+    def publish(
+        self,
+        source: HostedSource,
+        filename: Optional[str] = None,
+        mimetype: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> str:
+        """Registra `source` y devuelve su URL temporal (arranca el servidor si hace falta)."""
+        if self._server is None:
+            self.start()
+        filename = filename or media_filename(source)
+        if mimetype is None:
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if isinstance(source, (str, os.PathLike)):
+            size = os.path.getsize(source)
+        else:
+            source = memoryview(source).cast("B")
+            size = source.nbytes
+
+        token = secrets.token_urlsafe(16)
+        item = _HostedMedia(source, filename, mimetype, size, time.monotonic() + (self.ttl if ttl is None else ttl))
+        with self._lock:
+            self._purge_expired()
+            self._items[token] = item
+        return f"{self.public_url}/media/{token}/{quote(filename)}"
+
+    def revoke(self, url_or_token: str) -> None:
+        token = _token_from(url_or_token)
+        with self._lock:
+            self._items.pop(token, None)
+
+    @contextmanager
+    def hosted(
+        self,
+        source: HostedSource,
+        filename: Optional[str] = None,
+        mimetype: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> Iterator[str]:
+        """Publica `source` mientras dura el bloque y lo revoca al salir."""
+        url = self.publish(source, filename, mimetype, ttl)
+        try:
+            yield url
+        finally:
+            self.revoke(url)
+
+    def mimetype_of(self, url_or_token: str) -> Optional[str]:
+        item = self._lookup(_token_from(url_or_token))
+        return item.mimetype if item is not None else None
+
+    def _lookup(self, token: str) -> Optional[_HostedMedia]:
+        with self._lock:
+            item = self._items.get(token)
+            if item is not None and item.expires_at <= time.monotonic():
+                del self._items[token]
+                return None
+            return item
+
+    def _purge_expired(self) -> None:
+        now = time.monotonic()
+        for token in [t for t, item in self._items.items() if item.expires_at <= now]:
+            del self._items[token]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+def _token_from(url_or_token: str) -> str:
+    if "/media/" not in url_or_token:
+        return url_or_token
+    return url_or_token.split("/media/", 1)[1].split("/", 1)[0]
+
+
+def _make_handler(media_server: MediaServer) -> type[BaseHTTPRequestHandler]:
+    class _MediaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _resolve(self) -> Optional[_HostedMedia]:
+            path = unquote(self.path.split("?", 1)[0])
+            if not path.startswith("/media/"):
+                return None
+            return media_server._lookup(_token_from(path))
+
+        def _send_headers(self, item: _HostedMedia) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", item.mimetype)
+            self.send_header("Content-Length", str(item.size))
+            self.send_header("Content-Disposition", f"inline; filename*=UTF-8''{quote(item.filename)}")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+
+        def do_HEAD(self) -> None:
+            item = self._resolve()
+            if item is None:
+                self.send_error(404)
+                return
+            self._send_headers(item)
+
+        def do_GET(self) -> None:
+            item = self._resolve()
+            if item is None:
+                self.send_error(404)
+                return
+            self._send_headers(item)
+            try:
+                if isinstance(item.source, memoryview):
+                    self.wfile.write(item.source)
+                    return
+                with open(item.source, "rb") as f:
+                    # Zero-copy cuando el SO lo soporta; socket.sendfile cae solo a send() si no
+                    self.connection.sendfile(f)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return _MediaHandler
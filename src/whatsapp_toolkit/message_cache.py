@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from .webhook.schemas import MessageUpsert
+
+# Bytes de media que pueden venir dentro del mensaje (webhookBase64=True, miniaturas):
+# no hacen falta para consultar el mensaje ni para descargar su media después
+MEDIA_PAYLOAD_KEYS = frozenset({"base64", "jpegThumbnail"})
+
+
+def _without_media(message: dict[str, Any]) -> dict[str, Any]:
+    stripped = {key: value for key, value in message.items() if key not in MEDIA_PAYLOAD_KEYS}
+    for key, value in stripped.items():
+        if isinstance(value, dict) and not MEDIA_PAYLOAD_KEYS.isdisjoint(value):
+            stripped[key] = {k: v for k, v in value.items() if k not in MEDIA_PAYLOAD_KEYS}
+    return stripped
+
+
+def strip_media_payload(message: MessageUpsert) -> MessageUpsert:
+    """
+    Copia independiente del mensaje sin base64/miniaturas en `raw` y `raw_message`: el original no se toca
+    y modificarlo después tampoco cambia la copia. Se quita la media antes de la copia profunda para no copiarla.
+    """
+    raw = dict(message.raw)
+    if isinstance(raw.get("message"), dict):
+        raw["message"] = _without_media(raw["message"])
+    raw.pop("base64", None)
+    stripped = message.model_copy(update={"raw": raw, "raw_message": _without_media(message.raw_message)})
+    return stripped.model_copy(deep=True)
+
+
+@dataclass
+class MessageCacheMetrics:
+    hits: int
+    misses: int
+    expired: int
+    evictions: int
+    entries: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# =========================
+# CACHÉ EN MEMORIA DE MENSAJES (LRU + TTL)
+# =========================
+class MessageCache:
+    """
+    Caché acotado de `MessageUpsert` por ID de mensaje (`key.id`).
+    Los mensajes son prácticamente inmutables: el TTL solo limita cuánto vive una edición vieja.
+    Se guarda una copia sin el base64 ni las miniaturas de la media, así cada entrada pesa lo que su texto
+    y metadatos aunque el webhook venga con `webhookBase64=True`.
+
+    - max_items: tamaño máximo (se expulsa el menos usado).
+    - ttl: segundos que una entrada es válida desde que se guardó (None = sin expiración).
+    """
+
+    def __init__(self, max_items: int = 10_000, ttl: Optional[float] = 3600.0):
+        if max_items < 1:
+            raise ValueError("max_items debe ser >= 1")
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, MessageUpsert]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def get(self, message_id: str) -> Optional[MessageUpsert]:
+        with self._lock:
+            item = self._items.get(message_id)
+            if item is None:
+                self._misses += 1
+                return None
+            expires_at, message = item
+            if expires_at <= time.monotonic():
+                del self._items[message_id]
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._items.move_to_end(message_id)
+            self._hits += 1
+            return message
+
+    def put(self, message: MessageUpsert) -> None:
+        message_id = message.wa_id
+        if not message_id:
+            return
+        expires_at = float("inf") if self.ttl is None else time.monotonic() + self.ttl
+        message = strip_media_payload(message)
+        with self._lock:
+            self._items[message_id] = (expires_at, message)
+            self._items.move_to_end(message_id)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, message_id: str) -> None:
+        with self._lock:
+            self._items.pop(message_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def metrics(self) -> MessageCacheMetrics:
+        with self._lock:
+            return MessageCacheMetrics(
+                hits=self._hits,
+                misses=self._misses,
+                expired=self._expired,
+                evictions=self._evictions,
+                entries=len(self._items),
+            )
+
+    def __len__(self) -> int:
+        return len(self._items)
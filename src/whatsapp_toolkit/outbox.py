@@ -0,0 +1,331 @@
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from colorstreak import Logger
+
+from .async_sender import NO_RESPONSE, last_status
+from .bulk import OutboundMessage, deliver
+from .retry import is_permanent_rejection
+
+
+# =========================
+# MÉTRICAS
+# =========================
+@dataclass
+class OutboxMetrics:
+    enqueued: int = 0       # mensajes encolados desde que arrancó el proceso
+    sent: int = 0           # entregados con éxito
+    retried: int = 0        # intentos fallidos que se reprogramaron
+    dead: int = 0           # mensajes enviados a dead-letter en este proceso
+    pending: int = 0        # pendientes en disco (incluye los programados a futuro)
+    inflight: int = 0       # tomados por un worker ahora mismo
+    dead_total: int = 0     # dead-letters acumulados en disco
+    lag_seconds: float = 0.0  # cuánto lleva esperando el pendiente vencido más antiguo
+    throughput: float = 0.0   # mensajes/segundo entregados en la última ventana
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    number TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+# =========================
+# OUTBOX PERSISTENTE
+# =========================
+class Outbox:
+    """
+    Cola de salida persistente (SQLite) drenada por un pool de workers async.
+
+    - `enqueue()` solo escribe en disco: el webhook puede responder de inmediato.
+    - Los workers envían con el sender (mismo `httpx.AsyncClient`, mismo pool de conexiones).
+    - Si Evolution falla, el mensaje se reprograma con backoff exponencial; tras
+      `max_attempts` pasa a dead-letter (`status='dead'`) y se puede reencolar.
+      Un rechazo definitivo (4xx salvo 408/425/429) va directo a dead-letter.
+    - Si Evolution no respondió (caída, timeout, circuito abierto) el intento no cuenta: el mensaje espera
+      a que el circuito vuelva a probar (o el backoff) sin acercarse a dead-letter, así un reinicio
+      de Evolution no vacía la cola.
+    - Un error de la base de datos no detiene al worker: se registra y reintenta tras `poll_interval`.
+    - Al arrancar, los mensajes que quedaron `inflight` por un corte se recuperan.
+    """
+
+    def __init__(
+        self,
+        sender: Any,
+        path: str | Path = "whatsapp_outbox.sqlite3",
+        workers: int = 4,
+        max_attempts: int = 5,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+        poll_interval: float = 1.0,
+        throughput_window: float = 60.0,
+    ):
+        if workers < 1:
+            raise ValueError("workers debe ser >= 1")
+        self.sender = sender
+        self.path = Path(path)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.throughput_window = throughput_window
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._metrics = OutboxMetrics()
+        self._sent_at: deque[float] = deque()
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    # --- CICLO DE VIDA ---
+
+    async def start(self) -> None:
+        """Recupera mensajes huérfanos y lanza los workers."""
+        if self._tasks:
+            return
+        recovered = await asyncio.to_thread(self._recover_inflight)
+        if recovered:
+            Logger.warning(f"[Outbox] {recovered} mensajes recuperados tras un corte")
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Detiene los workers dejando terminar los envíos en curso."""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def close(self) -> None:
+        """Cierra la base de datos (llamar después de `stop()`)."""
+        with self._lock:
+            self._conn.close()
+
+    async def __aenter__(self) -> "Outbox":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.stop()
+
+    # --- API PÚBLICA ---
+
+    async def enqueue(self, message: OutboundMessage, delay: float = 0.0) -> int:
+        """Persiste el mensaje y despierta a un worker. Devuelve el id en la cola."""
+        message_id = await asyncio.to_thread(self._insert, message, delay)
+        self._metrics.enqueued += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return message_id
+
+    async def send_text(self, number: str, text: str, delay_ms: int = 0, quoted: dict | None = None) -> int:
+        """Atajo para encolar un texto."""
+        return await self.enqueue(OutboundMessage(number, "text", {"text": text, "delay_ms": delay_ms, "quoted": quoted}))
+
+    def dead_letters(self, limit: int = 100) -> list[dict[str, Any]]:
+        """Mensajes que agotaron sus intentos, con el último error."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, number, kind, params, attempts, created_at, last_error "
+                "FROM outbox WHERE status = 'dead' ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "id": row[0],
+                "message": OutboundMessage(row[1], row[2], json.loads(row[3])),
+                "attempts": row[4],
+                "created_at": row[5],
+                "last_error": row[6],
+            }
+            for row in rows
+        ]
+
+    def requeue_dead(self) -> int:
+        """Vuelve a poner en cola todos los dead-letters (reinicia sus intentos)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'dead'",
+                (time.time(),),
+            )
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return cur.rowcount
+
+    def metrics(self) -> OutboxMetrics:
+        """Foto de throughput, lag y tamaños de la cola."""
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            oldest_due = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending' AND next_attempt_at <= ?",
+                (now,),
+            ).fetchone()[0]
+
+        self._trim_window(time.monotonic())
+        m = self._metrics
+        m.pending = counts.get("pending", 0)
+        m.inflight = counts.get("inflight", 0)
+        m.dead_total = counts.get("dead", 0)
+        m.lag_seconds = max(0.0, now - oldest_due) if oldest_due is not None else 0.0
+        m.throughput = len(self._sent_at) / self.throughput_window
+        return OutboxMetrics(**vars(m))
+
+    # --- WORKERS ---
+
+    async def _worker(self, worker_id: int) -> None:
+        while not self._stopping:
+            try:
+                await self._work_once(worker_id)
+            except Exception as e:
+                # Si SQLite falla (disco lleno, base bloqueada...) el worker sigue vivo; un mensaje que quede
+                # `inflight` se recupera en el siguiente `start()`
+                Logger.error(f"[Outbox] Worker {worker_id}: error en la cola, reintento en {self.poll_interval}s: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _work_once(self, worker_id: int) -> None:
+        """Toma y procesa un mensaje vencido, o espera a que haya uno."""
+        assert self._wakeup is not None
+        row = await asyncio.to_thread(self._claim)
+        if row is None:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            return
+
+        row_id, message, attempts = row
+        error: Optional[str] = None
+        status: Optional[int] = None
+        last_status.set(None)
+        try:
+            ok = await deliver(self.sender, message)
+            if not ok:
+                status = last_status.get()
+                if status == NO_RESPONSE:
+                    error = "Sin respuesta de la API (caída, timeout o circuito abierto)"
+                elif status is not None:
+                    error = f"La API rechazó el envío (HTTP {status})"
+                else:
+                    error = "El envío falló"
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+
+        if error is None:
+            await asyncio.to_thread(self._mark_sent, row_id)
+            self._metrics.sent += 1
+            now = time.monotonic()
+            self._sent_at.append(now)
+            self._trim_window(now)
+        elif status == NO_RESPONSE:
+            delay = self._unreachable_delay(attempts)
+            await asyncio.to_thread(self._reschedule, row_id, delay, error, True)
+            self._metrics.retried += 1
+            Logger.warning(f"[Outbox] Worker {worker_id}: {row_id} espera {delay:.1f}s sin consumir intento ({error})")
+        elif attempts >= self.max_attempts or is_permanent_rejection(status):
+            await asyncio.to_thread(self._mark_dead, row_id, error)
+            self._metrics.dead += 1
+            Logger.error(f"[Outbox] Mensaje {row_id} a {message.number} enviado a dead-letter: {error}")
+        else:
+            delay = self._backoff(attempts)
+            await asyncio.to_thread(self._reschedule, row_id, delay, error)
+            self._metrics.retried += 1
+            Logger.warning(f"[Outbox] Worker {worker_id}: reintento {attempts}/{self.max_attempts} de {row_id} en {delay:.1f}s ({error})")
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _unreachable_delay(self, attempts: int) -> float:
+        """Con el circuito abierto se espera a su próxima prueba; si no, el backoff normal."""
+        breaker = getattr(self.sender, "breaker", None)
+        retry_in = breaker.retry_in if breaker is not None else 0.0
+        return retry_in if retry_in > 0 else self._backoff(attempts)
+
+    def _trim_window(self, now: float) -> None:
+        while self._sent_at and now - self._sent_at[0] > self.throughput_window:
+            self._sent_at.popleft()
+
+    # --- SQLITE (se ejecuta en hilos vía asyncio.to_thread) ---
+
+    def _insert(self, message: OutboundMessage, delay: float) -> int:
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO outbox (number, kind, params, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (message.number, message.kind, json.dumps(message.params), now + delay, now),
+            )
+        return int(cur.lastrowid or 0)
+
+    def _claim(self) -> Optional[tuple[int, OutboundMessage, int]]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, number, kind, params, attempts FROM outbox "
+                    "WHERE status = 'pending' AND next_attempt_at <= ? "
+                    "ORDER BY next_attempt_at, id LIMIT 1",
+                    (time.time(),),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE outbox SET status = 'inflight', attempts = attempts + 1 WHERE id = ?",
+                        (row[0],),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return row[0], OutboundMessage(row[1], row[2], json.loads(row[3])), row[4] + 1
+
+    def _mark_sent(self, row_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+
+    def _mark_dead(self, row_id: int, error: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET status = 'dead', last_error = ? WHERE id = ?", (error, row_id))
+
+    def _reschedule(self, row_id: int, delay: float, error: str, refund: bool = False) -> None:
+        """Vuelve a poner el mensaje en cola; con `refund` el intento que se tomó al reclamarlo no cuenta."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', next_attempt_at = ?, last_error = ?, "
+                "attempts = attempts - ? WHERE id = ?",
+                (time.time() + delay, error, 1 if refund else 0, row_id),
+            )
+
+    def _recover_inflight(self) -> int:
+        with self._lock:
+            cur = self._conn.execute("UPDATE outbox SET status = 'pending' WHERE status = 'inflight'")
+        return cur.rowcount
@@ -0,0 +1,71 @@
+import os
+import sys
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Por debajo de esto arrancar el pool cuesta más que validar en secuencia
+PARALLEL_MIN_GROUPS = 512
+# Varios trozos por worker para repartir la carga si unos grupos pesan más que otros
+CHUNKS_PER_WORKER = 4
+
+
+def free_threaded() -> bool:
+    """True si el intérprete corre sin GIL (CPython 3.13t+): los hilos validan en paralelo de verdad."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def should_parallelize(groups_raw: list[Any], workers: Optional[int]) -> bool:
+    return workers is not None and workers > 1 and len(groups_raw) >= PARALLEL_MIN_GROUPS
+
+
+def split_chunks(items: list[Any], n_chunks: int) -> list[list[Any]]:
+    """Trozos contiguos de tamaño parejo (concatenados devuelven `items` en el mismo orden)."""
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size, extra = divmod(len(items), n_chunks)
+    chunks = []
+    start = 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < extra else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+# =============================
+# INGESTA POR TROZOS
+# =============================
+def map_chunks(
+    fn: Callable[[list[Any]], T],
+    groups_raw: list[Any],
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> list[T]:
+    """
+    Aplica `fn` a trozos contiguos de `groups_raw` en paralelo; los resultados vuelven en el orden de la lista.
+
+    - `workers`: cuántos workers repartir (por defecto, uno por CPU); con un executor propio solo decide
+      en cuántos trozos se corta la lista, así que conviene pasar el mismo número que tiene el pool.
+    - `executor`: pool propio (no se cierra); útil para reutilizarlo entre snapshots.
+    - Sin executor se crea uno de `workers`: hilos si el intérprete es free-threaded, procesos si no.
+      Los procesos arrancan con "spawn" (hacer fork de un proceso con hilos, como un servidor async, puede
+      colgarse): `fn` debe ser importable, sus resultados deben poder serializarse con pickle y el script
+      que lo use necesita el guard `if __name__ == "__main__":`.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = split_chunks(groups_raw, workers * CHUNKS_PER_WORKER)
+    if executor is not None:
+        return list(executor.map(fn, chunks))
+
+    import multiprocessing  # solo si se usa
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    pool: Executor
+    if free_threaded():
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    with pool:
+        return list(pool.map(fn, chunks))
@@ -0,0 +1,221 @@
+import base64
+import hashlib
+import mimetypes
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, Optional, Union
+
+from .codec import JsonCodec, default_codec
+from .streaming import _AsyncBodyStream, media_filename
+
+PreparableSource = Union[str, os.PathLike, bytes, bytearray, memoryview]
+
+
+def _read_bytes(source: PreparableSource) -> bytes | memoryview:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:]
+    return memoryview(source).cast("B")
+
+
+# =========================
+# MEDIA PREPARADA (se serializa una vez, se envía N veces)
+# =========================
+class PreparedMedia:
+    """
+    Payload de `sendMedia` pre-serializado: la parte fija (media, fileName, mimetype, mediatype)
+    se codifica a JSON una sola vez y cada destinatario solo añade `number`/`caption`.
+    El fragmento se comparte entre envíos sin copiarse: CPU y memoria son por media, no por mensaje.
+
+    `media` puede ser el base64 del archivo o una URL (modo hosted, ver `MediaServer`).
+    `codec` serializa el fragmento y el prefijo de cada envío (por defecto el del paquete).
+    """
+
+    def __init__(
+        self,
+        media: str,
+        filename: str,
+        mimetype: str,
+        mediatype: str = "document",
+        digest: str = "",
+        codec: Optional[JsonCodec] = None,
+    ):
+        self.filename = filename
+        self.mimetype = mimetype
+        self.mediatype = mediatype
+        self.digest = digest
+        self.codec = codec or default_codec()
+        static = self.codec.dumps({"mediatype": mediatype, "mimetype": mimetype, "fileName": filename, "media": media})
+        # '{' inicial fuera: el prefijo por destinatario abre el objeto y termina en ','
+        self.fragment = static[1:]
+        self.is_url = media.startswith(("http://", "https://"))
+
+    @classmethod
+    def from_source(
+        cls,
+        source: PreparableSource,
+        filename: Optional[str] = None,
+        mimetype: Optional[str] = None,
+        mediatype: str = "document",
+        codec: Optional[JsonCodec] = None,
+    ) -> "PreparedMedia":
+        """Lee y codifica `source` (ruta o bytes) una sola vez."""
+        data = _read_bytes(source)
+        filename = filename or media_filename(source)
+        mimetype = mimetype or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        digest = hashlib.sha256(data).hexdigest()
+        return cls(base64.b64encode(data).decode("ascii"), filename, mimetype, mediatype, digest, codec)
+
+    @classmethod
+    def from_base64(
+        cls,
+        media_b64: str,
+        filename: str,
+        mimetype: str = "application/pdf",
+        mediatype: str = "document",
+        codec: Optional[JsonCodec] = None,
+    ) -> "PreparedMedia":
+        """Para media que ya viene en base64 (p.ej. `PDFGenerator.generar_pdf_base64`)."""
+        digest = hashlib.sha256(media_b64.encode("ascii")).hexdigest()
+        return cls(media_b64, filename, mimetype, mediatype, digest, codec)
+
+    @classmethod
+    def from_url(cls, url: str, filename: str, mimetype: str, mediatype: str = "document", codec: Optional[JsonCodec] = None) -> "PreparedMedia":
+        return cls(url, filename, mimetype, mediatype, hashlib.sha256(url.encode("utf-8")).hexdigest(), codec)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.fragment)
+
+    def payload_for(self, number: str, caption: str = "", quoted: dict | None = None) -> dict[str, Any]:
+        """Campos variables del envío (sin la media): los usa el rate limiter y el logging."""
+        payload: dict[str, Any] = {"number": number, "caption": caption}
+        if quoted:
+            payload["quoted"] = quoted
+        return payload
+
+    def body_for(self, number: str, caption: str = "", quoted: dict | None = None) -> "PreparedBody":
+        head = self.codec.dumps(self.payload_for(number, caption, quoted))
+        return PreparedBody(head[:-1] + b",", self.fragment)
+
+
+class PreparedBody:
+    """Cuerpo HTTP = prefijo pequeño por destinatario + fragmento compartido (sin concatenar)."""
+
+    rewindable = True
+
+    def __init__(self, *chunks: bytes):
+        self.chunks = chunks
+        self.content_length: int = sum(len(c) for c in chunks)
+
+    def __len__(self) -> int:
+        return self.content_length
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(self.chunks)
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    def async_stream(self) -> _AsyncBodyStream:
+        return _AsyncBodyStream(self)
+
+    def headers(self) -> dict[str, str]:
+        return {"Content-Length": str(self.content_length)}
+
+
+# =========================
+# CACHÉ POR HASH DE CONTENIDO
+# =========================
+class PreparedMediaCache:
+    """
+    LRU acotada de `PreparedMedia` (+ nombre/mimetype/mediatype en la clave).
+    Preparar el mismo PDF dos veces devuelve el mismo fragmento ya serializado.
+
+    - Rutas: la clave es ruta + mtime + tamaño, así un acierto no vuelve a leer ni hashear el archivo.
+    - Bytes: la clave es el sha256 del contenido.
+    - max_items / max_bytes: límites del caché (se expulsa el menos usado).
+    - codec: con el que se serializan las medias preparadas (el del cliente).
+    """
+
+    def __init__(self, max_items: int = 16, max_bytes: int = 256 * 1024 * 1024, codec: Optional[JsonCodec] = None):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.codec = codec
+        self._items: OrderedDict[tuple, PreparedMedia] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(
+        self,
+        source: PreparableSource,
+        filename: Optional[str] = None,
+        mimetype: Optional[str] = None,
+        mediatype: str = "document",
+    ) -> PreparedMedia:
+        """Lee, hashea y codifica `source` salvo que ya esté en caché. Es bloqueante: desde async, en un hilo."""
+        filename = filename or media_filename(source)
+        mimetype = mimetype or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if isinstance(source, (str, os.PathLike)):
+            stat = os.stat(source)
+            key: tuple = (os.path.realpath(source), stat.st_mtime_ns, stat.st_size, filename, mimetype, mediatype)
+            cached = self._get(key)
+            if cached is not None:
+                return cached
+            data = _read_bytes(source)
+            digest = hashlib.sha256(data).hexdigest()
+        else:
+            data = _read_bytes(source)
+            digest = hashlib.sha256(data).hexdigest()
+            key = (digest, filename, mimetype, mediatype)
+            cached = self._get(key)
+            if cached is not None:
+                return cached
+        media_b64 = base64.b64encode(data).decode("ascii")
+        return self._put(key, PreparedMedia(media_b64, filename, mimetype, mediatype, digest, self.codec))
+
+    def prepare_base64(self, media_b64: str, filename: str, mimetype: str = "application/pdf", mediatype: str = "document") -> PreparedMedia:
+        key = (hashlib.sha256(media_b64.encode("ascii")).hexdigest(), filename, mimetype, mediatype, "b64")
+        cached = self._get(key)
+        if cached is not None:
+            return cached
+        return self._put(key, PreparedMedia.from_base64(media_b64, filename, mimetype, mediatype, self.codec))
+
+    def _get(self, key: tuple) -> Optional[PreparedMedia]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def _put(self, key: tuple, item: PreparedMedia) -> PreparedMedia:
+        with self._lock:
+            if key in self._items:
+                return self._items[key]
+            self._items[key] = item
+            self._bytes += item.nbytes
+            while self._items and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+                if len(self._items) == 1:
+                    break  # un solo elemento enorme: se conserva mientras se usa
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+            return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+# =========================
+# TOKEN BUCKET
+# =========================
+class TokenBucket:
+    """
+    Bucket clásico: se rellena a `rate` tokens/segundo hasta `burst`.
+    `reserve()` consume un token aunque no haya (deuda) y devuelve cuánto hay que esperar,
+    así las esperas quedan encoladas en orden y no se reintenta en bucle.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        if rate <= 0:
+            raise ValueError("rate debe ser > 0")
+        self.rate = rate
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float) -> float:
+        elapsed = max(0.0, now - self.updated)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def release(self) -> None:
+        """Devuelve un token reservado que no se usó (p.ej. una espera cancelada)."""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+def recipient_of(payload: dict[str, Any]) -> Optional[str]:
+    """Extrae el destinatario de un payload de `/message/*` (number o key.remoteJid)."""
+    number = payload.get("number")
+    if number:
+        return str(number)
+    key = payload.get("key")
+    if isinstance(key, dict) and key.get("remoteJid"):
+        return str(key["remoteJid"])
+    return None
+
+
+# =========================
+# RATE LIMITER (global + por JID)
+# =========================
+class RateLimiter:
+    """
+    Limitador del lado cliente compartido por `WhatsAppSender` y `AsyncWhatsAppSender`.
+
+    - rate / burst: ritmo global de la instancia (mensajes/segundo y ráfaga permitida).
+    - per_jid_rate / per_jid_burst: ritmo por destinatario (None desactiva el límite por JID).
+    - max_jids: buckets por JID que se conservan (LRU); un JID olvidado vuelve con el bucket lleno.
+
+    Sustituye al `delay` del payload: la espera ocurre aquí, sin mantener abierta la petición
+    en Evolution. Primero se espera el turno del JID y solo entonces se reserva el token global,
+    así un destinatario lento no aparta cupo global que luego se gastaría de golpe.
+    Los senders piden un token por intento: los reintentos también cuentan.
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: int = 10,
+        per_jid_rate: Optional[float] = 1.0,
+        per_jid_burst: int = 3,
+        max_jids: int = 10_000,
+    ):
+        self._global = TokenBucket(rate, burst)
+        self.per_jid_rate = per_jid_rate
+        self.per_jid_burst = per_jid_burst
+        self.max_jids = max_jids
+        self._jids: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(jid: str) -> str:
+        # "5214771234567" y "5214771234567@s.whatsapp.net" comparten bucket
+        return jid.split("@", 1)[0]
+
+    def _jid_bucket(self, jid: str) -> TokenBucket:
+        key = self._normalize(jid)
+        bucket = self._jids.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.per_jid_rate, self.per_jid_burst)  # type: ignore[arg-type]
+            self._jids[key] = bucket
+            if len(self._jids) > self.max_jids:
+                self._jids.popitem(last=False)
+        else:
+            self._jids.move_to_end(key)
+        return bucket
+
+    def reserve_jid(self, jid: Optional[str]) -> float:
+        """Reserva el turno de `jid` y devuelve los segundos que hay que esperarlo (0 sin límite por JID)."""
+        if not jid or not self.per_jid_rate:
+            return 0.0
+        with self._lock:
+            return self._jid_bucket(jid).reserve(time.monotonic())
+
+    def reserve_global(self) -> float:
+        """Reserva un envío de la instancia y devuelve los segundos que hay que esperar antes de hacerlo."""
+        with self._lock:
+            return self._global.reserve(time.monotonic())
+
+    def _release(self, jid: Optional[str], global_token: bool) -> None:
+        with self._lock:
+            if global_token:
+                self._global.release()
+            if jid and self.per_jid_rate:
+                bucket = self._jids.get(self._normalize(jid))
+                if bucket is not None:
+                    bucket.release()
+
+    def acquire(self, jid: Optional[str] = None) -> float:
+        """Versión bloqueante (sender síncrono). Devuelve lo que se esperó."""
+        jid_wait = self.reserve_jid(jid)
+        if jid_wait > 0:
+            time.sleep(jid_wait)
+        wait = self.reserve_global()
+        if wait > 0:
+            time.sleep(wait)
+        return jid_wait + wait
+
+    async def acquire_async(self, jid: Optional[str] = None) -> float:
+        """Versión asíncrona (sender async). Devuelve lo que se esperó; si se cancela, devuelve sus tokens."""
+        jid_wait = self.reserve_jid(jid)
+        global_token = False
+        try:
+            if jid_wait > 0:
+                await asyncio.sleep(jid_wait)
+            wait = self.reserve_global()
+            global_token = True
+            if wait > 0:
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # El envío no va a salir: su deuda no debe retrasar a los siguientes
+            self._release(jid, global_token)
+            raise
+        return jid_wait + wait
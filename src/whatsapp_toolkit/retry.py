@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+# 4xx que no dicen nada del mensaje (timeout, demasiado pronto, rate limit): vale la pena reintentar
+TRANSIENT_CLIENT_STATUSES = frozenset({408, 425, 429})
+
+
+def is_permanent_rejection(status: Optional[int]) -> bool:
+    """True si la API rechazó la petición en sí (4xx): reenviarla igual va a fallar igual."""
+    return status is not None and 400 <= status < 500 and status not in TRANSIENT_CLIENT_STATUSES
+
+
+# =========================
+# POLÍTICA DE REINTENTOS
+# =========================
+@dataclass
+class RetryPolicy:
+    """
+    Reintentos con backoff exponencial + jitter, compartidos por ambos senders.
+
+    - max_attempts: intentos totales (1 = sin reintentos).
+    - retry_statuses: códigos HTTP que se consideran transitorios (métodos idempotentes).
+    - safe_retry_statuses: los que se reintentan en un POST: 429/503 indican que la petición no se procesó.
+      Un 500/502/504 en un POST es ambiguo (Baileys pudo haber enviado el mensaje) y solo se reintenta
+      con `retry_on_timeout`.
+    - backoff_base / backoff_max: espera = min(max, base * 2^(intento-1)), con full jitter si `jitter`.
+    - respect_retry_after: usa la cabecera Retry-After (segundos o fecha HTTP) cuando viene.
+    - deadline: tiempo total máximo (segundos) para la petición incluyendo esperas; None = sin límite.
+    - retry_on_timeout: reintentar POST tras un timeout de lectura o un 500/502/504. Por defecto no, porque
+      Evolution pudo haber enviado el mensaje y se duplicaría. Los errores de conexión
+      (la petición nunca salió) y los métodos idempotentes siempre se reintentan.
+    """
+    max_attempts: int = 3
+    retry_statuses: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+    safe_retry_statuses: frozenset[int] = frozenset({429, 503})
+    backoff_base: float = 0.25
+    backoff_max: float = 5.0
+    jitter: bool = True
+    respect_retry_after: bool = True
+    deadline: Optional[float] = 30.0
+    retry_on_timeout: bool = False
+
+    def retries_status(self, method: str, status: int) -> bool:
+        """True si una respuesta `status` a `method` debe reintentarse."""
+        if method in IDEMPOTENT_METHODS or self.retry_on_timeout:
+            return status in self.retry_statuses
+        return status in self.safe_retry_statuses
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def next_delay(self, attempt: int, started: float, retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Espera antes del siguiente intento, o None si ya no se debe reintentar
+        (se agotaron los intentos o la espera rebasaría el `deadline`).
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        delay = self.backoff(attempt)
+        if self.respect_retry_after and retry_after:
+            parsed = parse_retry_after(retry_after)
+            if parsed is not None:
+                delay = parsed
+
+        if self.deadline is not None and (time.monotonic() - started) + delay > self.deadline:
+            return None
+        return delay
+
+
+def parse_retry_after(value: str) -> Optional[float]:
+    """Convierte Retry-After (segundos o fecha HTTP) a segundos de espera."""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+# =========================
+# CONTADORES
+# =========================
+@dataclass
+class RetryStats:
+    """
+    Contadores por sender para medir la amplificación de reintentos.
+    `amplification` = intentos HTTP reales / peticiones lógicas.
+    """
+    requests: int = 0
+    attempts: int = 0
+    retries: int = 0
+    exhausted: int = 0
+    reasons: dict[str, int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_attempt(self) -> None:
+        with self._lock:
+            self.attempts += 1
+
+    def record_retry(self, reason: str) -> None:
+        with self._lock:
+            self.retries += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def record_exhausted(self) -> None:
+        with self._lock:
+            self.exhausted += 1
+
+    @property
+    def amplification(self) -> float:
+        return self.attempts / self.requests if self.requests else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+                "amplification": self.attempts / self.requests if self.requests else 0.0,
+                "reasons": dict(self.reasons),
+            }
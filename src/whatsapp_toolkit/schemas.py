@@ -1,7 +1,11 @@
+from concurrent.futures import Executor
 from typing import Optional, Literal, Any
-from pydantic import BaseModel, ValidationError, Field, ConfigDict
+from pydantic import BaseModel, ValidationError, Field, ConfigDict, PrivateAttr
 from pydantic_core import ErrorDetails
 
+from .group_index import GroupIndex
+from .parallel_ingest import free_threaded, map_chunks, should_parallelize
+
 # =============================
 # MODELOS DE DATOS
 # =============================
@@ -82,17 +86,56 @@ class GroupBase(Schema):
 
 
 
-class Groups(Schema):    
-    groups: list[GroupBase] = Field(default_factory=list)
-    fails: list[tuple[Optional[str], Optional[str], list[ErrorDetails]]] = Field(default_factory=list)
+GroupFail = tuple[Optional[str], Optional[str], list[ErrorDetails]]
+
+
+def validate_groups(groups_raw: list[dict[str, Any]]) -> tuple[list[GroupBase], list[GroupFail]]:
+    """Valida grupos crudos en orden: (válidos, fallos como (id, subject, errores))."""
+    groups: list[GroupBase] = []
+    fails: list[GroupFail] = []
+    for group in groups_raw:
+        try:
+            groups.append(GroupBase.model_validate(group))
+        except ValidationError as e:
+            fails.append((group.get("id"), group.get("subject"), e.errors()))
+    return groups, fails
+
+
+
+class GroupQueries:
+    """
+    API de lectura común a `Groups`, `CompactGroups` y `LazyGroups`: consultas sobre `self.groups`
+    resueltas con el `GroupIndex` de `self._index`.
+    """
+    
+    def _group(self, record: Any) -> Optional[GroupBase]:
+        """Registro del índice -> grupo. Aquí el índice guarda el grupo mismo; `LazyGroups` guarda su posición."""
+        return record
+    
     
+    def _groups(self, records: list[Any]) -> list[GroupBase]:
+        return [group for group in map(self._group, records) if group is not None]
     
-    def upload_groups(self, groups_raw: list[dict[str, Any]]) -> None:
-        for group in groups_raw:
-            try:
-                self.groups.append(GroupBase.model_validate(group))
-            except ValidationError as e:
-                self.fails.append((group.get("id"), group.get("subject"), e.errors()))
+    
+    def _indexed(self) -> GroupIndex:
+        if self._index.is_stale(self.groups):
+            self._index.rebuild(self.groups)
+        return self._index
+    
+    
+    def _search_index(self) -> GroupIndex:
+        """Índice que resuelve `search_group`. Aquí es el mismo para todo; `CompactGroups` lo construye aparte."""
+        return self._indexed()
+    
+    
+    def _member_index(self) -> GroupIndex:
+        """Índice que resuelve las consultas de participantes."""
+        return self._indexed()
+    
+    
+    def reindex(self) -> None:
+        """Reconstruye los índices (necesario solo si se editan grupos in-place: `groups[i] = ...`, `g.subject = ...`)."""
+        self._index.rebuild(self.groups)
     
     
     def count_by_kind(self) -> dict[str, int]:
@@ -104,54 +147,85 @@ class Groups(Schema):
     
     
     def get_group_by_id(self, group_id: str) -> Optional[GroupBase]:
-        for group in self.groups:
-            if group.id == group_id:
-                return group
-        return None
+        return self._group(self._indexed().by_id.get(group_id))
     
     
     def get_group_by_subject(self, subject: str) -> Optional[GroupBase]:
-        for group in self.groups:
-            if group.subject == subject:
-                return group
-        return None
+        return self._group(self._indexed().by_subject.get(subject))
     
     
     def search_group(self, query: str, limit: int = 10) -> list[GroupBase]:
-        q = query.strip().lower()
-        
-        if not q:
-            return []
-        
-        tokens = [token for token in q.split() if token]
-        scored = []
-        finded_groups: list[GroupBase] = []
-        for group in self.groups:
-            subject = (group.subject or "").lower()
-            score = 0
-            
-            # Si es match exacto
-            if q in subject:
-                score += 2
-            
-            # Por cada token presente
-            for token in tokens:
-                if token in subject:
-                    score += 1
-            
-            # Si hay puntos se agrega
-            if score > 0:
-                scored.append((score,group))
-            
-            
-        # Ordenamos por puntiaje
-        scored.sort(key=lambda x: x[0], reverse=True)
-        finded_groups = [group for score, group in scored]
-        return finded_groups[:limit]
+        """
+        Busca grupos por subject usando el índice invertido (construido en upload_groups).
+        Ignora acentos y mayúsculas ("leon" encuentra "León") y tolera errores de tipeo ("futbl" -> "Fútbol").
+        Orden: coincidencia exacta de palabra > palabra que contiene el texto > palabra con errores,
+        con bonus si el subject contiene la consulta completa.
+        """
+        return self._groups(self._search_index().search(query, limit))
+    
+    
+    # --- PARTICIPANTES (índice inverso, calculado una vez por snapshot) ---
+    
+    def groups_of(self, participant: str) -> list[GroupBase]:
+        """Grupos donde está el participante. Acepta LID, JID o número ("521...", "521...@s.whatsapp.net", "...@lid")."""
+        index = self._member_index()
+        return self._groups(index.groups_at(index.positions_of(participant)))
+    
+    
+    def shared_groups(self, participant_a: str, participant_b: str) -> list[GroupBase]:
+        """Grupos que comparten dos participantes."""
+        index = self._member_index()
+        return self._groups(index.groups_at(index.positions_of(participant_a) & index.positions_of(participant_b)))
+    
+    
+    def members_in_at_least(self, n: int) -> dict[str, int]:
+        """Miembros presentes en al menos `n` grupos -> cuántos grupos. Clave: usuario de su LID (o de su número si no hay LID)."""
+        index = self._member_index()
+        return {member: count for member, count in index.member_counts() if count >= n}
     
     
     def __len__(self) -> int:
         return len(self.groups)
+
+
+
+class Groups(GroupQueries, Schema):    
+    groups: list[GroupBase] = Field(default_factory=list)
+    fails: list[GroupFail] = Field(default_factory=list)
+    
+    # Índices id/subject: se mantienen en upload_groups y se reconstruyen si `groups` cambia
+    _index: GroupIndex = PrivateAttr(default_factory=GroupIndex)
+    
+    
+    def upload_groups(
+        self,
+        groups_raw: list[dict[str, Any]],
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """
+        Valida y agrega grupos crudos; los inválidos van a `fails`.
+        
+        `workers` solo tiene efecto en intérpretes free-threaded (sin GIL) o junto con un `executor`:
+        ahí valida por trozos en hilos. Con GIL se registra un aviso y la carga es secuencial, porque
+        devolver los modelos desde otros procesos cuesta más que validarlos aquí
+        (para un pool de procesos usa `CompactGroups`). Un `executor` propio se usa siempre.
+        El orden de `groups` y `fails` es el mismo que en la validación secuencial.
+        """
+        if executor is None and workers is not None and workers > 1 and not free_threaded():
+            from colorstreak import Logger as log  # solo si se avisa: no encarece importar los esquemas
+            log.warning(f"[groups] workers={workers} no tiene efecto: el intérprete tiene GIL (usa python3.13t o CompactGroups); la carga es secuencial")
+        if executor is not None or (free_threaded() and should_parallelize(groups_raw, workers)):
+            results = map_chunks(validate_groups, groups_raw, workers, executor)
+        else:
+            results = [validate_groups(groups_raw)]
+        
+        index = self._indexed()
+        for groups, fails in results:
+            self.fails.extend(fails)
+            for validated in groups:
+                self.groups.append(validated)
+                index.add(validated)
     
     
     def __str__(self) -> str:
@@ -1,45 +1,140 @@
-from typing import Optional
+import functools
+import time
+from typing import Any, Callable, Optional
 import requests
+from urllib3.exceptions import NewConnectionError
 from .instance import WhatsAppInstance
-from .utils import timeout_response, HttpResponse
+from .breaker import CircuitBreaker
+from .ratelimit import RateLimiter, recipient_of
+from .retry import IDEMPOTENT_METHODS, RetryPolicy, RetryStats
+from .codec import JsonCodec, default_codec
+from .media_server import HostedSource, MediaServer
+from .prepared import PreparedBody, PreparedMedia
+from .streaming import Base64JsonBody, MediaSource, media_filename
+from .transport import PooledSession
+from .utils import timeout_response
 
 
 
+def _retry_reason(error: requests.RequestException, method: str, policy: RetryPolicy) -> Optional[str]:
+    """Motivo de reintento para un error de red, o None si no es seguro reintentar."""
+    cause = getattr(error.args[0], "reason", None) if error.args else None
+    if isinstance(error, requests.ConnectTimeout) or isinstance(cause, NewConnectionError):
+        return "connect_error"  # la petición nunca llegó a Evolution
+    if method in IDEMPOTENT_METHODS or policy.retry_on_timeout:
+        return "timeout" if isinstance(error, requests.Timeout) else "network_error"
+    return None
 
 
 class WhatsAppSender:
-    def __init__(self, instance: WhatsAppInstance):
+    def __init__(
+        self,
+        instance: WhatsAppInstance,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        media_server: Optional[MediaServer] = None,
+        json_codec: Optional[JsonCodec] = None,
+    ):
         self.instance = instance.name_instance
         self.server_url = instance.server_url
         self.headers = instance.headers
         self._instance_obj = instance
-        self.connected = True  # estado de conexión conocido
+        self.http = instance.http  # pool compartido con la instancia
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_stats = RetryStats()
+        # Estado de conexión: lo decide el circuit breaker, no el último envío
+        self.breaker = circuit_breaker or CircuitBreaker()
+        # Servidor local opcional: Evolution descarga la media por URL en vez de recibir base64
+        self.media_server = media_server
+        # Serializa payloads y parsea respuestas (orjson si está instalado)
+        self.codec = json_codec or default_codec()
+
+    @property
+    def connected(self) -> bool:
+        """False mientras el circuito está abierto (la instancia se considera caída)."""
+        return self.breaker.state != "open"
 
     def test_connection_status(self) -> bool:
         cel_epok = "5214778966517"
         print(f"Probando conexión enviando mensaje a {cel_epok}...")
-        ok = bool(self.send_text(cel_epok, "ping"))
-        self.connected = ok
-        return ok
+        return bool(self.send_text(cel_epok, "ping"))
+
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        retry: bool = True,
+        throttle: Optional[Callable[[], Any]] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Petición HTTP aplicando la política de reintentos (backoff + jitter + Retry-After).
+        Con `retry=False` se hace un solo intento (cuerpos que no pueden reenviarse).
+        `throttle` se llama antes de cada intento (rate limiter: los reintentos también consumen token).
+        """
+        url = f"{self.server_url}{endpoint}"
+        policy = self.retry_policy
+        stats = self.retry_stats
+        started = time.monotonic()
+        stats.record_request()
+
+        # Un resultado por petición lógica: los fallos que un reintento recupera no abren el circuito
+        self.breaker.check()  # falla al instante si la instancia está caída
+        attempt = 0
+        while True:
+            attempt += 1
+            if throttle is not None:
+                throttle()
+            if attempt > 1:
+                self.breaker.check_not_open()  # otra petición lo abrió mientras esperábamos
+            stats.record_attempt()
+            try:
+                resp = self.http.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                reason = _retry_reason(e, method, policy)
+                delay = policy.next_delay(attempt, started) if retry and reason is not None else None
+                if delay is None:
+                    if retry and reason is not None:
+                        stats.record_exhausted()
+                    self.breaker.record_failure()
+                    raise
+            else:
+                if not policy.retries_status(method, resp.status_code):
+                    self.breaker.record_status(resp.status_code)
+                    return resp
+                reason = str(resp.status_code)
+                delay = policy.next_delay(attempt, started, resp.headers.get("Retry-After")) if retry else None
+                if delay is None:
+                    if retry:
+                        stats.record_exhausted()
+                    self.breaker.record_status(resp.status_code)
+                    return resp
+
+            stats.record_retry(reason)
+            time.sleep(delay)
 
     @timeout_response
     def get(self, endpoint: str, params: Optional[dict] = None) -> requests.Response:
-        url = f"{self.server_url}{endpoint}"
-        return requests.get(url, headers=self.headers, params=params)
+        return self._request("GET", endpoint, params=params)
 
+    @timeout_response
     def put(self, endpoint: str) -> requests.Response:
-        url = f"{self.server_url}{endpoint}"
-        return requests.put(url, headers=self.headers)
+        return self._request("PUT", endpoint)
 
-    def post(self, endpoint: str, payload: dict):
-        url = f"{self.server_url}{endpoint}"
-        request = requests.post(url, json=payload, headers=self.headers, timeout=10)
-        # if timeout:
-        try:
-            return request
-        except requests.Timeout:
-            print("Request timed out")
-            return HttpResponse(status_code=408, text="Timeout", json_data=None)
+    @timeout_response
+    def post(self, endpoint: str, payload: dict, body: Optional[Base64JsonBody | PreparedBody] = None) -> requests.Response:
+        """POST JSON. Si se pasa `body` (streaming) se envía en lugar de `payload`."""
+        throttle = None
+        if self.rate_limiter is not None and endpoint.startswith("/message/"):
+            throttle = functools.partial(self.rate_limiter.acquire, recipient_of(payload))
+        if body is not None:
+            # Con tamaño conocido requests manda Content-Length; si no, chunked
+            data = body if body.content_length is not None else iter(body)
+            return self._request("POST", endpoint, retry=body.rewindable, throttle=throttle, data=data)
+        # Content-Type: application/json ya va en las cabeceras de la sesión
+        return self._request("POST", endpoint, throttle=throttle, data=self.codec.dumps(payload))
 
     def send_text(
         self, number: str, text: str, link_preview: bool = True, delay_ms: int = 0, quoted: dict | None = None,
@@ -59,12 +154,9 @@ class WhatsAppSender:
         status = resp.status_code if hasattr(resp, "status_code") else 0
 
         if 200 <= status < 300:
-            self.connected = True
             return resp.text
 
-        # Fallo: marcar desconexión y reportar
         print(f"Error al enviar mensaje a {number}: {status} - {resp.text}")
-        self.connected = False
         return False
 
     def send_media(
@@ -162,13 +254,128 @@ class WhatsAppSender:
 
         status = resp.status_code if hasattr(resp, "status_code") else 0
         if 200 <= status < 300:
-            self.connected = True
             return resp.text
 
         print(f"❌ Error al enviar audio a {number}: {status} - {getattr(resp, 'text', resp)}")
-        self.connected = False
         return ""
 
+    def send_prepared(self, number: str, media: PreparedMedia, caption: str = "", quoted: dict | None = None) -> str:
+        """Envía una `PreparedMedia`: solo se serializan `number`/`caption`, la media ya va codificada."""
+        resp = self.post(
+            f"/message/sendMedia/{self.instance}",
+            media.payload_for(number, caption, quoted),
+            body=media.body_for(number, caption, quoted),
+        )
+        return resp.text
+
+    # --- ENVÍO DE MEDIA POR URL (servidor local de media) ---
+
+    def _require_media_server(self) -> MediaServer:
+        if self.media_server is None:
+            raise RuntimeError("Configura un MediaServer (media_server=...) para enviar media por URL")
+        return self.media_server
+
+    def send_media_hosted(
+        self,
+        number: str,
+        source: HostedSource,
+        filename: Optional[str] = None,
+        caption: str = "",
+        mediatype: str = "document",
+        mimetype: Optional[str] = None,
+        quoted: dict | None = None,
+    ) -> str:
+        """Publica `source` en el MediaServer y se lo pasa a Evolution como URL (sin base64)."""
+        filename = filename or media_filename(source)
+        server = self._require_media_server()
+        with server.hosted(source, filename, mimetype) as url:
+            mimetype = mimetype or server.mimetype_of(url)
+            return self.send_media(number, url, filename, caption, mediatype, mimetype, quoted=quoted)
+
+    def send_audio_hosted(self, number: str, source: HostedSource, delay: int = 0, quoted: dict | None = None) -> str:
+        """Como `send_audio`, pero Evolution descarga el audio por URL desde el MediaServer."""
+        with self._require_media_server().hosted(source, mimetype="audio/ogg") as url:
+            return self.send_audio(number, url, delay, quoted=quoted)
+
+    # --- ENVÍO DE MEDIA DESDE ARCHIVO (base64 en streaming) ---
+
+    def send_media_file(
+        self,
+        number: str,
+        source: MediaSource,
+        filename: Optional[str] = None,
+        caption: str = "",
+        mediatype: str = "document",
+        mimetype: str = "application/pdf",
+        quoted: dict | None = None,
+    ) -> str:
+        """Como `send_media`, pero acepta ruta/archivo/bytes y codifica el base64 en streaming."""
+        payload = {
+            "number": number,
+            "mediatype": mediatype,
+            "mimetype": mimetype,
+            "caption": caption,
+            "fileName": filename or media_filename(source),
+            "delay": 0,
+            "linkPreview": False,
+            "mentionsEveryOne": False,
+        }
+        if quoted:
+            payload["quoted"] = quoted
+        body = Base64JsonBody(payload, "media", source, codec=self.codec)
+        resp = self.post(f"/message/sendMedia/{self.instance}", payload, body=body)
+        return resp.text
+
+    def send_audio_file(
+        self,
+        number: str,
+        source: MediaSource,
+        delay: int = 0,
+        mimetype: str = "audio/ogg; codecs=opus",
+        ptt: bool = True,
+        quoted: dict | None = None,
+    ) -> str:
+        """Como `send_audio`, pero acepta ruta/archivo/bytes y codifica el base64 en streaming."""
+        payload = {
+            "number": number,
+            "delay": delay,
+            "mimetype": mimetype,
+            "ptt": ptt,
+        }
+        if quoted:
+            payload["quoted"] = quoted
+        body = Base64JsonBody(payload, "audio", source, codec=self.codec)
+        resp = self.post(f"/message/sendWhatsAppAudio/{self.instance}", payload, body=body)
+
+        status = resp.status_code if hasattr(resp, "status_code") else 0
+        if 200 <= status < 300:
+            return resp.text
+
+        print(f"❌ Error al enviar audio a {number}: {status} - {getattr(resp, 'text', resp)}")
+        return ""
+
+    def send_sticker_file(
+        self,
+        number: str,
+        source: MediaSource,
+        delay: int = 0,
+        link_preview: bool = True,
+        mentions_everyone: bool = True,
+        quoted: dict | None = None,
+    ) -> str:
+        """Como `send_sticker`, pero acepta ruta/archivo/bytes y codifica el base64 en streaming."""
+        payload = {
+            "number": number,
+            "delay": delay,
+            "linkPreview": link_preview,
+            "mentionsEveryOne": mentions_everyone,
+        }
+        if quoted:
+            payload["quoted"] = quoted
+        body = Base64JsonBody(payload, "sticker", source, codec=self.codec)
+        resp = self.post(f"/message/sendSticker/{self.instance}", payload, body=body)
+        return resp.text
+
     def send_reaction(
         self,
         remote_jid: str,
@@ -224,18 +431,19 @@ class WhatsAppSender:
         params = {"getParticipants": str(get_participants).lower()}
         resp = self.get(f"/group/fetchAllGroups/{self.instance}", params=params)
         if resp.status_code == 200:
-            return resp.json()
+            return self.codec.loads(resp.content)
         else:
             raise Exception(
                 f"Error al obtener grupos: {resp.status_code} - {resp.text}"
             )
 
     @staticmethod
-    def fetch_instances(api_key: str, server_url: str) -> list:
+    def fetch_instances(api_key: str, server_url: str, session: Optional[PooledSession] = None) -> list:
         """Obtiene todas las instancias disponibles en el servidor."""
         url = f"{server_url}/instance/fetchInstances"
         headers = {"apikey": api_key}
-        response = requests.get(url, headers=headers, verify=False)
+        getter = session.get if session is not None else requests.get
+        response = getter(url, headers=headers, verify=False)
         # Puede ser una lista o dict, depende del backend
         try:
             return response.json()
@@ -243,9 +451,9 @@ class WhatsAppSender:
             return []
 
     @staticmethod
-    def get_instance_info(api_key: str, instance_name: str, server_url: str):
+    def get_instance_info(api_key: str, instance_name: str, server_url: str, session: Optional[PooledSession] = None):
         """Busca la info de una instancia específica por nombre, robusto a diferentes formatos de respuesta."""
-        instances = WhatsAppSender.fetch_instances(api_key, server_url)
+        instances = WhatsAppSender.fetch_instances(api_key, server_url, session=session)
 
         # Normalizar a lista para iterar
         if isinstance(instances, dict):
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+# =========================
+# SINGLE-FLIGHT (coalescencia de peticiones idénticas)
+# =========================
+class SingleFlight(Generic[T]):
+    """
+    Agrupa llamadas concurrentes con la misma clave: solo la primera ejecuta `fn`,
+    las demás esperan esa misma tarea y reciben el mismo resultado (o la misma excepción).
+
+    - La tarea vive aparte de quien la lanzó (`asyncio.shield`): si el primer llamador se cancela,
+      los demás siguen esperando el resultado.
+    - Al terminar se olvida la clave: no es un caché, la siguiente llamada vuelve a ejecutar `fn`.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # marca la excepción como leída aunque nadie espere ya
+
+    def inflight(self) -> int:
+        return len(self._inflight)
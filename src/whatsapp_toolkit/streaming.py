@@ -0,0 +1,320 @@
+import asyncio
+import base64
+import inspect
+import mmap
+import os
+import re
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Iterator, Optional, Union
+
+from .codec import JsonCodec, default_codec
+
+MediaSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+# Destino de una descarga: ruta, archivo binario abierto u objeto con `write` (sync o async)
+MediaSink = Union[str, os.PathLike, Any]
+
+# Múltiplo de 3 para que cada trozo se codifique sin padding intermedio
+DEFAULT_CHUNK_SIZE = 3 * 64 * 1024
+# Bytes que `open_sink` acumula antes de escribir a disco (cada escritura va a un hilo)
+SINK_BUFFER_SIZE = 1024 * 1024
+
+
+def _b64_len(size: int) -> int:
+    return 4 * ((size + 2) // 3)
+
+
+# =========================
+# CUERPO JSON CON BASE64 EN STREAMING
+# =========================
+class Base64JsonBody:
+    """
+    Cuerpo JSON de una petición en el que un campo (p.ej. "media") es el base64 de un archivo,
+    generado por trozos al enviarse. Nunca existe el base64 completo en memoria: el pico por envío
+    es ~`chunk_size`, sin importar el tamaño del archivo.
+
+    - source: ruta (se lee con mmap), bytes/bytearray/memoryview o archivo binario abierto.
+    - Se puede iterar varias veces (reintentos) salvo que el origen sea un stream no seekable
+      (`rewindable` False): los senders lo envían en un solo intento y una segunda iteración falla,
+      así nunca sale un cuerpo con la media vacía.
+    - `len()` da el Content-Length exacto cuando el tamaño del origen se conoce.
+    - codec: serializa el resto del payload (el del sender; por defecto el del paquete).
+    """
+
+    def __init__(
+        self,
+        payload: dict[str, Any],
+        field: str,
+        source: MediaSource,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        codec: Optional[JsonCodec] = None,
+    ):
+        if chunk_size % 3:
+            raise ValueError("chunk_size debe ser múltiplo de 3")
+        self.payload = payload
+        self.field = field
+        self.source = source
+        self.chunk_size = chunk_size
+
+        codec = codec or default_codec()
+        head = codec.dumps(payload)
+        separator = b"," if payload else b""
+        self._prefix = head[:-1] + separator + codec.dumps(field) + b':"'
+        self._suffix = b'"}'
+
+        self._start: int = 0
+        self._iterated = False
+        if not isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview)) and source.seekable():
+            self._start = source.tell()
+        self.source_size = self._source_size()
+
+    def _source_size(self) -> Optional[int]:
+        src = self.source
+        if isinstance(src, (str, os.PathLike)):
+            return os.path.getsize(src)
+        if isinstance(src, (bytes, bytearray)):
+            return len(src)
+        if isinstance(src, memoryview):
+            return src.nbytes
+        if src.seekable():
+            end = src.seek(0, os.SEEK_END)
+            src.seek(self._start)
+            return end - self._start
+        return None
+
+    @property
+    def rewindable(self) -> bool:
+        """True si el cuerpo puede volver a generarse completo (reintentos)."""
+        src = self.source
+        return isinstance(src, (str, os.PathLike, bytes, bytearray, memoryview)) or src.seekable()
+
+    @property
+    def content_length(self) -> Optional[int]:
+        if self.source_size is None:
+            return None
+        return len(self._prefix) + _b64_len(self.source_size) + len(self._suffix)
+
+    def __len__(self) -> int:
+        length = self.content_length
+        if length is None:
+            raise TypeError("Origen sin tamaño conocido: el cuerpo se envía con chunked encoding")
+        return length
+
+    # --- LECTURA DEL ORIGEN ---
+
+    def _raw_chunks(self) -> Iterator[memoryview | bytes]:
+        src = self.source
+        size = self.chunk_size
+
+        if isinstance(src, (str, os.PathLike)):
+            with open(src, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    # Slicing del mmap copia solo `size` bytes; una memoryview impediría cerrar el mapa
+                    for offset in range(0, len(mapped), size):
+                        yield mapped[offset:offset + size]
+            return
+
+        if isinstance(src, (bytes, bytearray, memoryview)):
+            view = memoryview(src).cast("B")
+            for offset in range(0, view.nbytes, size):
+                yield view[offset:offset + size]
+            return
+
+        if src.seekable():
+            src.seek(self._start)
+        while True:
+            chunk = src.read(size)
+            if not chunk:
+                return
+            # Un read() corto no garantiza múltiplos de 3: completamos el trozo
+            while len(chunk) % 3:
+                more = src.read(3 - len(chunk) % 3)
+                if not more:
+                    break
+                chunk += more
+            yield chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._iterated and not self.rewindable:
+            raise RuntimeError("El origen no es seekable: el cuerpo ya se consumió y no puede reenviarse")
+        self._iterated = True
+        yield self._prefix
+        for chunk in self._raw_chunks():
+            yield base64.b64encode(chunk)
+        yield self._suffix
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for piece in self:
+            yield piece
+
+    def async_stream(self) -> "_AsyncBodyStream":
+        """Vista solo-async del cuerpo para `httpx.AsyncClient` (re-iterable entre reintentos)."""
+        return _AsyncBodyStream(self)
+
+    def headers(self) -> dict[str, str]:
+        """Cabeceras extra para enviar el cuerpo (Content-Length si se conoce)."""
+        length = self.content_length
+        return {"Content-Length": str(length)} if length is not None else {}
+
+
+class _AsyncBodyStream:
+    # httpx elige el modo síncrono si el contenido es Iterable; esta envoltura solo expone __aiter__
+    # y, al no ser un generador, httpx permite recorrerla de nuevo en cada reintento.
+    def __init__(self, body: Any):
+        self._body = body
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._body.__aiter__()
+
+
+def media_filename(source: MediaSource, default: str = "archivo") -> str:
+    """Nombre de archivo razonable para un origen de media."""
+    if isinstance(source, (str, os.PathLike)):
+        return Path(source).name
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and name:
+        return Path(name).name
+    return default
+
+
+# =========================
+# DESCARGA: DECODIFICACIÓN INCREMENTAL DEL CAMPO BASE64
+# =========================
+class Base64FieldDecoder:
+    """
+    Parser incremental de una respuesta JSON con un campo base64 grande
+    (p.ej. `{"mediaType": ..., "base64": "...."}` de getBase64FromMediaMessage).
+
+    `feed(trozo)` devuelve los bytes ya decodificados de ese trozo; el base64 nunca se acumula
+    (solo quedan pendientes <4 caracteres). El resto del JSON (pequeño) se guarda para `metadata()`.
+    """
+
+    def __init__(self, field: str = "base64", max_metadata: int = 1024 * 1024, codec: Optional[JsonCodec] = None):
+        self._field = field
+        self._key = re.compile(rb'"' + re.escape(field.encode("utf-8")) + rb'"\s*:\s*"')
+        self._max_metadata = max_metadata
+        self._codec = codec or default_codec()
+        self._state = "scan"  # scan -> value -> tail
+        self._head = bytearray()  # JSON hasta la comilla que abre el valor (incluida)
+        self._tail = bytearray()  # JSON desde la comilla que cierra el valor
+        self._pending = bytearray()  # base64 aún no alineado a 4 caracteres
+        self.decoded_size = 0
+
+    @property
+    def found(self) -> bool:
+        return self._state != "scan"
+
+    def feed(self, chunk: bytes) -> bytes:
+        if self._state == "scan":
+            self._head += chunk
+            match = self._key.search(self._head)
+            if match is None:
+                self._check_metadata(self._head)
+                return b""
+            chunk = bytes(self._head[match.end():])
+            del self._head[match.end():]
+            self._state = "value"
+
+        if self._state == "tail":
+            self._tail += chunk
+            self._check_metadata(self._tail)
+            return b""
+
+        end = chunk.find(b'"')
+        if end != -1:
+            self._tail += chunk[end:]
+            chunk = chunk[:end]
+            self._state = "tail"
+        # En JSON el único escape posible dentro de base64 es "\/"
+        self._pending += chunk.replace(b"\\", b"")
+        usable = len(self._pending) - len(self._pending) % 4
+        if not usable:
+            return b""
+        decoded = base64.b64decode(self._pending[:usable])
+        del self._pending[:usable]
+        self.decoded_size += len(decoded)
+        return decoded
+
+    def close(self) -> bytes:
+        """Valida el final de la respuesta y devuelve lo que quedaba pendiente."""
+        if self._state == "scan":
+            raise ValueError("La respuesta no contiene el campo base64")
+        if self._state == "value":
+            raise ValueError("Respuesta truncada: el base64 no terminó")
+        if not self._pending:
+            return b""
+        decoded = base64.b64decode(self._pending + b"=" * (-len(self._pending) % 4))
+        self._pending.clear()
+        self.decoded_size += len(decoded)
+        return decoded
+
+    def metadata(self) -> dict[str, Any]:
+        """El resto del JSON (sin el campo base64)."""
+        data = self._codec.loads(bytes(self._head + self._tail))
+        if not isinstance(data, dict):
+            return {}
+        data.pop(self._field, None)
+        return data
+
+    def _check_metadata(self, buffer: bytearray) -> None:
+        if len(buffer) > self._max_metadata:
+            raise ValueError("Respuesta demasiado grande fuera del campo base64")
+
+
+@dataclass
+class MediaDownload:
+    """Resultado de una descarga en streaming."""
+    size: int
+    path: Optional[Path] = None
+    mimetype: Optional[str] = None
+    file_name: Optional[str] = None
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+
+@asynccontextmanager
+async def open_sink(dest: MediaSink) -> AsyncIterator[tuple[Callable[[bytes], Awaitable[None]], Optional[Path]]]:
+    """
+    Abre el destino de una descarga y entrega `(write, ruta)`.
+    Con ruta se escribe a `<ruta>.part` y se renombra al terminar (sin archivos a medias si falla).
+    El disco se toca en un hilo: las escrituras se agrupan en bloques de `SINK_BUFFER_SIZE`
+    y la apertura, el cierre y el renombrado tampoco bloquean el event loop.
+    """
+    if isinstance(dest, (str, os.PathLike)):
+        path = Path(dest)
+        partial = path.with_name(path.name + ".part")
+        f = await asyncio.to_thread(open, partial, "wb")
+        buffer = bytearray()
+
+        async def _write_file(data: bytes) -> None:
+            buffer.extend(data)
+            if len(buffer) >= SINK_BUFFER_SIZE:
+                block = bytes(buffer)
+                buffer.clear()
+                await asyncio.to_thread(f.write, block)
+
+        def _finish() -> None:
+            with f:
+                f.write(buffer)
+            os.replace(partial, path)
+
+        def _discard() -> None:
+            f.close()
+            partial.unlink(missing_ok=True)
+
+        try:
+            yield _write_file, path
+        except BaseException:
+            await asyncio.to_thread(_discard)
+            raise
+        await asyncio.to_thread(_finish)
+        return
+
+    async def _write_sink(data: bytes) -> None:
+        result = dest.write(data)
+        if inspect.isawaitable(result):
+            await result
+
+    yield _write_sink, None
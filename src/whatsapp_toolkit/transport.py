@@ -0,0 +1,110 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# =========================
+# CONFIGURACIÓN DEL POOL HTTP (SÍNCRONO)
+# =========================
+@dataclass
+class HttpConfig:
+    """
+    Parámetros del pool HTTP compartido por `WhatsAppInstance` y `WhatsAppSender`.
+
+    - pool_connections: número de pools (hosts) que se mantienen en caché.
+    - pool_maxsize: conexiones reutilizables por host (lo que pueden usar N hilos a la vez).
+    - pool_block: si True, al agotar el pool se espera una conexión libre en vez de abrir una extra.
+    - keep_alive: si False se envía `Connection: close` y cada petición abre conexión nueva.
+    - connect_timeout / read_timeout: se aplican igual a GET, PUT, POST y DELETE.
+    - thread_safe: si True cada hilo obtiene su propia `requests.Session` (mismo config),
+      así un `WhatsappClient` puede usarse desde un pool de workers sin compartir estado.
+    """
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    pool_block: bool = False
+    keep_alive: bool = True
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    verify: bool = True
+    thread_safe: bool = False
+
+    @property
+    def timeout(self) -> tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+class PooledSession:
+    """
+    Sesión HTTP con pool de conexiones keep-alive.
+    Evita el handshake TCP/TLS por mensaje que tenían las llamadas sueltas a `requests.post`.
+    """
+
+    def __init__(self, config: Optional[HttpConfig] = None, headers: Optional[dict] = None):
+        self.config = config or HttpConfig()
+        self.headers = dict(headers or {})
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._sessions: list[requests.Session] = []
+        self._shared: Optional[requests.Session] = None
+
+    def _build(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            pool_block=self.config.pool_block,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(self.headers)
+        if not self.config.keep_alive:
+            session.headers["Connection"] = "close"
+        session.verify = self.config.verify
+
+        with self._lock:
+            self._sessions.append(session)
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        """Sesión a usar en el hilo actual (compartida o por hilo según `thread_safe`)."""
+        if not self.config.thread_safe:
+            if self._shared is None:
+                with self._lock:
+                    if self._shared is None:
+                        self._shared = self._build()
+            return self._shared
+
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._build()
+            self._local.session = session
+        return session
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.config.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        """Cierra todas las sesiones (de todos los hilos) y libera sus conexiones."""
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+        self._shared = None
@@ -1,2 +1,10 @@
-from .audio import generar_audio
-from .utils import HttpResponse, timeout_response
\ No newline at end of file
+from .utils import HttpResponse, timeout_response
+
+
+def __getattr__(name: str):
+    # generar_audio arrastra platformdirs y el stack de TTS: solo se importa si se usa
+    if name == "generar_audio":
+        from .audio import generar_audio
+
+        return generar_audio
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
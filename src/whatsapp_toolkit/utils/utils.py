@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 from functools import wraps
 import requests
+from ..breaker import CircuitOpenError
 
 
 
@@ -18,6 +19,8 @@ def timeout_response(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except CircuitOpenError as e:
+            return HttpResponse(status_code=503, text=str(e), json_data=None)
         except requests.Timeout:
             print("La solicitud ha excedido el tiempo de espera.")
             return HttpResponse(status_code=408, text="Timeout", json_data=None)
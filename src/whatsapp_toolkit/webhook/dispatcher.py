@@ -6,14 +6,18 @@ from .events import EVENT_MODEL_MAP
 
 class WebhookManager:
     def __init__(self):
-        self._registry: Dict[str, List[tuple[Callable, Type[BaseModel]]]] = {}
+        self._registry: Dict[str, List[tuple[Callable, Type[BaseModel], bool]]] = {}
         self._routers: list = []
 
-    def on(self, event_type: str, model: Optional[Type[BaseModel]] = None):
+    def on(self, event_type: str, model: Optional[Type[BaseModel]] = None, shared: bool = False):
         """
         Decorador para registrar handlers por evento. Soporta multiples handlers por evento.
         Uso simple: @manager.on(EventType.MESSAGES_UPSERT) -> Auto-detecta el modelo.
         Uso avanzado: @manager.on(..., model=MiModeloCustom) -> Sobrescribe el modelo.
+
+        Cada handler recibe su propio evento validado: si uno lo modifica, los demas no lo ven.
+        shared=True es para handlers de solo lectura (p.ej. el cache de mensajes): reciben un evento que
+        luego puede entregarse a otro handler, asi no cuestan una validacion extra. No deben modificarlo.
         """
         if model is None:
             model = EVENT_MODEL_MAP.get(event_type)
@@ -27,7 +31,7 @@ class WebhookManager:
             Logger.debug(f"Handler registrado: {event_type} -> {model.__name__}")
             if event_type not in self._registry:
                 self._registry[event_type] = []
-            self._registry[event_type].append((func, model))
+            self._registry[event_type].append((func, model, shared))
             return func
         return wrapper
 
@@ -52,16 +56,29 @@ class WebhookManager:
         """
         Motor: Recibe JSON -> Busca Handlers -> Valida -> Ejecuta todos.
         Tambien despacha a routers registrados via include_router().
+        Cada handler/router recibe su propia instancia; la que validaron handlers `shared` se le pasa
+        al siguiente handler/router normal del mismo modelo en vez de validar otra vez.
         """
         event_name = payload.get("event")
         if not event_name:
             return
 
+        # Eventos ya validados que todavia no tiene ningun handler que pueda modificarlos
+        unowned: Dict[Type[BaseModel], BaseModel] = {}
+
+        def _validate(model_class: Type[BaseModel], shared: bool = False) -> BaseModel:
+            event = unowned.get(model_class) if shared else unowned.pop(model_class, None)
+            if event is None:
+                event = model_class.model_validate(payload)
+                if shared:
+                    unowned[model_class] = event
+            return event
+
         # Ejecutar handlers registrados con @manager.on()
         handlers = self._registry.get(event_name, [])
-        for handler_func, model_class in handlers:
+        for handler_func, model_class, shared in handlers:
             try:
-                clean_event = model_class.model_validate(payload)
+                clean_event = _validate(model_class, shared)
                 await handler_func(clean_event)
             except Exception as e:
                 Logger.error(f"[Dispatcher] Error procesando {event_name}: {e}")
@@ -74,7 +91,7 @@ class WebhookManager:
                 model_class = EVENT_MODEL_MAP.get(event_name)
                 if model_class is None:
                     continue
-                clean_event = model_class.model_validate(payload)
+                clean_event = _validate(model_class)
                 await router.route(clean_event)
             except Exception as e:
                 Logger.error(f"[Dispatcher] Error en router para {event_name}: {e}")
@@ -0,0 +1,76 @@
+""" Benchmark de codecs JSON (stdlib vs orjson) sobre payloads reales del toolkit.
+
+Uso:
+    python test/bench_codec.py
+"""
+import base64
+import os
+import timeit
+
+from whatsapp_toolkit.codec import JsonCodec, get_codec, orjson_available
+
+
+def _payloads() -> dict[str, object]:
+    texto = {
+        "number": "5214771234567",
+        "text": "Hola 👋, tu pedido #12345 está en camino 🚚. ¡Gracias por tu compra!",
+        "delay": 0,
+        "linkPreview": True,
+    }
+    media = {
+        "number": "5214771234567",
+        "mediatype": "document",
+        "mimetype": "application/pdf",
+        "caption": "Factura de enero",
+        "media": base64.b64encode(os.urandom(2 * 1024 * 1024)).decode("ascii"),
+        "fileName": "factura.pdf",
+        "delay": 0,
+    }
+    registros = [
+        {
+            "key": {"id": f"3EB0{i:016X}", "remoteJid": "5214771234567@s.whatsapp.net", "fromMe": i % 2 == 0},
+            "pushName": "Cliente",
+            "message": {"conversation": f"Mensaje número {i} con acentos y emojis 🎉"},
+            "messageType": "conversation",
+            "messageTimestamp": 1735689600 + i,
+        }
+        for i in range(200)
+    ]
+    return {
+        "texto (send_text)": texto,
+        "media 2 MB (send_media)": media,
+        "findMessages 200 registros": {"messages": {"total": 200, "pages": 1, "currentPage": 1, "records": registros}},
+    }
+
+
+def _medir(codec: JsonCodec, obj: object) -> tuple[float, float]:
+    """Devuelve (µs por dumps, µs por loads) usando el mejor de 5 repeticiones."""
+    data = codec.dumps(obj)
+    numero = max(1, int(20_000 / max(1, len(data) // 1024)))
+    dumps = min(timeit.repeat(lambda: codec.dumps(obj), number=numero, repeat=5)) / numero
+    loads = min(timeit.repeat(lambda: codec.loads(data), number=numero, repeat=5)) / numero
+    return dumps * 1e6, loads * 1e6
+
+
+def main() -> None:
+    codecs = [get_codec("json")]
+    if orjson_available():
+        codecs.append(get_codec("orjson"))
+    else:
+        print("⚠️ orjson no está instalado (pip install whatsapp-toolkit[fast]); solo se mide stdlib.\n")
+
+    for nombre, obj in _payloads().items():
+        print(f"== {nombre} ({len(codecs[0].dumps(obj)) / 1024:.1f} KiB)")
+        base = None
+        for codec in codecs:
+            dumps_us, loads_us = _medir(codec, obj)
+            if base is None:
+                base = (dumps_us, loads_us)
+                extra = ""
+            else:
+                extra = f"  (x{base[0] / dumps_us:.1f} dumps, x{base[1] / loads_us:.1f} loads)"
+            print(f"   {codec.name:<7} dumps {dumps_us:>10.1f} µs   loads {loads_us:>10.1f} µs{extra}")
+
+
+if __name__ == "__main__":
+    main()
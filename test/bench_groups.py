@@ -0,0 +1,245 @@
+""" Benchmarks de consultas sobre `Groups` (snapshot real + datasets sintéticos).
+
+Uso:
+    python test/bench_groups.py
+"""
+import json
+import random
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Optional
+
+from whatsapp_toolkit.compact_groups import CompactGroups
+from whatsapp_toolkit.lazy_groups import LazyGroups
+from whatsapp_toolkit.schemas import GroupBase, Groups
+
+RAIZ = Path(__file__).resolve().parent.parent
+GRUPOS_REALES = RAIZ / "grupos_obtenidos.json"
+
+PALABRAS = (
+    "club", "futbol", "león", "familia", "trabajo", "ventas", "soporte", "amigos", "escuela", "padres",
+    "comunidad", "avisos", "guadalajara", "méxico", "torneo", "vecinos", "ciclismo", "lectura", "música", "café",
+)
+
+
+def grupos_sinteticos(n: int, participantes: int = 20, semilla: int = 7) -> list[dict]:
+    """Genera `n` grupos crudos con la forma de fetchAllGroups."""
+    rnd = random.Random(semilla)
+    grupos = []
+    for i in range(n):
+        subject = " ".join(rnd.sample(PALABRAS, 3)) + f" {i}"
+        grupos.append({
+            "id": f"1203630{i:08d}@g.us",
+            "subject": subject,
+            "subjectTime": 1700000000 + i,
+            "size": participantes,
+            "creation": 1600000000 + i,
+            "restrict": False,
+            "announce": i % 5 == 0,
+            "isCommunity": False,
+            "isCommunityAnnounce": False,
+            "participants": [
+                {
+                    "id": f"{rnd.randrange(10**14):014d}@lid",
+                    "phoneNumber": f"521{rnd.randrange(10**10):010d}@s.whatsapp.net",
+                    "admin": "admin" if j == 0 else None,
+                }
+                for j in range(participantes)
+            ],
+        })
+    return grupos
+
+
+def cargar(raw: list[dict]) -> Groups:
+    grupos = Groups()
+    grupos.upload_groups(raw)
+    return grupos
+
+
+def _datasets() -> dict[str, list[dict]]:
+    datasets = {}
+    if GRUPOS_REALES.exists():
+        datasets[f"reales ({GRUPOS_REALES.name})"] = json.loads(GRUPOS_REALES.read_text(encoding="utf-8"))
+    for n in (1_000, 10_000):
+        datasets[f"sintéticos {n}"] = grupos_sinteticos(n, participantes=5)
+    datasets["sintéticos 2000 x 50"] = grupos_sinteticos(2_000, participantes=50)
+    return datasets
+
+
+def _us_por_llamada(fn, numero: int = 2_000) -> float:
+    return min(timeit.repeat(fn, number=numero, repeat=5)) / numero * 1e6
+
+
+# =============================
+# LOOKUP POR ID / SUBJECT
+# =============================
+def _busqueda_lineal(grupos: Groups, group_id: str) -> Optional[GroupBase]:
+    """Implementación previa (recorrido lineal) como referencia."""
+    for group in grupos.groups:
+        if group.id == group_id:
+            return group
+    return None
+
+
+def bench_lookup(datasets: dict[str, list[dict]]) -> None:
+    print("== Lookup por id / subject (µs por consulta)")
+    for nombre, raw in datasets.items():
+        grupos = cargar(raw)
+        ultimo = grupos.groups[-1]  # peor caso del recorrido lineal
+        lineal = _us_por_llamada(lambda: _busqueda_lineal(grupos, ultimo.id), numero=200)
+        por_id = _us_por_llamada(lambda: grupos.get_group_by_id(ultimo.id))
+        por_subject = _us_por_llamada(lambda: grupos.get_group_by_subject(ultimo.subject))
+        print(f"   {nombre:<32} lineal {lineal:>9.2f}   índice id {por_id:>6.2f}   índice subject {por_subject:>6.2f}")
+
+
+# =============================
+# BÚSQUEDA POR SUBJECT
+# =============================
+def _search_lineal(grupos: Groups, query: str, limit: int = 10) -> list[GroupBase]:
+    """Implementación previa (substring por token sobre cada subject) como referencia."""
+    q = query.strip().lower()
+    tokens = [token for token in q.split() if token]
+    scored = []
+    for group in grupos.groups:
+        subject = (group.subject or "").lower()
+        score = 2 if q in subject else 0
+        score += sum(1 for token in tokens if token in subject)
+        if score > 0:
+            scored.append((score, group))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [group for _, group in scored[:limit]]
+
+
+CONSULTAS = ("club", "leon", "futbl", "comunidad avisos", "guadalajra torneo", "musica cafe")
+
+
+def bench_search(datasets: dict[str, list[dict]]) -> None:
+    print("\n== search_group (µs por consulta, promedio de las consultas)")
+    for nombre, raw in datasets.items():
+        grupos = cargar(raw)
+        grupos.search_group("warmup")  # el índice ya existe tras upload_groups; esto solo calienta cachés
+        lineal = sum(_us_por_llamada(lambda: _search_lineal(grupos, q), numero=20) for q in CONSULTAS) / len(CONSULTAS)
+        indice = sum(_us_por_llamada(lambda: grupos.search_group(q), numero=200) for q in CONSULTAS) / len(CONSULTAS)
+        print(f"   {nombre:<32} lineal {lineal:>10.1f}   índice invertido {indice:>8.1f}")
+
+    grupos = cargar(grupos_sinteticos(10_000, participantes=0))
+    print("\n   Resultados (sintéticos 10000):")
+    for q in CONSULTAS:
+        encontrados = [g.subject for g in grupos.search_group(q, limit=3)]
+        previos = len(_search_lineal(grupos, q, limit=3))
+        print(f"   {q!r:<22} -> {encontrados}  (antes: {previos} resultados)")
+
+
+# =============================
+# PARTICIPANTES
+# =============================
+def _grupos_de_lineal(grupos: Groups, participante: str) -> list[GroupBase]:
+    """Recorrido de todos los participantes de todos los grupos como referencia."""
+    return [
+        group for group in grupos.groups
+        if any(participante in (p.id, p.phoneNumber) for p in group.participants)
+    ]
+
+
+def bench_participantes(datasets: dict[str, list[dict]]) -> None:
+    print("\n== Participantes (µs por consulta)")
+    for nombre, raw in datasets.items():
+        grupos = cargar(raw)
+        conteo = grupos.members_in_at_least(1)
+        a, b = sorted(conteo, key=conteo.get, reverse=True)[:2]
+        a_jid = next(p.id for g in grupos.groups for p in g.participants if p.id.startswith(a))
+        lineal = _us_por_llamada(lambda: _grupos_de_lineal(grupos, a_jid), numero=20)
+        indice = _us_por_llamada(lambda: grupos.groups_of(a_jid))
+        comunes = _us_por_llamada(lambda: grupos.shared_groups(a, b))
+        frecuentes = _us_por_llamada(lambda: grupos.members_in_at_least(2), numero=20)
+        print(
+            f"   {nombre:<32} lineal {lineal:>9.1f}   groups_of {indice:>6.2f}"
+            f"   shared_groups {comunes:>6.2f}   members_in_at_least {frecuentes:>9.1f}"
+        )
+
+
+# =============================
+# CARGA DEL SNAPSHOT
+# =============================
+def _ms(fn, repeticiones: int = 5) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=repeticiones)) * 1e3
+
+
+def bench_carga(datasets: dict[str, list[dict]]) -> None:
+    print("\n== Carga de snapshot (ms)")
+    for nombre, raw in datasets.items():
+        texto = json.dumps(raw)
+        ids = [group["id"] for group in raw[:: max(1, len(raw) // 5)]][:5]
+        dump = cargar(raw).model_dump()  # lo que guarda el caché de Mongo
+
+        def lazy_y_consultas() -> None:
+            grupos = LazyGroups(raw)
+            for group_id in ids:
+                grupos.get_group_by_id(group_id)
+
+        parseo = _ms(lambda: json.loads(texto))
+        eager = _ms(lambda: cargar(raw))
+        cache_eager = _ms(lambda: Groups.model_validate(dump))
+        lazy = _ms(lambda: LazyGroups(raw))
+        cache_lazy = _ms(lambda: LazyGroups(dump["groups"], fails=dump["fails"]))
+        consultas = _ms(lazy_y_consultas)
+        print(
+            f"   {nombre:<32} json.loads {parseo:>8.2f}   upload_groups {eager:>8.2f}   caché eager {cache_eager:>8.2f}"
+            f"   LazyGroups {lazy:>6.3f}   caché lazy {cache_lazy:>6.3f}   lazy + 5 lookups {consultas:>8.2f}"
+        )
+
+
+# =============================
+# MEMORIA
+# =============================
+def _bytes_retenidos(construir) -> tuple[int, object]:
+    """Bytes que siguen asignados después de construir (el resultado se mantiene vivo)."""
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.get_traced_memory()[0]
+        resultado = construir()
+        return tracemalloc.get_traced_memory()[0] - antes, resultado
+    finally:
+        tracemalloc.stop()
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:>7.2f} MB"
+
+
+def bench_memoria(datasets: dict[str, list[dict]]) -> None:
+    print("\n== Memoria retenida por snapshot (tracemalloc)")
+    for nombre, raw in datasets.items():
+        tam_json = len(json.dumps(raw, ensure_ascii=False).encode("utf-8"))
+        modelos, _ = _bytes_retenidos(lambda: [GroupBase.model_validate(group) for group in raw])
+        modelos_indices, _ = _bytes_retenidos(lambda: cargar(raw))
+
+        def compacto_con_indices() -> CompactGroups:
+            grupos = CompactGroups(raw)
+            # Cada índice se construye en la primera consulta que lo usa
+            grupos.get_group_by_id("")
+            grupos.search_group("club")
+            grupos.groups_of("5210000000000")
+            return grupos
+
+        compacto, _ = _bytes_retenidos(lambda: CompactGroups(raw))
+        compacto_indices, _ = _bytes_retenidos(compacto_con_indices)
+        print(
+            f"   {nombre:<32} json {_mb(tam_json)}   Groups {_mb(modelos)} (+índices {_mb(modelos_indices)})"
+            f"   CompactGroups {_mb(compacto)} ({modelos / compacto:4.1f}x menos)"
+            f" (+índices {_mb(compacto_indices)}, {modelos_indices / compacto_indices:4.1f}x menos)"
+        )
+
+
+def main() -> None:
+    datasets = _datasets()
+    bench_lookup(datasets)
+    bench_search(datasets)
+    bench_participantes(datasets)
+    bench_carga(datasets)
+    bench_memoria(datasets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+""" Escalamiento de la ingesta paralela de snapshots de grupos según el número de workers.
+
+Compara la validación secuencial contra `upload_groups(..., workers=N)` con pool de procesos y de hilos
+(los hilos solo escalan en un intérprete free-threaded, p.ej. `python3.13t`).
+
+Uso:
+    python test/bench_parallel_ingest.py [n_grupos] [participantes]
+"""
+import os
+import sys
+import timeit
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_groups import grupos_sinteticos  # noqa: E402
+from whatsapp_toolkit.compact_groups import CompactGroups  # noqa: E402
+from whatsapp_toolkit.parallel_ingest import free_threaded  # noqa: E402
+from whatsapp_toolkit.schemas import Groups  # noqa: E402
+
+
+def _workers() -> list[int]:
+    cpus = os.cpu_count() or 1
+    cuentas = [1]
+    while cuentas[-1] * 2 <= cpus:
+        cuentas.append(cuentas[-1] * 2)
+    if cuentas[-1] != cpus:
+        cuentas.append(cpus)
+    return cuentas
+
+
+def _ms(fn) -> float:
+    return min(timeit.repeat(fn, number=1, repeat=3)) * 1e3
+
+
+def _cargar(clase, raw: list[dict], executor: Optional[Executor] = None, workers: Optional[int] = None):
+    grupos = clase()
+    grupos.upload_groups(raw, workers=workers, executor=executor)
+    return grupos
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    participantes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    raw = grupos_sinteticos(n, participantes=participantes)
+    print(f"{n} grupos x {participantes} participantes, {os.cpu_count()} CPUs, free-threaded: {free_threaded()}")
+
+    for clase in (Groups, CompactGroups):
+        base = _ms(lambda: _cargar(clase, raw))
+        print(f"\n== {clase.__name__}: secuencial {base:8.1f} ms")
+        for workers in _workers():
+            for nombre, pool in (("procesos", ProcessPoolExecutor), ("hilos", ThreadPoolExecutor)):
+                # El pool se crea una vez: se mide la ingesta, no el arranque de los workers
+                with pool(max_workers=workers) as executor:
+                    list(executor.map(abs, range(workers)))
+                    ms = _ms(lambda: _cargar(clase, raw, executor, workers))
+                print(f"   {workers:>3} workers {nombre:<9} {ms:8.1f} ms   speedup {base / ms:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
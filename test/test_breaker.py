@@ -0,0 +1,117 @@
+""" Circuit breaker: transiciones closed -> open -> half_open y un resultado por petición lógica. """
+import asyncio
+import types
+
+import httpx
+import pytest
+
+from whatsapp_toolkit import breaker as breaker_module
+from whatsapp_toolkit.async_instance import AsyncWhatsAppInstance
+from whatsapp_toolkit.async_sender import AsyncWhatsAppSender
+from whatsapp_toolkit.async_transport import AsyncHttpConfig
+from whatsapp_toolkit.breaker import CircuitBreaker, CircuitOpenError
+from whatsapp_toolkit.retry import RetryPolicy
+
+
+class Reloj:
+    """Reloj monotónico manual para no dormir en los tests."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch) -> Reloj:
+    reloj = Reloj()
+    monkeypatch.setattr(breaker_module, "time", types.SimpleNamespace(monotonic=reloj.monotonic))
+    return reloj
+
+
+def test_se_abre_por_tasa_de_fallos_con_minimo_de_llamadas(reloj):
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=30.0, open_timeout=15.0)
+    breaker.record_status(404)  # un 4xx cuenta como éxito: la instancia responde
+    breaker.record_failure()
+    breaker.record_status(502)
+    assert breaker.state == "closed"  # 3 < min_calls
+    breaker.record_failure()
+    assert breaker.state == "open"  # 3 de 4 fallos
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.rejected == 2
+    assert breaker.retry_in == 15.0
+
+    # Los resultados fuera de la ventana no cuentan
+    breaker.reset()
+    for _ in range(3):
+        breaker.record_failure()
+    reloj.ahora += 31.0
+    breaker.record_status(503)
+    assert breaker.state == "closed"
+
+
+def test_half_open_prueba_y_se_cierra_o_se_reabre(reloj):
+    breaker = CircuitBreaker(min_calls=1, open_timeout=15.0, half_open_probes=1)
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    reloj.ahora += 15.0
+    assert breaker.state == "half_open" and breaker.retry_in == 0.0
+    assert breaker.allow()  # la prueba
+    assert not breaker.allow()  # solo un hueco de prueba
+    breaker.check_not_open()  # un reintento en half_open no se corta
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check_not_open()
+
+    reloj.ahora += 15.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_prueba_sin_resultado_libera_su_hueco(reloj):
+    breaker = CircuitBreaker(min_calls=1, open_timeout=15.0)
+    breaker.record_failure()
+    reloj.ahora += 15.0
+    assert breaker.allow()  # la prueba se cancela y nunca reporta
+    assert not breaker.allow()
+    reloj.ahora += 15.0
+    assert breaker.allow()
+
+
+def _sender(handler, breaker: CircuitBreaker) -> AsyncWhatsAppSender:
+    instance = AsyncWhatsAppInstance("k", "con", "http://evolution", http_config=AsyncHttpConfig(transport=httpx.MockTransport(handler)))
+    return AsyncWhatsAppSender(instance, retry_policy=RetryPolicy(backoff_base=0.0, jitter=False), circuit_breaker=breaker)
+
+
+def test_un_resultado_por_peticion_logica():
+    respuestas = iter([503, 503, 201, 503, 503, 503])
+    llamadas = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        llamadas.append(request)
+        return httpx.Response(next(respuestas), json={})
+
+    breaker = CircuitBreaker(min_calls=2, failure_rate=0.5)
+
+    async def _run():
+        sender = _sender(handler, breaker)
+        # Dos 503 que el reintento recupera no son fallos: la petición salió bien
+        assert await sender.send_text("5214771234567", "hola")
+        assert breaker.state == "closed"
+        # Tres 503 agotan los reintentos: un solo fallo (1 de 2 llamadas) y el circuito se abre
+        assert not await sender.send_text("5214771234567", "hola")
+        assert breaker.state == "open"
+        # Abierto: falla sin tocar la red
+        assert not await sender.send_text("5214771234567", "hola")
+        await sender.close()
+
+    asyncio.run(_run())
+    assert len(llamadas) == 6
+    assert breaker.rejected == 1
@@ -0,0 +1,72 @@
+""" Dispatcher de webhooks: cada handler recibe su propio evento; los handlers `shared` no cuestan una validación extra. """
+import asyncio
+
+from whatsapp_toolkit.async_client import AsyncWhatsappClient
+from whatsapp_toolkit.message_cache import MessageCache
+from whatsapp_toolkit.webhook.dispatcher import WebhookManager
+from whatsapp_toolkit.webhook.events import EventType
+from whatsapp_toolkit.webhook.schemas import MessageUpsert
+
+
+def _payload() -> dict:
+    return {
+        "event": "messages.upsert",
+        "instance": "con",
+        "data": {
+            "key": {"remoteJid": "5214771234567@s.whatsapp.net", "fromMe": False, "id": "ABC123"},
+            "pushName": "Ana",
+            "message": {"conversation": "hola", "base64": "QUFBQQ=="},
+            "messageType": "conversation",
+            "messageTimestamp": 1700000000,
+        },
+    }
+
+
+def _contar_validaciones(monkeypatch) -> list[int]:
+    llamadas = [0]
+    original = MessageUpsert.model_validate.__func__
+
+    def contado(cls, *args, **kwargs):
+        llamadas[0] += 1
+        return original(cls, *args, **kwargs)
+
+    monkeypatch.setattr(MessageUpsert, "model_validate", classmethod(contado))
+    return llamadas
+
+
+def test_cada_handler_recibe_su_propio_evento():
+    manager = WebhookManager()
+    vistos = []
+
+    @manager.on(EventType.MESSAGES_UPSERT)
+    async def modifica(event):
+        event.body = "cambiado"
+        event.raw_message["conversation"] = "cambiado"
+
+    @manager.on(EventType.MESSAGES_UPSERT)
+    async def lee(event):
+        vistos.append((event.body, event.raw_message["conversation"]))
+
+    asyncio.run(manager.dispatch(_payload()))
+    assert vistos == [("hola", "hola")]
+
+
+def test_cache_compartido_no_agrega_validaciones(monkeypatch):
+    client = AsyncWhatsappClient("k", "http://evolution", "con", message_cache=MessageCache())
+    manager = WebhookManager()
+    client.attach_message_cache(manager)
+    recibidos = []
+
+    @manager.on(EventType.MESSAGES_UPSERT)
+    async def handler(event):
+        recibidos.append(event)
+        event.raw_message["conversation"] = "cambiado"
+
+    validaciones = _contar_validaciones(monkeypatch)
+    asyncio.run(manager.dispatch(_payload()))
+    assert validaciones[0] == 1
+    assert len(recibidos) == 1
+
+    cacheado = asyncio.run(client.get_message("ABC123"))
+    assert cacheado is not recibidos[0]
+    assert cacheado.raw_message == {"conversation": "hola"}  # sin base64 y sin lo que modificó el handler
@@ -0,0 +1,51 @@
+""" Índice inverso de participantes: la misma persona listada por LID y por teléfono es un solo miembro. """
+import colorstreak
+
+from whatsapp_toolkit import schemas
+from whatsapp_toolkit.schemas import Groups
+
+GRUPO_POR_LID = {
+    "id": "a@g.us", "subject": "A", "subjectTime": 1, "size": 1, "creation": 1,
+    "restrict": False, "announce": False, "isCommunity": False, "isCommunityAnnounce": False,
+    "participants": [{"id": "111@lid", "phoneNumber": "5215550000@s.whatsapp.net"}],
+}
+GRUPO_POR_TELEFONO = {
+    **GRUPO_POR_LID,
+    "id": "b@g.us",
+    "subject": "B",
+    "participants": [{"id": "5215550000@s.whatsapp.net"}, {"id": "222@lid"}],
+}
+
+
+def _cargar(*raw: dict) -> Groups:
+    grupos = Groups()
+    grupos.upload_groups(list(raw))
+    return grupos
+
+
+def test_lid_y_telefono_se_unen_en_cualquier_orden():
+    for orden in ((GRUPO_POR_LID, GRUPO_POR_TELEFONO), (GRUPO_POR_TELEFONO, GRUPO_POR_LID)):
+        grupos = _cargar(*orden)
+        for consulta in ("5215550000", "5215550000@s.whatsapp.net", "111@lid"):
+            assert sorted(g.id for g in grupos.groups_of(consulta)) == ["a@g.us", "b@g.us"]
+        assert grupos.members_in_at_least(2) == {"111": 2}
+        assert [g.id for g in grupos.shared_groups("111@lid", "222@lid")] == ["b@g.us"]
+
+
+def test_participante_desconocido():
+    grupos = _cargar(GRUPO_POR_LID)
+    assert grupos.groups_of("999") == []
+    assert grupos.shared_groups("111", "999") == []
+
+
+def test_workers_con_gil_avisa_y_carga_en_secuencia(monkeypatch):
+    avisos = []
+    monkeypatch.setattr(colorstreak.Logger, "warning", staticmethod(avisos.append))
+    monkeypatch.setattr(schemas, "free_threaded", lambda: False)
+    grupos = Groups()
+    grupos.upload_groups([GRUPO_POR_LID, GRUPO_POR_TELEFONO], workers=4)
+    assert [g.id for g in grupos.groups] == ["a@g.us", "b@g.us"]
+    assert len(avisos) == 1 and "workers=4 no tiene efecto" in avisos[0]
+
+    grupos.upload_groups([], workers=1)
+    assert len(avisos) == 1
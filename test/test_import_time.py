@@ -0,0 +1,57 @@
+""" Presupuesto de tiempo de import medido con `python -X importtime`. """
+import subprocess
+import sys
+
+# Dependencias que no deben cargarse solo por importar el paquete
+DEPENDENCIAS_PESADAS = ("pymongo", "reportlab", "jinja2", "platformdirs", "httpx", "requests")
+
+# Presupuestos en microsegundos (holgados para no romper en máquinas lentas / CI)
+PRESUPUESTO_PAQUETE_US = 50_000
+PRESUPUESTO_WEBHOOK_US = 1_500_000
+PRESUPUESTO_CLI_US = 1_000_000
+
+
+def _importtime(modulo: str) -> dict[str, int]:
+    """Ejecuta un intérprete limpio y devuelve {módulo: tiempo acumulado en µs}."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    tiempos: dict[str, int] = {}
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea.split("|")
+        tiempos[nombre.strip()] = int(acumulado)
+    return tiempos
+
+
+def test_paquete_no_importa_dependencias_pesadas():
+    tiempos = _importtime("whatsapp_toolkit")
+    assert not set(DEPENDENCIAS_PESADAS) & set(tiempos)
+    assert tiempos["whatsapp_toolkit"] < PRESUPUESTO_PAQUETE_US
+
+
+def test_webhook_solo_carga_lo_necesario():
+    tiempos = _importtime("whatsapp_toolkit.webhook")
+    assert not set(DEPENDENCIAS_PESADAS) & set(tiempos)
+    assert "whatsapp_toolkit.client" not in tiempos
+    assert "whatsapp_toolkit.async_client" not in tiempos
+    assert tiempos["whatsapp_toolkit.webhook"] < PRESUPUESTO_WEBHOOK_US
+
+
+def test_cli_no_carga_devtools_al_arrancar():
+    tiempos = _importtime("whatsapp_toolkit.cli.main")
+    assert "jinja2" not in tiempos
+    assert "whatsapp_toolkit.devtools.evolution" not in tiempos
+    assert "whatsapp_toolkit.devtools.webhook" not in tiempos
+    assert tiempos["whatsapp_toolkit.cli.main"] < PRESUPUESTO_CLI_US
+
+
+def test_exports_siguen_disponibles():
+    import whatsapp_toolkit
+
+    for nombre in whatsapp_toolkit.__all__:
+        assert getattr(whatsapp_toolkit, nombre) is not None
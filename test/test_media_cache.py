@@ -0,0 +1,102 @@
+""" Caché de media en disco: expulsión LRU por bytes, entradas fijadas y disco fuera del event loop. """
+import asyncio
+import os
+import threading
+
+from whatsapp_toolkit.media_cache import MediaCache
+
+
+def _descarga(size: int, llamadas: list | None = None):
+    async def download(path):
+        if llamadas is not None:
+            llamadas.append(path)
+        path.write_bytes(b"x" * size)
+        return {"mimetype": "image/jpeg"}
+
+    return download
+
+
+def test_expulsion_lru_por_bytes(tmp_path):
+    async def _run(cache: MediaCache):
+        await cache.fetch("a", _descarga(4))
+        await cache.fetch("b", _descarga(4))
+        await cache.fetch("a", _descarga(4))  # hit: "a" pasa a ser la más reciente
+        await cache.fetch("c", _descarga(4))
+
+    cache = MediaCache(tmp_path, max_bytes=10)
+    asyncio.run(_run(cache))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.metadata("a") == {"mimetype": "image/jpeg"}
+    m = cache.metrics()
+    assert (m.hits, m.misses, m.evictions, m.entries, m.bytes) == (1, 3, 1, 2, 8)
+    assert len(list(tmp_path.iterdir())) == 4  # archivo + .json por entrada
+
+    # Al reiniciar se reconstruye el índice y se borran las descargas a medias
+    (tmp_path / "x.part").write_bytes(b"corte")
+    reabierto = MediaCache(tmp_path, max_bytes=10)
+    assert len(reabierto) == 2 and reabierto.metrics().bytes == 8
+    assert not (tmp_path / "x.part").exists()
+
+
+def test_la_entrada_fijada_no_se_expulsa_hasta_soltarla(tmp_path):
+    cache = MediaCache(tmp_path, max_bytes=10)
+
+    async def _run():
+        await cache.fetch("a", _descarga(6))
+        cache._pin("a")
+        for key in ("b", "c"):
+            await cache.fetch(key, _descarga(6))
+        # "a" es la más antigua pero está fijada: se expulsa "b" y el caché queda excedido
+        assert list(cache._entries) == ["a", "c"]  # sin `get`, que la marcaría como usada
+        assert cache.metrics().bytes == 12
+        await asyncio.to_thread(cache._unpin, "a")
+
+    asyncio.run(_run())
+    # Al soltarla se aplica la expulsión pendiente; la más reciente siempre se conserva
+    assert cache.get("a") is None and cache.get("c") is not None
+    assert cache.metrics().bytes == 6
+
+
+def test_read_no_pierde_su_entrada_con_el_cache_lleno(tmp_path):
+    cache = MediaCache(tmp_path, max_bytes=10)
+
+    async def _run():
+        await cache.fetch("a", _descarga(6))
+        return await asyncio.gather(
+            cache.read("a", _descarga(6)),
+            *(cache.fetch(key, _descarga(6)) for key in "bcdefg"),
+        )
+
+    contenido, *_ = asyncio.run(_run())
+    assert contenido == b"x" * 6
+    assert cache.metrics().bytes <= cache.max_bytes
+
+
+def test_descargas_concurrentes_comparten_una_peticion(tmp_path):
+    cache = MediaCache(tmp_path, max_bytes=100)
+    llamadas = []
+
+    async def _run():
+        return await asyncio.gather(*(cache.read("a", _descarga(5, llamadas)) for _ in range(5)))
+
+    assert asyncio.run(_run()) == [b"xxxxx"] * 5
+    assert len(llamadas) == 1
+    assert cache.metrics().coalesced == 4
+
+
+def test_los_hits_tocan_el_disco_fuera_del_event_loop(tmp_path, monkeypatch):
+    cache = MediaCache(tmp_path, max_bytes=100)
+    asyncio.run(cache.fetch("a", _descarga(5)))
+    hilos = []
+    utime = os.utime
+
+    def registrado(*args, **kwargs):
+        hilos.append(threading.current_thread())
+        return utime(*args, **kwargs)
+
+    monkeypatch.setattr(os, "utime", registrado)
+    asyncio.run(cache.fetch("a", _descarga(5)))
+    assert asyncio.run(cache.read("a", _descarga(5))) == b"xxxxx"
+    assert len(hilos) == 2
+    assert threading.main_thread() not in hilos
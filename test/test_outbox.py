@@ -0,0 +1,85 @@
+""" Outbox: una caída de Evolution no consume intentos; un rechazo 4xx va directo a dead-letter. """
+import asyncio
+import sqlite3
+
+import httpx
+
+from whatsapp_toolkit.async_instance import AsyncWhatsAppInstance
+from whatsapp_toolkit.async_sender import AsyncWhatsAppSender
+from whatsapp_toolkit.async_transport import AsyncHttpConfig
+from whatsapp_toolkit.breaker import CircuitBreaker
+from whatsapp_toolkit.outbox import Outbox
+from whatsapp_toolkit.retry import RetryPolicy
+
+
+def _sender(handler, breaker: CircuitBreaker | None = None) -> AsyncWhatsAppSender:
+    instance = AsyncWhatsAppInstance("k", "con", "http://evolution", http_config=AsyncHttpConfig(transport=httpx.MockTransport(handler)))
+    return AsyncWhatsAppSender(
+        instance,
+        retry_policy=RetryPolicy(max_attempts=1),
+        circuit_breaker=breaker or CircuitBreaker(min_calls=1000),
+    )
+
+
+def _intentos(path) -> list[tuple[str, int]]:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT status, attempts FROM outbox").fetchall()
+
+
+def _drenar(sender: AsyncWhatsAppSender, path, segundos: float) -> Outbox:
+    async def _run() -> Outbox:
+        outbox = Outbox(sender, path=path, workers=1, max_attempts=2, base_delay=0.01, max_delay=0.02, poll_interval=0.01)
+        async with outbox:
+            await outbox.send_text("5214771234567", "hola")
+            await asyncio.sleep(segundos)
+        await sender.close()
+        return outbox
+
+    return asyncio.run(_run())
+
+
+def test_transporte_caido_no_manda_a_dead_letter(tmp_path):
+    llamadas = []
+
+    def caido(request: httpx.Request) -> httpx.Response:
+        llamadas.append(request)
+        raise httpx.ConnectError("connection refused", request=request)
+
+    path = tmp_path / "outbox.sqlite3"
+    # Con backoff de ~10 ms y max_attempts=2, sin la regla el mensaje moriría en el segundo intento
+    outbox = _drenar(_sender(caido), path, 0.5)
+    assert len(llamadas) > 2
+    assert _intentos(path) == [("pending", 0)]
+    assert outbox.metrics().dead_total == 0
+    assert outbox.dead_letters() == []
+
+
+def test_circuito_abierto_espera_a_la_prueba_sin_consumir_intentos(tmp_path):
+    breaker = CircuitBreaker(min_calls=1, open_timeout=60.0)
+    breaker.record_failure()  # abierto durante un minuto
+    llamadas = []
+
+    def ok(request: httpx.Request) -> httpx.Response:
+        llamadas.append(request)
+        return httpx.Response(201, json={})
+
+    path = tmp_path / "outbox.sqlite3"
+    outbox = _drenar(_sender(ok, breaker), path, 0.2)
+    assert llamadas == []
+    assert _intentos(path) == [("pending", 0)]
+    assert outbox.metrics().lag_seconds == 0.0  # reprogramado para cuando el circuito vuelva a probar
+
+
+def test_rechazo_definitivo_va_directo_a_dead_letter(tmp_path):
+    llamadas = []
+
+    def rechaza(request: httpx.Request) -> httpx.Response:
+        llamadas.append(request)
+        return httpx.Response(400, json={"message": "número inválido"})
+
+    path = tmp_path / "outbox.sqlite3"
+    outbox = _drenar(_sender(rechaza), path, 0.2)
+    assert len(llamadas) == 1
+    [dead] = outbox.dead_letters()
+    assert dead["attempts"] == 1
+    assert dead["last_error"] == "La API rechazó el envío (HTTP 400)"
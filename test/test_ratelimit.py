@@ -0,0 +1,91 @@
+""" Rate limiter: token bucket con deuda, turno por JID antes del token global y devolución al cancelar. """
+import asyncio
+
+import httpx
+import pytest
+
+from whatsapp_toolkit.async_instance import AsyncWhatsAppInstance
+from whatsapp_toolkit.async_sender import AsyncWhatsAppSender
+from whatsapp_toolkit.async_transport import AsyncHttpConfig
+from whatsapp_toolkit.ratelimit import RateLimiter, TokenBucket, recipient_of
+from whatsapp_toolkit.retry import RetryPolicy
+
+NUMERO = "5214771234567"
+
+
+def test_token_bucket_rafaga_deuda_y_recarga():
+    bucket = TokenBucket(rate=2.0, burst=2)
+    t0 = bucket.updated
+    assert [bucket.reserve(t0) for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]  # las esperas se encolan
+    # Un segundo después se pagó la deuda (2 tokens) y el siguiente espera lo que le toca
+    assert bucket.reserve(t0 + 1.0) == pytest.approx(0.5)
+    bucket.release()
+    assert bucket.reserve(t0 + 1.0) == pytest.approx(0.5)
+
+    lleno = TokenBucket(rate=1.0, burst=3)
+    lleno.release()
+    assert lleno.tokens == 3  # nunca por encima de la ráfaga
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=1)
+
+
+def test_bucket_por_jid_normalizado_y_acotado():
+    limiter = RateLimiter(rate=1000, burst=1000, per_jid_rate=1.0, per_jid_burst=1, max_jids=2)
+    assert limiter.reserve_jid(NUMERO) == 0.0
+    assert limiter.reserve_jid(f"{NUMERO}@s.whatsapp.net") > 0.9  # mismo destinatario, mismo bucket
+    assert limiter.reserve_jid(None) == 0.0
+    limiter.reserve_jid("1")
+    limiter.reserve_jid("2")  # expulsa el bucket más antiguo (NUMERO)
+    assert list(limiter._jids) == ["1", "2"]
+    assert limiter.reserve_jid(NUMERO) == 0.0
+
+    sin_jid = RateLimiter(per_jid_rate=None)
+    assert [sin_jid.reserve_jid(NUMERO) for _ in range(5)] == [0.0] * 5
+    assert recipient_of({"key": {"remoteJid": "x@g.us"}}) == "x@g.us"
+    assert recipient_of({}) is None
+
+
+def test_el_token_global_se_reserva_tras_el_turno_del_jid():
+    limiter = RateLimiter(rate=4.0, burst=2, per_jid_rate=10.0, per_jid_burst=1)
+
+    async def _run():
+        assert await limiter.acquire_async("lento") == 0.0
+        segundo = asyncio.create_task(limiter.acquire_async("lento"))  # espera ~0.1 s su turno de JID
+        await asyncio.sleep(0)
+        # El token global que queda no lo apartó la espera anterior: otro destinatario sale ya
+        assert await limiter.acquire_async("otro") == 0.0
+        assert await segundo > 0.15  # y el segundo envío al lento paga ahora la espera global
+
+    asyncio.run(_run())
+
+
+def test_espera_cancelada_devuelve_sus_tokens():
+    limiter = RateLimiter(rate=1000, burst=1000, per_jid_rate=1.0, per_jid_burst=1)
+
+    async def _run():
+        await limiter.acquire_async(NUMERO)
+        esperando = asyncio.create_task(limiter.acquire_async(NUMERO))
+        await asyncio.sleep(0.05)
+        esperando.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await esperando
+        # Sin la devolución el siguiente esperaría ~2 s (la deuda del cancelado + la suya)
+        return limiter.reserve_jid(NUMERO)
+
+    assert asyncio.run(_run()) < 1.0
+
+
+def test_cada_intento_del_sender_consume_un_token():
+    respuestas = iter([httpx.Response(503), httpx.Response(201, json={})])
+    limiter = RateLimiter(rate=1.0, burst=5, per_jid_rate=None)
+    instance = AsyncWhatsAppInstance("k", "con", "http://evolution", http_config=AsyncHttpConfig(
+        transport=httpx.MockTransport(lambda request: next(respuestas)),
+    ))
+
+    async def _run():
+        sender = AsyncWhatsAppSender(instance, rate_limiter=limiter, retry_policy=RetryPolicy(backoff_base=0.0, jitter=False))
+        assert await sender.send_text(NUMERO, "hola")
+        await sender.close()
+
+    asyncio.run(_run())
+    assert limiter._global.tokens == pytest.approx(3.0, abs=0.1)
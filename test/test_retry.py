@@ -0,0 +1,94 @@
+""" Política de reintentos: un POST solo se reintenta si es seguro, Retry-After y deadline. """
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from whatsapp_toolkit.async_instance import AsyncWhatsAppInstance
+from whatsapp_toolkit.async_sender import AsyncWhatsAppSender
+from whatsapp_toolkit.async_transport import AsyncHttpConfig
+from whatsapp_toolkit.breaker import CircuitBreaker
+from whatsapp_toolkit.retry import RetryPolicy, is_permanent_rejection, parse_retry_after
+
+SIN_ESPERA = RetryPolicy(backoff_base=0.0, jitter=False)
+
+
+def test_post_solo_reintenta_429_y_503():
+    policy = RetryPolicy()
+    assert [s for s in (429, 500, 502, 503, 504) if policy.retries_status("POST", s)] == [429, 503]
+    assert [s for s in (429, 500, 502, 503, 504) if policy.retries_status("GET", s)] == [429, 500, 502, 503, 504]
+    assert RetryPolicy(retry_on_timeout=True).retries_status("POST", 502)
+    assert not policy.retries_status("GET", 404)
+
+    assert is_permanent_rejection(400) and is_permanent_rejection(404)
+    assert not any(is_permanent_rejection(s) for s in (None, 408, 429, 500, 503))
+
+
+def test_parse_retry_after():
+    assert parse_retry_after(" 7 ") == 7.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("mañana") is None
+    en_10s = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=10), usegmt=True)
+    assert parse_retry_after(en_10s) == pytest.approx(10, abs=1.5)
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # en el pasado
+
+
+def test_next_delay_respeta_intentos_retry_after_y_deadline():
+    policy = RetryPolicy(max_attempts=3, backoff_base=1.0, backoff_max=3.0, jitter=False, deadline=10.0)
+    ahora = time.monotonic()
+    assert [policy.next_delay(n, ahora) for n in (1, 2, 3)] == [1.0, 2.0, None]
+    assert policy.next_delay(1, ahora, retry_after="4") == 4.0
+    assert policy.next_delay(1, ahora, retry_after="basura") == 1.0
+    assert RetryPolicy(respect_retry_after=False, backoff_base=1.0, jitter=False).next_delay(1, ahora, "4") == 1.0
+    # La espera rebasaría el deadline: mejor fallar ya que esperar para nada
+    assert policy.next_delay(1, ahora, retry_after="20") is None
+    assert policy.next_delay(1, ahora - 9.5) is None
+    assert RetryPolicy(deadline=None, jitter=False).next_delay(1, ahora - 1000) == 0.25
+
+    con_jitter = RetryPolicy(backoff_base=1.0, backoff_max=3.0)
+    assert all(0.0 <= con_jitter.backoff(5) <= 3.0 for _ in range(100))
+
+
+def _intentos(respuestas: list, metodo: str = "POST", policy: RetryPolicy = SIN_ESPERA) -> tuple[int, int]:
+    """Hace una petición contra respuestas encoladas y devuelve (intentos, status final)."""
+    pendientes = iter(respuestas)
+    llamadas = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        llamadas.append(request)
+        respuesta = next(pendientes)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return httpx.Response(respuesta, headers={"Retry-After": "0"} if respuesta == 429 else {})
+
+    async def _run() -> int:
+        instance = AsyncWhatsAppInstance("k", "con", "http://evolution", http_config=AsyncHttpConfig(transport=httpx.MockTransport(handler)))
+        sender = AsyncWhatsAppSender(instance, retry_policy=policy, circuit_breaker=CircuitBreaker(min_calls=1000))
+        try:
+            resp = await sender._request(metodo, "/message/sendText/con", json={"number": "1"})
+            return resp.status_code
+        finally:
+            await sender.close()
+
+    status = asyncio.run(_run())
+    return len(llamadas), status
+
+
+def test_sender_reintenta_un_post_solo_si_no_se_proceso():
+    assert _intentos([503, 429, 201]) == (3, 201)
+    assert _intentos([500, 201]) == (1, 500)  # Baileys pudo haber enviado el mensaje
+    assert _intentos([502, 201], policy=RetryPolicy(backoff_base=0.0, retry_on_timeout=True)) == (2, 201)
+    assert _intentos([500, 201], metodo="GET") == (2, 201)
+    assert _intentos([503, 503, 503, 201]) == (3, 503)  # max_attempts agotado
+
+
+def test_sender_reintenta_errores_de_conexion_pero_no_timeouts_de_un_post():
+    conexion = httpx.ConnectError("connection refused")
+    lectura = httpx.ReadTimeout("timeout")
+    assert _intentos([conexion, 201]) == (2, 201)
+    with pytest.raises(httpx.ReadTimeout):
+        _intentos([lectura, 201])
+    assert _intentos([lectura, 201], metodo="GET") == (2, 201)
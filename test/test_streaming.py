@@ -0,0 +1,189 @@
+""" Cuerpos JSON con base64 en streaming y decodificación por trozos. """
+import asyncio
+import base64
+import json
+import os
+
+import httpx
+import pytest
+
+from whatsapp_toolkit.async_instance import AsyncWhatsAppInstance
+from whatsapp_toolkit.async_sender import AsyncWhatsAppSender
+from whatsapp_toolkit.async_transport import AsyncHttpConfig
+from whatsapp_toolkit import streaming
+from whatsapp_toolkit.codec import JsonCodec
+from whatsapp_toolkit.retry import RetryPolicy
+from whatsapp_toolkit.streaming import Base64FieldDecoder, Base64JsonBody, open_sink
+
+
+class CodecContado(JsonCodec):
+    """Codec propio: cuenta sus llamadas para comprobar que el sender lo usa."""
+
+    def __init__(self):
+        self.llamadas = 0
+
+    def dumps(self, obj):
+        self.llamadas += 1
+        return super().dumps(obj)
+
+
+def _sender(handler, **kwargs) -> AsyncWhatsAppSender:
+    instance = AsyncWhatsAppInstance("k", "con", "http://evolution", http_config=AsyncHttpConfig(transport=httpx.MockTransport(handler)))
+    return AsyncWhatsAppSender(instance, **kwargs)
+
+
+def test_send_file_usa_el_codec_del_sender():
+    cuerpos = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        cuerpos.append(json.loads(request.read()))
+        return httpx.Response(201, json={})
+
+    async def _run():
+        codec = CodecContado()
+        sender = _sender(handler, json_codec=codec)
+        assert await sender.send_media_file("5214771234567", b"pdf", filename="a.pdf")
+        assert await sender.send_audio_file("5214771234567", b"ogg")
+        assert await sender.send_sticker_file("5214771234567", b"webp")
+        await sender.close()
+        return codec.llamadas
+
+    assert asyncio.run(_run()) == 6  # payload + nombre del campo por cuerpo
+    assert [c.get("media") or c.get("audio") or c.get("sticker") for c in cuerpos] == ["cGRm", "b2dn", "d2VicA=="]
+
+
+class SoloLectura:
+    """Stream no seekable (p.ej. un pipe) que además entrega lecturas cortas."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+
+    def seekable(self) -> bool:
+        return False
+
+    def read(self, size: int = -1) -> bytes:
+        chunk, self._data = self._data[:min(size, 5)], self._data[min(size, 5):]
+        return chunk
+
+
+def test_base64_json_body_codifica_por_trozos(tmp_path):
+    datos = os.urandom(100)
+    archivo = tmp_path / "foto.jpg"
+    archivo.write_bytes(datos)
+    esperado = {"number": "5214771234567", "caption": "ñandú", "media": base64.b64encode(datos).decode()}
+
+    for origen in (datos, bytearray(datos), memoryview(datos), archivo, str(archivo), open(archivo, "rb")):
+        body = Base64JsonBody({"number": "5214771234567", "caption": "ñandú"}, "media", origen, chunk_size=9)
+        cuerpo = b"".join(body)
+        assert json.loads(cuerpo) == esperado
+        assert len(body) == len(cuerpo)
+        assert b"".join(body) == cuerpo  # re-iterable para reintentos
+    origen.close()
+
+    with pytest.raises(ValueError):
+        Base64JsonBody({}, "media", datos, chunk_size=10)
+
+
+def test_base64_json_body_origen_no_seekable_no_se_reenvia():
+    datos = os.urandom(50)
+    body = Base64JsonBody({}, "media", SoloLectura(datos), chunk_size=9)
+    assert not body.rewindable
+    assert body.content_length is None
+    assert body.headers() == {}
+    assert json.loads(b"".join(body)) == {"media": base64.b64encode(datos).decode()}
+    # Un segundo intento con el stream ya consumido saldría con la media vacía
+    with pytest.raises(RuntimeError):
+        b"".join(body)
+
+
+def test_reintento_reenvia_el_cuerpo_completo_solo_si_es_rewindable(tmp_path):
+    datos = os.urandom(64)
+    archivo = tmp_path / "a.pdf"
+    archivo.write_bytes(datos)
+    cuerpos = []
+
+    def no_disponible(request: httpx.Request) -> httpx.Response:
+        cuerpos.append(json.loads(request.read())["media"])
+        return httpx.Response(503)
+
+    async def _run(origen) -> list:
+        cuerpos.clear()
+        sender = _sender(no_disponible, retry_policy=RetryPolicy(max_attempts=3, backoff_base=0.0, jitter=False))
+        assert not await sender.send_media_file("5214771234567", origen, filename="a.pdf")
+        await sender.close()
+        return list(cuerpos)
+
+    with open(archivo, "rb") as f:
+        assert asyncio.run(_run(f)) == [base64.b64encode(datos).decode()] * 3
+    assert asyncio.run(_run(SoloLectura(datos))) == [base64.b64encode(datos).decode()]
+
+
+def _decodificar(respuesta: bytes, trozo: int) -> tuple[bytes, dict]:
+    decoder = Base64FieldDecoder("base64")
+    salida = bytearray()
+    for offset in range(0, len(respuesta), trozo):
+        salida += decoder.feed(respuesta[offset:offset + trozo])
+    salida += decoder.close()
+    return bytes(salida), decoder.metadata()
+
+
+def test_decoder_independiente_del_tamano_de_trozo():
+    datos = os.urandom(1000)
+    valor = base64.b64encode(datos).replace(b"/", b"\\/")  # JSON puede escapar "/"
+    respuesta = b'{"mediaType": "image", "base64" : "' + valor + b'", "mimetype": "image/png"}'
+    # Trozos de 1 a 7 bytes: cortes dentro de la clave, del valor, de un escape y del cierre
+    for trozo in range(1, 8):
+        decodificado, metadata = _decodificar(respuesta, trozo)
+        assert decodificado == datos
+        assert metadata == {"mediaType": "image", "mimetype": "image/png"}
+
+
+def test_decoder_respuesta_truncada_o_sin_campo():
+    decoder = Base64FieldDecoder("base64")
+    decoder.feed(b'{"base64": "QUFB')
+    with pytest.raises(ValueError, match="truncada"):
+        decoder.close()
+
+    decoder = Base64FieldDecoder("base64")
+    decoder.feed(b'{"error": "not found"}')
+    with pytest.raises(ValueError, match="no contiene"):
+        decoder.close()
+
+
+def test_open_sink_agrupa_escrituras_en_un_hilo(tmp_path, monkeypatch):
+    monkeypatch.setattr(streaming, "SINK_BUFFER_SIZE", 10)
+    en_hilo = []
+    to_thread = asyncio.to_thread
+
+    async def contado(func, *args):
+        en_hilo.append(getattr(func, "__name__", func))
+        return await to_thread(func, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", contado)
+    destino = tmp_path / "foto.jpg"
+
+    async def _run():
+        async with open_sink(destino) as (write, path):
+            assert path == destino
+            await write(b"12345")
+            await write(b"67890ab")  # llena el buffer: un solo write a disco
+            await write(b"cd")
+            assert not destino.exists()
+
+    asyncio.run(_run())
+    assert en_hilo == ["open", "write", "_finish"]
+    assert destino.read_bytes() == b"1234567890abcd"
+    assert not (tmp_path / "foto.jpg.part").exists()
+
+
+def test_open_sink_no_deja_archivos_a_medias(tmp_path):
+    destino = tmp_path / "foto.jpg"
+
+    async def _run():
+        async with open_sink(destino) as (write, _):
+            await write(b"datos")
+            raise ConnectionError("se cortó la descarga")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(_run())
+    assert list(tmp_path.iterdir()) == []